@@ -1,49 +1,47 @@
 import pcbnew
 import FootprintWizardBase
-import math
+import time
 
-TRACE_THICKNESS_1OZ = 0.035e-3  # 35um in meters
-RHO = 1.678e-8  # Copper resistivity (ohm-mm)
+import numpy as np
+
+from . import cache
+from . import clearance
+from . import geometry
+from . import kicad_mod
+from . import path
+from . import registry
+from . import settings
+from . import stats
+
+# Wizard page controlling how coils with many turns are drawn, see Preview()
+PREVIEW_PAGE = "Preview"
+PREVIEW_DEFAULTS = {"Full Resolution": True, "Preview Turns": 50}
+
+
+def PcbnewLayer(layer_code):
+    """pcbnew layer id of a layer code from the geometry core."""
+    return getattr(pcbnew, geometry.LAYER_NAMES[layer_code])
 
 
 class PCBTraceComponent(FootprintWizardBase.FootprintWizard):
     trace_length = 0.0
     vias = 0
+    resistance = 0.0
     center_y = 0.0
     cw_multiplier = 1
+    emit_time = 0.0
+    stats = None
     netTiePadGroupSet = set([])
+    incremental = None
+    max_reported_violations = 20
 
-    def DrawArcsYSym2Layer(self, layer1, layer2, center_x, start_x, degrees):
-        self.draw.SetLayer(layer1)
-        self.draw.Arc(
-            center_x,
-            self.center_y,
-            start_x,
-            self.center_y,
-            pcbnew.EDA_ANGLE(-degrees * self.cw_multiplier, pcbnew.DEGREES_T),
-        )
-        self.draw.SetLayer(layer2)
-        self.draw.Arc(
-            center_x,
-            self.center_y,
-            start_x,
-            self.center_y,
-            pcbnew.EDA_ANGLE(degrees * self.cw_multiplier, pcbnew.DEGREES_T),
-        )
+    def GetResistance(self, temperature=geometry.REFERENCE_TEMPERATURE):
+        """DC resistance (Ohms) of the last built coil at `temperature` (C)."""
+        return geometry.AdjustResistance(self.resistance, temperature)
 
-        """
-        Calculate the length of the arc and add it to the total trace length
-        """
-        arc_length = abs(center_x - start_x) * math.pi * abs(degrees) / 180
-        self.trace_length += arc_length * 2  # Two arcs
-        temp = self.trace_width
-
-    def GetResistance(self):
-        return (
-            RHO
-            * (self.trace_length / 1e9)
-            / (TRACE_THICKNESS_1OZ * self.copper_thickness * self.trace_width / 1e9)
-        )
+    def GetInductance(self, model=geometry.inductance.DEFAULT_MODEL):
+        """Estimated inductance (Henries) for the current parameters."""
+        return float(geometry.Inductance(type(self).__name__, self.parameters, model))
 
     def DrawText(self, text, layer):
         text_size = self.GetTextSize()  # IPC nominal
@@ -55,22 +53,241 @@ class PCBTraceComponent(FootprintWizardBase.FootprintWizard):
         fab_text.SetHorizJustify(pcbnew.GR_TEXT_H_ALIGN_LEFT)
         self.module.Add(fab_text)
 
-    def PlacePad(self, number: int, position, pad_diameter, pad_hole, via=False):
-        pad = pcbnew.PAD(self.module)
-        pad.SetSize(pcbnew.VECTOR2I(pad_diameter, pad_diameter))
-        pad.SetShape(pcbnew.PAD_SHAPE_CIRCLE)
-        pad.SetAttribute(pcbnew.PAD_ATTRIB_PTH)
-        pad.SetLayerSet(pcbnew.LSET.AllCuMask())
-        pad.SetDrillSize(pcbnew.VECTOR2I(pad_hole, pad_hole))
-        pad.SetPosition(position)
-        pad.SetNumber(number)
-        pad.SetName(str(number))
-        self.module.Add(pad)
+    def AddPreviewParameters(self, defaults):
+        """The Preview page, for generators that can draw many turns."""
+        defaults = dict(PREVIEW_DEFAULTS, **defaults.get(PREVIEW_PAGE, {}))
+        self.AddParam(
+            PREVIEW_PAGE,
+            "Full Resolution",
+            self.uBool,
+            defaults["Full Resolution"],
+            hint="Draw every turn.  Turned off, a quick preview is drawn, which is "
+            "not a usable footprint",
+        )
+        self.AddParam(
+            PREVIEW_PAGE,
+            "Preview Turns",
+            self.uInteger,
+            defaults["Preview Turns"],
+            min_value=2,
+            hint="Most turns drawn while Full Resolution is off, counted like the "
+            "turns of the coil",
+        )
+
+    def GeometryParameters(self):
+        """The parameters that shape the coil, without the Preview page."""
+        return {
+            page: values
+            for page, values in self.parameters.items()
+            if page != PREVIEW_PAGE
+        }
+
+    def Preview(self, coil):
+        """
+        The coil to draw: unless Full Resolution is set, only its innermost and
+        outermost turns and every k-th turn in between, so drawing stays fast
+        however many turns it has.  A note on the Fab layer marks a footprint
+        that is not drawn in full.
+        """
+        preview = self.parameters.get(PREVIEW_PAGE, PREVIEW_DEFAULTS)
+        if preview["Full Resolution"]:
+            return coil
+
+        shown = coil.Preview(preview["Preview Turns"])
+        if shown is not coil:
+            note = (
+                f"PREVIEW: {shown.TurnCount()} of {coil.TurnCount()} turns drawn, "
+                "not a usable footprint and not checked for clearance. "
+                f"Set {PREVIEW_PAGE} > Full Resolution."
+            )
+            self.DrawText(note, pcbnew.F_Fab)
+            self.buildmessages += note + "\n"
+        self.stats.Lap("geometry")
+        return shown
+
+    def BuildFootprint(self):
+        """
+        KiCAD's build, timed phase by phase in self.stats.  The phases are
+        added to the build messages, logged and, if KICAD_COIL_STATS_DIR is
+        set, written to a sidecar.
+        """
+        generator = type(self).__name__
+        stats.ConfigureLogFile()
+        self.stats = stats.BuildStats(generator)
+        FootprintWizardBase.FootprintWizard.BuildFootprint(self)
+        if not self.stats.phases:
+            return  # The parameters had errors, nothing was built
+
+        self.buildmessages += self.stats.Text() + "\n"
+        self.stats.Log()
+        sidecar = stats.WizardSidecarPath(generator)
+        if sidecar:
+            self.stats.Save(sidecar)
+
+    def BuildGeometry(self):
+        """
+        Geometry for the current parameters.  Comes from the cache if these
+        parameters were built before, otherwise only the groups of primitives
+        affected by the changed parameters are rebuilt.  Updates the trace
+        length, via count and resistance of the wizard.
+        """
+        self.stats.Lap("parameters")
+        generator = type(self).__name__
+        if self.incremental is None:
+            self.incremental = geometry.IncrementalBuilder(generator)
+        coil = cache.Build(generator, self.GeometryParameters(), self.incremental.Build)
+        if self.incremental.rebuilt:
+            self.buildmessages += f"Rebuilt: {', '.join(self.incremental.rebuilt)}\n"
+            self.incremental.rebuilt = []
+
+        self.trace_length = coil.trace_length
+        self.vias = coil.vias
+        self.resistance = coil.resistance or 0.0
+        self.stats.Count(coil)
+        self.stats.Lap("geometry")
+        return coil
 
-        if via:
-            self.vias += 1
+    def DrawGeometry(self, coil):
+        """
+        Emit the primitive tables from the headless geometry core into the
+        footprint.
+
+        All primitives are collected first and then created one layer at a
+        time, talking to pcbnew directly instead of going through
+        FootprintWizardDrawingAids (which costs a SetLayer per primitive).  The
+        emission time is reported in the build messages.
+        """
+        start_time = time.perf_counter()
+        items = []
+
+        layers = np.unique(
+            np.concatenate(
+                (coil.arcs["layer"], coil.lines["layer"], coil.circles["layer"])
+            )
+        )
+        for layer_code in layers:
+            layer = PcbnewLayer(layer_code)
+
+            # By their integer end points, so they meet their neighbours
+            # exactly; KiCAD works out the center
+            arcs = coil.arcs[coil.arcs["layer"] == layer_code]
+            points = zip(*(p.tolist() for p in kicad_mod.ArcPoints(arcs)))
+            for width, (sx, sy, mx, my, ex, ey) in zip(arcs["width"].tolist(), points):
+                shape = pcbnew.PCB_SHAPE(self.module, pcbnew.SHAPE_T_ARC)
+                shape.SetLayer(layer)
+                shape.SetWidth(width)
+                shape.SetArcGeometry(
+                    pcbnew.VECTOR2I(sx, sy),
+                    pcbnew.VECTOR2I(mx, my),
+                    pcbnew.VECTOR2I(ex, ey),
+                )
+                items.append(shape)
+
+            lines = coil.lines[coil.lines["layer"] == layer_code]
+            for _, x1, y1, x2, y2, width in lines.tolist():
+                shape = pcbnew.PCB_SHAPE(self.module, pcbnew.SHAPE_T_SEGMENT)
+                shape.SetLayer(layer)
+                shape.SetWidth(width)
+                shape.SetStartEnd(pcbnew.VECTOR2I(x1, y1), pcbnew.VECTOR2I(x2, y2))
+                items.append(shape)
+
+            circles = coil.circles[coil.circles["layer"] == layer_code]
+            for _, cx, cy, r, width in circles.tolist():
+                shape = pcbnew.PCB_SHAPE(self.module, pcbnew.SHAPE_T_CIRCLE)
+                shape.SetLayer(layer)
+                shape.SetWidth(width)
+                shape.SetStartEnd(pcbnew.VECTOR2I(cx, cy), pcbnew.VECTOR2I(cx, cy + r))
+                items.append(shape)
+        self.stats.Lap("emission")
+
+        # Every pad and via is a circular PTH on all copper layers.
+        copper_layers = pcbnew.LSET.AllCuMask()
+        for number, x, y, diameter, drill, via in coil.pads.tolist():
+            pad = pcbnew.PAD(self.module)
+            pad.SetSize(pcbnew.VECTOR2I(diameter, diameter))
+            pad.SetShape(pcbnew.PAD_SHAPE_CIRCLE)
+            pad.SetAttribute(pcbnew.PAD_ATTRIB_PTH)
+            pad.SetLayerSet(copper_layers)
+            pad.SetDrillSize(pcbnew.VECTOR2I(drill, drill))
+            pad.SetPosition(pcbnew.VECTOR2I(x, y))
+            pad.SetNumber(number)
+            pad.SetName(str(number))
+            items.append(pad)
+        self.stats.Lap("pads")
+
+        for item in items:
+            self.module.Add(item, pcbnew.ADD_MODE_BULK_APPEND)
+        self.stats.Lap("emission")
+
+        self.netTiePadGroupSet = set(coil.pads["number"].tolist())
+
+        for layer_code, text in coil.texts:
+            self.DrawText(text, PcbnewLayer(layer_code))
+
+        for name, (layer_code, x, y, size, thickness) in coil.fields.items():
+            self.draw.SetLayer(PcbnewLayer(layer_code))
+            self.draw.SetLineThickness(thickness)
+            getattr(self.draw, name)(x, y, size)
+        self.stats.Lap("text")
+        self.stats.counts["emitted"] = len(items)
+
+        self.emit_time = time.perf_counter() - start_time
+        self.buildmessages += (
+            f"Emitted {len(items)} primitives on {len(layers)} layers "
+            f"in {self.emit_time * 1000:.1f} ms\n"
+        )
+
+    def CheckClearance(self, coil, shown=None):
+        """
+        Check the copper of `coil` against `Trace Spacing` and for ends that
+        meet nothing, mark every violation and open end on the marker layer
+        and list them in the build messages.  Skipped if only a preview of
+        the coil is `shown`, so previews stay fast however many turns the
+        coil has.  The results are cached by the coil's digest.
+        """
+        if shown is not None and shown is not coil:
+            self.buildmessages += (
+                "Clearance: not checked in preview, "
+                f"set {PREVIEW_PAGE} > Full Resolution\n"
+            )
+            return []
+
+        start_time = time.perf_counter()
+        spacing = self.parameters["Fab Specs"]["Trace Spacing"]
+        violations, open_ends = cache.Check(
+            coil,
+            spacing,
+            lambda: (
+                clearance.CheckClearance(coil, spacing, self.netTiePadGroupSet),
+                path.OpenEnds(coil),
+            ),
+        )
+
+        markers = clearance.Markers(violations, spacing)
+        self.draw.SetLayer(getattr(pcbnew, clearance.MARKER_LAYER))
+        self.draw.SetLineThickness(geometry.DEFAULT_LINE_THICKNESS)
+        for _, cx, cy, r, _ in markers.circles.tolist():
+            self.draw.Circle(cx, cy, r)
+        for _, x1, y1, x2, y2, _ in markers.lines.tolist():
+            self.draw.Line(x1, y1, x2, y2)
+
+        self.buildmessages += (
+            f"Clearance: {len(violations)} violations of {spacing / 1e6} mm "
+            f"in {(time.perf_counter() - start_time) * 1000:.1f} ms\n"
+        )
+        for violation in violations[: self.max_reported_violations]:
+            self.buildmessages += f"  {clearance.Describe(violation)}\n"
+        self.stats.counts["violations"] = len(violations)
 
-        self.netTiePadGroupSet.add(number)
+        for end in open_ends.tolist():
+            self.draw.Circle(end[3], end[4], spacing)
+        if len(open_ends):
+            self.buildmessages += f"Closure: {len(open_ends)} open ends\n"
+        for end in open_ends[: self.max_reported_violations]:
+            self.buildmessages += f"  {path.DescribeOpenEnd(end)}\n"
+        self.stats.counts["open_ends"] = len(open_ends)
+        self.stats.Lap("clearance")
+        return violations
 
     def GenerateNetTiePadGroup(self):
         # TODO: It feels like there should be a more Pythonic way to make this string
@@ -78,3 +295,4 @@ class PCBTraceComponent(FootprintWizardBase.FootprintWizard):
         for ii in self.netTiePadGroupSet:
             s += str(ii) + ","
         self.module.AddNetTiePadGroup(s[:-1])
+        self.stats.Lap("net tie")
@@ -1,8 +1,12 @@
-from .coil_generator import CoilGeneratorID2L
-CoilGeneratorID2L().register()
+try:
+    import pcbnew
+except ImportError:
+    # Running outside of KiCAD, e.g. headless use of the geometry core.
+    pcbnew = None
 
-from .coil_generator import CoilGenerator1L1T
-CoilGenerator1L1T().register()
+if pcbnew is not None:
+    # Only the names are registered here, the generators are imported when a
+    # wizard is first opened
+    from . import registry
 
-from .flux_neutral_coil_generator import FluxNeutralCoilGen
-FluxNeutralCoilGen().register()
+    registry.Register()
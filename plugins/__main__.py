@@ -0,0 +1,546 @@
+"""
+Command line entry point for generating coil footprints without KiCAD.
+
+Example:
+    python -m plugins generate CoilGeneratorID2L coil.kicad_mod \\
+        --param "Coil specs" "Total Turns" 200
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+
+import numpy as np
+
+from . import capacitance
+from . import clearance
+from . import field
+from . import geometry
+from . import kicad_mod
+from . import mutual
+from . import optimize
+from . import partial_inductance
+from . import path
+from . import settings
+from . import stats
+from . import sweep
+
+
+def ParseValue(text):
+    """Parameter values are JSON (numbers in internal units), else strings."""
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+def LoadParameters(args):
+    parameters = {}
+    if args.preset:
+        # Only what the geometry takes: the wizard also saves its Preview page
+        defaults = geometry.DefaultParameters(args.generator)
+        preset = settings.Load(args.generator, args.preset)
+        parameters = {
+            page: {name: preset[page][name] for name in names}
+            for page, names in defaults.items()
+        }
+    if args.params:
+        with open(args.params, "r") as f:
+            for page, values in json.load(f).items():
+                parameters.setdefault(page, {}).update(values)
+    for page, name, value in args.param or []:
+        parameters.setdefault(page, {})[name] = ParseValue(value)
+    return parameters
+
+
+def AddParameterArguments(parser, generators=geometry.GENERATORS):
+    parser.add_argument(
+        "generator",
+        choices=sorted(generators),
+        help="Generator class name",
+    )
+    parser.add_argument(
+        "--params",
+        help="JSON file with parameters, one page per key, lengths in nm",
+    )
+    parser.add_argument(
+        "--preset", help="Start from a saved preset of the generator's wizard"
+    )
+    parser.add_argument(
+        "--param",
+        nargs=3,
+        action="append",
+        metavar=("PAGE", "NAME", "VALUE"),
+        help="Override one parameter, lengths in internal units (nm)",
+    )
+
+
+def Generate(args):
+    build_stats = stats.BuildStats(args.generator)
+    parameters = LoadParameters(args)
+    build_stats.Lap("parameters")
+    coil = geometry.Build(args.generator, parameters)
+    build_stats.Count(coil)
+    build_stats.Lap("geometry")
+
+    name = args.name or os.path.splitext(os.path.basename(args.output))[0]
+    kicad_mod.SaveFootprint(args.output, coil, name, geometry.VALUES[args.generator])
+    build_stats.Lap("write")
+    build_stats.Log()
+    build_stats.Save(stats.SidecarPath(args.output))
+    print(f"Wrote {args.output}: {coil.PrimitiveCount()} primitives")
+
+
+def Sweep(args):
+    sweeps = [
+        (page, name, sweep.ParseSweepValues(values))
+        for page, name, values in args.sweep
+    ]
+    rows = sweep.Sweep(
+        args.generator, LoadParameters(args), sweeps, args.output, args.workers
+    )
+    failed = [row for row in rows if "error" in row]
+    print(f"Wrote {len(rows) - len(failed)} footprints to {args.output}")
+    for row in failed:
+        print(f"Failed {row['name']}: {row['error']}")
+    return 1 if failed else 0
+
+
+def Inductance(args):
+    parameters = LoadParameters(args)
+    for model in geometry.inductance.MODELS:
+        estimate = geometry.Inductance(args.generator, parameters, model)
+        print(f"{model:>14}: {estimate * 1e6:.4f} uH")
+
+    numerical = partial_inductance.Inductance(
+        args.generator,
+        parameters,
+        max_angle=args.max_angle,
+        max_memory=args.max_memory * 1024 * 1024,
+        workers=args.workers,
+    )
+    print(f"{'numerical':>14}: {numerical * 1e6:.4f} uH")
+
+
+def Resistance(args):
+    report = geometry.Trace(args.generator, LoadParameters(args))
+    for layer, length in report.layer_lengths.items():
+        print(f"{layer:>14}: {length / 1e6:.3f} mm")
+    print(f"{'vias':>14}: {report.vias} ({report.via_resistance * 1e3:.4f} mOhms)")
+    for temperature in args.temperature or [geometry.REFERENCE_TEMPERATURE]:
+        resistance = report.ResistanceAt(temperature)
+        print(f"{f'R @{temperature:g}C':>14}: {resistance:.4f} Ohms")
+
+
+def Capacitance(args):
+    report = capacitance.Estimate(args.generator, LoadParameters(args))
+    if report.capacitance == 0:
+        # No two stretches of trace side by side, nothing to estimate
+        print("no inter-turn capacitance estimate for a single turn")
+        return
+    print(f"{'C':>14}: {report.capacitance * 1e12:.4f} pF")
+    print(f"{'SRF':>14}: {report.self_resonance / 1e6:.4f} MHz")
+
+
+def Mutual(args):
+    pickup_parameters = {}
+    for page, name, value in args.pickup_param or []:
+        pickup_parameters.setdefault(page, {})[name] = ParseValue(value)
+    placement = {
+        "offset": tuple(args.offset),
+        "rotation": args.rotation,
+        "separation": args.separation,
+        "method": args.method,
+    }
+    if args.sweep:
+        page, name, values = args.sweep
+        rows = mutual.SweepPickup(
+            args.generator,
+            args.pickup,
+            page,
+            name,
+            sweep.ParseSweepValues(values),
+            LoadParameters(args),
+            pickup_parameters,
+            **placement,
+        )
+    else:
+        report = mutual.Estimate(
+            args.generator,
+            args.pickup,
+            LoadParameters(args),
+            pickup_parameters,
+            **placement,
+        )
+        rows = [report.Summary()]
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(rows, f, indent=4)
+
+    swept = f"{args.sweep[0]}/{args.sweep[1]}" if args.sweep else None
+    print(f"{swept or '':>14} {'M uH':>10} {'k':>9} {'L1 uH':>9} {'L2 uH':>9}  method")
+    for row in rows:
+        print(
+            f"{row.get(swept, ''):>14} {row['mutual_uh']:>10.5f} "
+            f"{row['coupling']:>9.5f} {row['drive_uh']:>9.4f} "
+            f"{row['pickup_uh']:>9.4f}  {row['method']}"
+        )
+
+
+def Clearance(args):
+    parameters = LoadParameters(args)
+    violations = clearance.Check(args.generator, parameters)
+    spacing = geometry.MergeDefaults(args.generator, parameters)["Fab Specs"][
+        "Trace Spacing"
+    ]
+    print(f"{len(violations)} violations of {spacing / 1e6} mm")
+    for violation in violations:
+        print(f"  {clearance.Describe(violation)}")
+
+    open_ends = path.OpenEnds(geometry.Build(args.generator, parameters))
+    print(f"{len(open_ends)} open ends")
+    for end in open_ends:
+        print(f"  {path.DescribeOpenEnd(end)}")
+    return 1 if len(violations) or len(open_ends) else 0
+
+
+def Preset(args):
+    store = settings.DefaultStore()
+    if args.save:
+        store.Save(args.generator, LoadParameters(args), args.save)
+    if args.delete:
+        store.Delete(args.generator, args.delete)
+    if args.use:
+        store.Use(args.generator, args.use)
+    store.Flush()
+
+    active = store.Active(args.generator)
+    for name in store.Presets(args.generator):
+        print(f"{'*' if name == active else ' '} {name}")
+
+
+def Optimize(args):
+    targets = {
+        "Inductance": args.inductance / 1e6,
+        "Tolerance": args.tolerance / 100,
+        "Max Resistance": args.max_resistance,
+        "Max Outer Diameter": args.max_diameter,
+        "Max Lobe Imbalance": (
+            args.max_imbalance / 100 if args.max_imbalance is not None else None
+        ),
+    }
+    axes = [
+        sweep.ParseSweepValues(text) if text else None
+        for text in (args.turns, args.width, args.spacing)
+    ]
+    result = optimize.Optimize(
+        args.generator,
+        LoadParameters(args),
+        targets,
+        *axes,
+        finalists=args.finalists,
+        numerical=args.numerical,
+        workers=args.workers,
+    )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=4)
+
+    feasible = sum(row["feasible"] for row in result["finalists"])
+    print(
+        f"{result['candidates']} candidates, {result['screened']} screened in, "
+        f"{feasible} of {len(result['finalists'])} finalists meet the targets"
+    )
+    print(
+        f"{'turns':>6} {'width':>7} {'space':>7} {'L uH':>9} {'R Ohms':>9} {'OD mm':>8}"
+    )
+    for row in result["front"]:
+        inductance = row.get("numerical_inductance_uh", row["inductance_uh"])
+        print(
+            f"{row['turns']:>6} {row['trace_width_mm']:>7.3f} "
+            f"{row['trace_spacing_mm']:>7.3f} {inductance:>9.3f} "
+            f"{row['resistance_ohms']:>9.4f} {row['outer_diameter_mm']:>8.3f}"
+        )
+    return 0 if result["front"] else 1
+
+
+def ParseAxis(text):
+    """Grid axis in mm: 'start:stop:count' or comma separated values."""
+    if ":" in text:
+        start, stop, count = text.split(":")
+        return np.linspace(float(start), float(stop), int(count)) / 1e3
+    return np.array([float(v) for v in text.split(",")]) / 1e3
+
+
+def FieldMap(args):
+    parameters = geometry.MergeDefaults(args.generator, LoadParameters(args))
+    spacing, thickness = partial_inductance.Stackup(parameters)
+    coil = geometry.Build(args.generator, parameters)
+
+    extent = field.Extent(coil) * 1.1
+    x = ParseAxis(args.x) if args.x else np.linspace(-extent, extent, args.points)
+    y = ParseAxis(args.y) if args.y else np.linspace(-extent, extent, args.points)
+    z = ParseAxis(args.z)
+
+    b = field.FieldMap(
+        coil,
+        x,
+        y,
+        z,
+        spacing=spacing,
+        thickness=thickness,
+        max_memory=args.max_memory * 1024 * 1024,
+        workers=args.workers,
+    )
+    metrics = field.FieldMetrics(coil, b, x, y)
+    field.SaveFieldMap(args.output, x, y, z, b, metrics)
+    with open(os.path.splitext(args.output)[0] + ".json", "w") as f:
+        json.dump(metrics, f, indent=4)
+
+    print(f"Wrote {args.output}: {len(x)}x{len(y)}x{len(z)} points")
+    for name, value in metrics.items():
+        print(f"{name:>24}: {value:.6g}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m plugins", description="KiCAD coil footprint generators"
+    )
+    parser.add_argument(
+        "--verbose", action="store_true", help="Log the build statistics to stderr"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate = commands.add_parser(
+        "generate", help="Write one coil to a .kicad_mod file"
+    )
+    AddParameterArguments(generate)
+    generate.add_argument("output", help="Output .kicad_mod file")
+    generate.add_argument(
+        "--name", help="Footprint name, defaults to the output file name"
+    )
+    generate.set_defaults(func=Generate)
+
+    sweep_parser = commands.add_parser(
+        "sweep", help="Write a family of coils into a footprint library"
+    )
+    AddParameterArguments(sweep_parser)
+    sweep_parser.add_argument("output", help="Output library directory (*.pretty)")
+    sweep_parser.add_argument(
+        "--sweep",
+        nargs=3,
+        action="append",
+        required=True,
+        metavar=("PAGE", "NAME", "VALUES"),
+        help="Swept parameter: JSON list, comma separated list or start:stop:step",
+    )
+    sweep_parser.add_argument(
+        "--workers", type=int, help="Worker processes, defaults to all cores"
+    )
+    sweep_parser.set_defaults(func=Sweep)
+
+    inductance_parser = commands.add_parser(
+        "inductance",
+        help="Compare the closed-form inductance estimates with the numerical one",
+    )
+    AddParameterArguments(inductance_parser)
+    inductance_parser.add_argument(
+        "--max-angle",
+        type=float,
+        default=partial_inductance.DEFAULT_MAX_ANGLE,
+        help="Degrees of arc per filament",
+    )
+    inductance_parser.add_argument(
+        "--max-memory",
+        type=int,
+        default=partial_inductance.DEFAULT_MAX_MEMORY // (1024 * 1024),
+        help="Memory ceiling for the filament pair blocks, in MB",
+    )
+    inductance_parser.add_argument(
+        "--workers", type=int, help="Worker processes, defaults to all cores"
+    )
+    inductance_parser.set_defaults(func=Inductance)
+
+    resistance_parser = commands.add_parser(
+        "resistance",
+        help="Per layer trace length, vias and DC resistance of a coil",
+    )
+    AddParameterArguments(resistance_parser)
+    resistance_parser.add_argument(
+        "--temperature",
+        type=float,
+        action="append",
+        help="Copper temperature in C, may be repeated (default 25)",
+    )
+    resistance_parser.set_defaults(func=Resistance)
+
+    capacitance_parser = commands.add_parser(
+        "capacitance",
+        help="Parasitic capacitance and self-resonant frequency of a coil",
+    )
+    AddParameterArguments(capacitance_parser)
+    capacitance_parser.set_defaults(func=Capacitance)
+
+    mutual_parser = commands.add_parser(
+        "mutual",
+        help="Mutual inductance and coupling between a drive and a pickup coil",
+    )
+    AddParameterArguments(mutual_parser)
+    mutual_parser.add_argument(
+        "--pickup",
+        choices=sorted(geometry.GENERATORS),
+        default="CoilGenerator1L1T",
+        help="Generator of the pickup coil",
+    )
+    mutual_parser.add_argument(
+        "--pickup-param",
+        nargs=3,
+        action="append",
+        metavar=("PAGE", "NAME", "VALUE"),
+        help="Override one parameter of the pickup coil, like --param",
+    )
+    mutual_parser.add_argument(
+        "--offset",
+        type=int,
+        nargs=2,
+        default=(0, 0),
+        metavar=("X", "Y"),
+        help="Offset of the pickup in nm",
+    )
+    mutual_parser.add_argument(
+        "--rotation", type=float, default=0, help="Rotation of the pickup in degrees"
+    )
+    mutual_parser.add_argument(
+        "--separation",
+        type=int,
+        default=0,
+        help="Height of the pickup above the drive coil's board in nm",
+    )
+    mutual_parser.add_argument(
+        "--method", choices=mutual.METHODS, default="auto", help="Integration"
+    )
+    mutual_parser.add_argument(
+        "--sweep",
+        nargs=3,
+        metavar=("PAGE", "NAME", "VALUES"),
+        help="Swept pickup parameter, values like the sweep command's",
+    )
+    mutual_parser.add_argument("--output", help="JSON file for the results")
+    mutual_parser.set_defaults(func=Mutual)
+
+    clearance_parser = commands.add_parser(
+        "clearance",
+        help="Check the copper of a coil against its Trace Spacing, and its ends",
+    )
+    AddParameterArguments(clearance_parser)
+    clearance_parser.set_defaults(func=Clearance)
+
+    preset_parser = commands.add_parser(
+        "preset",
+        help="List, save, delete or select the presets the wizard starts from",
+    )
+    AddParameterArguments(preset_parser)
+    preset_parser.add_argument(
+        "--save", metavar="NAME", help="Save the given parameters as a preset"
+    )
+    preset_parser.add_argument("--delete", metavar="NAME", help="Delete a preset")
+    preset_parser.add_argument(
+        "--use", metavar="NAME", help="Make the wizard load and save this preset"
+    )
+    preset_parser.set_defaults(func=Preset)
+
+    field_parser = commands.add_parser(
+        "field",
+        help="Biot-Savart field map and uniform field rejection of a coil",
+    )
+    AddParameterArguments(field_parser)
+    field_parser.add_argument("output", help="Output .npz file, metrics go to .json")
+    field_parser.add_argument(
+        "--x", help="Grid x in mm, 'start:stop:count' or a list; covers the coil"
+    )
+    field_parser.add_argument("--y", help="Grid y in mm, same as --x")
+    field_parser.add_argument(
+        "--z",
+        default=str(field.DEFAULT_HEIGHT * 1e3),
+        help="Height(s) above the top copper layer in mm",
+    )
+    field_parser.add_argument(
+        "--points", type=int, default=200, help="Points per axis of the default grid"
+    )
+    field_parser.add_argument(
+        "--max-memory",
+        type=int,
+        default=field.DEFAULT_MAX_MEMORY // (1024 * 1024),
+        help="Memory ceiling for the grid chunks, in MB",
+    )
+    field_parser.add_argument(
+        "--workers", type=int, help="Worker processes, defaults to all cores"
+    )
+    field_parser.set_defaults(func=FieldMap)
+
+    optimize_parser = commands.add_parser(
+        "optimize",
+        help="Search turns, trace width and spacing for a target inductance",
+    )
+    # Only the generators with a closed-form model to screen with
+    AddParameterArguments(optimize_parser, optimize.ESTIMATES)
+    optimize_parser.add_argument(
+        "--inductance", type=float, required=True, help="Target inductance in uH"
+    )
+    optimize_parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=optimize.DEFAULT_TARGETS["Tolerance"] * 100,
+        help="Allowed inductance error in %%",
+    )
+    optimize_parser.add_argument(
+        "--max-resistance", type=float, help="Largest DC resistance in Ohms"
+    )
+    optimize_parser.add_argument(
+        "--max-diameter", type=int, help="Largest outer diameter in nm, pads included"
+    )
+    optimize_parser.add_argument(
+        "--max-imbalance",
+        type=float,
+        help="Largest area-turns imbalance of the two lobes in %%, FluxNeutralCoilGen",
+    )
+    optimize_parser.add_argument(
+        "--turns",
+        help="Turns to try: JSON list, comma separated list or start:stop:step",
+    )
+    optimize_parser.add_argument(
+        "--width",
+        help="Trace widths to try in nm, like --turns; default from Fab Specs",
+    )
+    optimize_parser.add_argument(
+        "--spacing", help="Trace spacings to try in nm, like --width"
+    )
+    optimize_parser.add_argument(
+        "--finalists",
+        type=int,
+        default=optimize.DEFAULT_FINALISTS,
+        help="Designs built in full to verify them",
+    )
+    optimize_parser.add_argument(
+        "--numerical",
+        action="store_true",
+        help="Verify the inductance of the finalists numerically",
+    )
+    optimize_parser.add_argument(
+        "--workers", type=int, help="Worker processes, defaults to all cores"
+    )
+    optimize_parser.add_argument(
+        "--output", help="JSON file for the finalists and the Pareto front"
+    )
+    optimize_parser.set_defaults(func=Optimize)
+
+    args = parser.parse_args(argv)
+    if args.verbose:
+        logging.basicConfig(level=logging.DEBUG, format="%(message)s")
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
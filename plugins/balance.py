@@ -0,0 +1,155 @@
+"""
+Uniform field rejection of a flux-neutral coil from its winding area.
+
+A uniform field B links the flux B . A through a closed trace, where A is the
+signed area of the trace counted once per turn around it (its area-turns).
+The lobes of a flux-neutral coil are wound in opposite directions, so their
+area-turns cancel and a uniform field induces nothing; whatever is left over
+is what the coil picks up from a distant source.
+
+WindingBalance() works on the primitive tables, in one vectorized pass along
+the trace path: the shoelace term of the end points of every line and arc,
+plus the circular segment between each arc and its chord, so the areas are
+exact.  The path runs from pad 1 to pad 2 and is closed by the straight line
+back from pad 2 to pad 1, as twisted leads would close it.  Lines are cut
+where they cross the axis between the lobes and arcs into pieces of at most
+MAX_PIECE_ANGLE, and each piece counts for the lobe on the side of the axis
+its middle is on.  field.FieldMetrics() reports these areas next to the flux
+of its Biot-Savart field map through each lobe.  Leads and taps are part of
+the path, so routing that is not symmetric between the lobes shows up in the
+result.
+"""
+
+import math
+
+import numpy as np
+
+from . import geometry
+from . import path
+
+# Generators with two lobes wound against each other
+LOBED_GENERATORS = ("FluxNeutralCoilGen",)
+
+# Arcs are cut into pieces of at most this many degrees, so an arc across
+# the axis is split between the lobes to within a piece
+MAX_PIECE_ANGLE = 5.0
+
+
+def ArcPieces(arcs):
+    """
+    Signed area (nm^2) against the origin, 1/2 r x dl integrated from start
+    to end, and x of the middle of the pieces of each arc: the shoelace term
+    of the end points plus the circular segment off the chord.
+    """
+    pieces = np.maximum(1, np.ceil(np.abs(arcs["angle"]) / MAX_PIECE_ANGLE))
+    pieces = pieces.astype(np.int64)
+    arc = np.repeat(np.arange(len(arcs)), pieces)
+    k = np.arange(len(arc)) - np.repeat(np.cumsum(pieces) - pieces, pieces)
+    step = np.radians(arcs["angle"][arc]) / pieces[arc]
+
+    cx, cy = arcs["cx"][arc], arcs["cy"][arc]
+    dx, dy = arcs["sx"][arc] - cx, arcs["sy"][arc] - cy
+    theta = step * np.stack((k, k + 0.5, k + 1))
+    x = cx + dx * np.cos(theta) - dy * np.sin(theta)
+    y = cy + dx * np.sin(theta) + dy * np.cos(theta)
+    segment = (dx**2 + dy**2) * (step - np.sin(step)) / 2
+    area = (x[0] * y[2] - x[2] * y[0]) / 2 + segment
+    return arc, area, x[1]
+
+
+def LinePieces(lines, axis_x):
+    """
+    Signed area (nm^2) against the origin and x of the middle of the pieces
+    of each line, cut where it crosses x = `axis_x`.
+    """
+    x1, y1 = lines["x1"].astype(np.float64), lines["y1"].astype(np.float64)
+    x2, y2 = lines["x2"].astype(np.float64), lines["y2"].astype(np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = (axis_x - x1) / (x2 - x1)
+    t = np.where((t > 0) & (t < 1), t, 1)
+    xc, yc = x1 + (x2 - x1) * t, y1 + (y2 - y1) * t
+
+    line = np.concatenate((np.arange(len(lines)), np.arange(len(lines))))
+    area = np.concatenate(((x1 * yc - xc * y1) / 2, (xc * y2 - x2 * yc) / 2))
+    middle = np.concatenate(((x1 + xc) / 2, (xc + x2) / 2))
+    return line, area, middle
+
+
+class WindingBalance:
+    """
+    Area-turns of the lobes of a coil left and right of x = `axis_x` (nm),
+    in nm^2, positive for current counterclockwise seen from the top:
+
+    net          of the whole closed trace, the flux per Tesla of a uniform
+                 field normal to the board
+    coupling     |net| / (|left| + |right|), 0 for perfect cancellation and
+                 1 for a plain coil
+    imbalance    (|left| - |right|) / (|left| + |right|)
+
+    If the trace is broken, all of them are NaN.
+    """
+
+    def __init__(self, coil, axis_x=0):
+        try:
+            trace = path.TracePath(coil)
+        except ValueError:
+            self.left = self.right = self.net = math.nan
+            self.coupling = self.imbalance = math.nan
+            return
+
+        areas, middles = [], []
+        arcs = trace[trace["kind"] == path.ARC]
+        piece, area, middle = ArcPieces(coil.arcs[arcs["index"]])
+        areas.append(np.where(arcs["reversed"][piece], -area, area))
+        middles.append(middle)
+        lines = trace[trace["kind"] == path.LINE]
+        piece, area, middle = LinePieces(coil.lines[lines["index"]], axis_x)
+        areas.append(np.where(lines["reversed"][piece], -area, area))
+        middles.append(middle)
+
+        """
+        Close the trace with the leads, from pad 2 straight back to pad 1
+        """
+        pads = coil.pads
+        first = pads[pads["number"] == 1][0]
+        last = pads[pads["number"] == 2][0]
+        x1, y1 = float(last["x"]), float(last["y"])
+        x2, y2 = float(first["x"]), float(first["y"])
+        areas.append([(x1 * y2 - x2 * y1) / 2])
+        middles.append([(x1 + x2) / 2])
+
+        area, middle = np.concatenate(areas), np.concatenate(middles)
+        self.left = float(area[middle < axis_x].sum())
+        self.right = float(area[middle >= axis_x].sum())
+        self.net = self.left + self.right
+        lobes = abs(self.left) + abs(self.right)
+        self.coupling = abs(self.net) / lobes if lobes else 0.0
+        self.imbalance = (abs(self.left) - abs(self.right)) / lobes if lobes else 0.0
+
+    def Text(self):
+        """Lobe area-turns and imbalance, for the Fab text."""
+        if math.isnan(self.net):
+            return "Lobe balance: n/a (broken trace)\n"
+        return (
+            f"Lobes L/R: {self.left / 1e12:.1f}/{self.right / 1e12:.1f} mm2 turns, "
+            f"imbalance: {self.imbalance * 100:.3f} %\n"
+        )
+
+    def Summary(self):
+        return {
+            "left_area_mm2": self.left / 1e12,
+            "right_area_mm2": self.right / 1e12,
+            "net_area_mm2": self.net / 1e12,
+            "uniform_field_coupling": self.coupling,
+            "lobe_imbalance": self.imbalance,
+        }
+
+
+def Estimate(generator, parameters=None, coil=None):
+    """
+    WindingBalance of a generator's coil, built from `parameters` unless it
+    is given.
+    """
+    if coil is None:
+        coil = geometry.Build(generator, geometry.MergeDefaults(generator, parameters))
+    return WindingBalance(coil)
@@ -0,0 +1,199 @@
+"""
+Two-tier, content-addressed cache for built coil geometry.
+
+Geometry is keyed on a hash of the generator name, GEOMETRY_VERSION and the
+normalized parameter set.  The first tier is an in-process LRU that serves
+the Footprint Wizard while parameters are being edited.  The second tier
+keeps .npz files in the user's cache directory so geometry survives KiCAD
+restarts; it is bounded in size and evicts the least recently used files.
+
+Cached CoilGeometry objects are shared between callers and must not be
+modified.
+"""
+
+import collections
+import hashlib
+import json
+import os
+import sys
+import tempfile
+
+from . import geometry
+
+MAX_ENTRIES = 32
+MAX_DISK_BYTES = 256 * 1024 * 1024
+
+# Set to a directory to move the disk tier, or to an empty string to disable it.
+CACHE_DIR_ENV = "KICAD_COIL_CACHE_DIR"
+
+
+def UserCacheDir():
+    if CACHE_DIR_ENV in os.environ:
+        return os.environ[CACHE_DIR_ENV] or None
+
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA", os.path.expanduser("~"))
+    elif sys.platform == "darwin":
+        base = os.path.expanduser("~/Library/Caches")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache"))
+    return os.path.join(base, "kicad-coil-generators")
+
+
+def Normalize(value):
+    """Make equal parameter sets hash equally, e.g. 1.0 and 1."""
+    if isinstance(value, dict):
+        return {str(k): Normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [Normalize(v) for v in value]
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def CacheKey(generator, parameters):
+    merged = geometry.MergeDefaults(generator, parameters)
+
+    canonical = json.dumps(
+        {
+            "generator": generator,
+            "version": geometry.GEOMETRY_VERSION,
+            "parameters": Normalize(merged),
+        },
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class GeometryCache:
+    def __init__(
+        self, max_entries=MAX_ENTRIES, directory=None, max_disk_bytes=MAX_DISK_BYTES
+    ):
+        self.max_entries = max_entries
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self.memory = collections.OrderedDict()
+        self.checks = collections.OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def Build(self, generator, parameters, build=None):
+        """
+        Geometry of a generator, built only if neither tier has it.  On a miss
+        `build(parameters)` is used if given, e.g. an IncrementalBuilder's.
+        """
+        key = CacheKey(generator, parameters)
+
+        coil = self.memory.get(key)
+        if coil is not None:
+            self.memory.move_to_end(key)
+            self.hits += 1
+            return coil
+
+        coil = self._LoadFromDisk(key)
+        if coil is not None:
+            self.disk_hits += 1
+        else:
+            self.misses += 1
+            if build is None:
+                coil = geometry.Build(generator, parameters)
+            else:
+                coil = build(parameters)
+            self._SaveToDisk(key, coil)
+
+        self.memory[key] = coil
+        if len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+        return coil
+
+    def Check(self, coil, spacing, check):
+        """
+        `check()` for a coil, e.g. its clearance violations and open ends at
+        `spacing`, run only once per coil digest and spacing.  Kept in memory
+        only, with as many entries as the geometry.
+        """
+        key = (coil.Digest(), spacing)
+        result = self.checks.get(key)
+        if result is not None:
+            self.checks.move_to_end(key)
+            return result
+
+        result = self.checks[key] = check()
+        if len(self.checks) > self.max_entries:
+            self.checks.popitem(last=False)
+        return result
+
+    def Clear(self):
+        self.memory.clear()
+        self.checks.clear()
+        if self.directory and os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                if name.endswith(".npz"):
+                    os.remove(os.path.join(self.directory, name))
+
+    def _Path(self, key):
+        return os.path.join(self.directory, key + ".npz")
+
+    def _LoadFromDisk(self, key):
+        if not self.directory:
+            return None
+        path = self._Path(key)
+        try:
+            coil = geometry.CoilGeometry.Load(path)
+            os.utime(path)  # Mark as recently used for eviction
+            return coil
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _SaveToDisk(self, key, coil):
+        """Write atomically, then evict.  The disk tier never fails a build."""
+        if not self.directory:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    coil.Save(f)
+                os.replace(temp_path, self._Path(key))
+            except BaseException:
+                os.remove(temp_path)
+                raise
+            self._Evict()
+        except OSError:
+            pass
+
+    def _Evict(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".npz"):
+                stat = os.stat(os.path.join(self.directory, name))
+                entries.append((stat.st_mtime, stat.st_size, name))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_disk_bytes:
+                break
+            os.remove(os.path.join(self.directory, name))
+            total -= size
+
+
+_default_cache = None
+
+
+def DefaultCache():
+    """The cache shared by the wizards of this KiCAD session."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = GeometryCache(directory=UserCacheDir())
+    return _default_cache
+
+
+def Build(generator, parameters, build=None):
+    return DefaultCache().Build(generator, parameters, build)
+
+
+def Check(coil, spacing, check):
+    return DefaultCache().Check(coil, spacing, check)
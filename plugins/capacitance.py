@@ -0,0 +1,287 @@
+"""
+Parasitic capacitance and self-resonant frequency of a generated coil.
+
+The copper is split into stretches that run side by side: arcs around nearby
+centers whose sweeps overlap, and parallel lines whose projections overlap.
+Neighbours on one layer, closer than SAME_LAYER_REACH pitches (a trace width
+plus `Trace Spacing`), are coupled by the capacitance of a two wire line: a
+flat trace of width w acts like a round wire of radius w/4.  Traces on the
+outer layers see the board on one side and air on the other, so that is in
+the mean of the two permittivities.  Across layers, every trace owns a band
+one pitch wide, and the bands of adjacent layers of the stack are plates
+`Layer Spacing` apart over the width they overlap.  Crossings (vias,
+underpasses) and arcs next to lines are left out.
+
+The voltage across the coil is taken to fall evenly along the trace, from
+pad 1 to pad 2, so two stretches d apart along the trace of length l see d/l
+of it.  The network collapses into the one capacitance across the pads that
+stores the same energy, C = sum(C_ij (d_ij / l)^2), and together with the
+inductance that gives the self-resonant frequency 1 / (2 pi sqrt(L C)).
+
+Arc pairs are sampled ARC_SAMPLES times along their common sweep; everything
+else is closed form, vectorized over all pairs of primitives found by
+sorting on radius (arcs) and on the offset from the origin (lines).
+"""
+
+import math
+
+import numpy as np
+
+from . import geometry
+from . import path
+
+EPSILON_0 = 8.8541878128e-12  # F/m
+
+# Same layer neighbours, in pitches (trace width plus spacing) between trace
+# centers: only the next turn
+SAME_LAYER_REACH = 1.5
+
+ARC_SAMPLES = 16  # Samples of the common sweep of two arcs
+ANGLE_TOLERANCE = 1e-3  # Lines closer than this to parallel (radians) pair up
+
+OUTER_LAYERS = ("F_Cu", "B_Cu")  # Copper with air on one side
+
+
+def WireCapacitance(distance, width, permittivity):
+    """
+    Capacitance per length (F/m) of two traces `width` wide with centers
+    `distance` apart (same units), as wires of the equivalent radius w/4.
+    """
+    ratio = np.maximum(2 * distance / width, 1 + 1e-9)
+    return math.pi * EPSILON_0 * permittivity / np.arccosh(ratio)
+
+
+def SelfResonance(inductance, capacitance):
+    """Self-resonant frequency (Hz) of `inductance` (H) and `capacitance` (F)."""
+    with np.errstate(divide="ignore"):
+        return 1 / (2 * math.pi * np.sqrt(inductance * capacitance))
+
+
+def WindowPairs(key, reach):
+    """
+    Pairs of rows (a, b) with key[a] <= key[b] <= key[a] + reach, each pair
+    once.
+    """
+    order = np.argsort(key, kind="stable")
+    key = key[order]
+    count = np.searchsorted(key, key + reach, side="right") - np.arange(len(key)) - 1
+    a = np.repeat(np.arange(len(key)), count)
+    b = a + 1 + np.arange(len(a)) - np.repeat(np.cumsum(count) - count, count)
+    return order[a], order[b]
+
+
+class Stretches:
+    """The copper primitives of a coil with their place along the trace."""
+
+    def __init__(self, coil):
+        kind, index, self.layer, self.start, self.end, width = path.EndPoints(coil)
+        self.kind = kind
+        self.width = width.astype(np.float64)
+        self.arcs = coil.arcs[index[kind == path.ARC]]
+        self.length = np.hypot(*(self.end - self.start).T)
+        self.length[kind == path.ARC] = geometry.ArcLengths(self.arcs)
+        self.offset, self.reverse = path.PathOffsets(coil, kind, index, self.length)
+        self.trace_length = float(np.sum(self.length[~np.isnan(self.offset)]))
+
+        layers = np.unique(self.layer)
+        self.rank = np.searchsorted(layers, self.layer)
+
+    def Along(self, rows, fraction):
+        """Distance (nm) along the trace of `fraction` of the way through rows."""
+        fraction = np.where(self.reverse[rows], 1 - fraction, fraction)
+        return self.offset[rows] + fraction * self.length[rows]
+
+
+def Coupling(stretches, a, b, distance, trace_spacing, layer_spacing, permittivity):
+    """
+    Capacitance per length (F/m) between rows `a` and `b` with trace centers
+    `distance` (nm) apart sideways, 0 where they are not neighbours.
+    """
+    width = (stretches.width[a] + stretches.width[b]) / 2
+    pitch = width + trace_spacing
+    same = stretches.layer[a] == stretches.layer[b]
+    outer = np.isin(
+        stretches.layer[a], [geometry.LayerCode(name) for name in OUTER_LAYERS]
+    )
+    neighbours = (distance > width) & (distance < SAME_LAYER_REACH * pitch)
+    relative = np.where(outer, (permittivity + 1) / 2, permittivity)
+    return np.where(
+        same,
+        np.where(neighbours, WireCapacitance(distance, width, relative), 0.0),
+        EPSILON_0
+        * permittivity
+        * np.maximum(pitch - distance, 0)
+        / max(layer_spacing, 1),
+    )
+
+
+def ArcCouplings(stretches, trace_spacing, layer_spacing, permittivity):
+    """
+    Capacitance (F) and squared distance along the trace (nm^2) of every
+    sample of the common sweep of neighbouring arcs.
+    """
+    rows = np.flatnonzero(stretches.kind == path.ARC)
+    arcs = stretches.arcs
+    cx, cy = arcs["cx"].astype(np.float64), arcs["cy"].astype(np.float64)
+    radius = np.hypot(arcs["sx"] - cx, arcs["sy"] - cy)
+    sweep = np.radians(arcs["angle"])
+    span = np.abs(sweep)
+    low = np.arctan2(arcs["sy"] - cy, arcs["sx"] - cx) + np.minimum(sweep, 0)
+
+    reach = SAME_LAYER_REACH * (stretches.width.max(initial=0) + trace_spacing)
+    a, b = WindowPairs(radius, reach)
+    rank_a, rank_b = stretches.rank[rows[a]], stretches.rank[rows[b]]
+    keep = (np.abs(rank_a - rank_b) <= 1) & (
+        np.hypot(cx[a] - cx[b], cy[a] - cy[b]) <= reach
+    )
+    a, b = a[keep], b[keep]
+
+    # The sweep of b, seen from the start of a, may wrap around once
+    shift = np.mod(low[b] - low[a], 2 * math.pi)[:, np.newaxis] - (0, 2 * math.pi)
+    first = np.maximum(shift, 0)
+    last = np.minimum(span[a, np.newaxis], shift + span[b, np.newaxis])
+    pair, piece = np.nonzero(last > first)
+    a, b = a[pair], b[pair]
+    first, last = first[pair, piece], last[pair, piece]
+
+    step = (last - first) / ARC_SAMPLES
+    t = first[:, np.newaxis] + step[:, np.newaxis] * (np.arange(ARC_SAMPLES) + 0.5)
+    a, b = np.repeat(a, ARC_SAMPLES), np.repeat(b, ARC_SAMPLES)
+    t, step = t.ravel(), np.repeat(step, ARC_SAMPLES)
+
+    theta = low[a] + t
+    x = cx[a] + radius[a] * np.cos(theta) - cx[b]
+    y = cy[a] + radius[a] * np.sin(theta) - cy[b]
+    t_b = np.clip(np.mod(np.arctan2(y, x) - low[b], 2 * math.pi), 0, span[b])
+
+    def Fraction(arc, t):
+        forward = t / np.maximum(span[arc], 1e-12)
+        return np.where(sweep[arc] > 0, forward, 1 - forward)
+
+    along_a = stretches.Along(rows[a], Fraction(a, t))
+    along_b = stretches.Along(rows[b], Fraction(b, t_b))
+    distance = np.abs(np.hypot(x, y) - radius[b])
+    per_length = Coupling(
+        stretches,
+        rows[a],
+        rows[b],
+        distance,
+        trace_spacing,
+        layer_spacing,
+        permittivity,
+    )
+    return per_length * radius[a] * step * 1e-9, (along_a - along_b) ** 2
+
+
+def LineCouplings(stretches, trace_spacing, layer_spacing, permittivity):
+    """
+    Capacitance (F) and mean squared distance along the trace (nm^2) of every
+    pair of neighbouring parallel lines, over the part where they overlap.
+    """
+    rows = np.flatnonzero((stretches.kind == path.LINE) & (stretches.length > 0))
+    p, q = stretches.start[rows], stretches.end[rows]
+    direction = np.mod(np.arctan2(*(q - p)[:, ::-1].T), math.pi)
+    direction[direction > math.pi - ANGLE_TOLERANCE] -= math.pi
+    offset = -np.sin(direction) * p[:, 0] + np.cos(direction) * p[:, 1]
+
+    reach = SAME_LAYER_REACH * (stretches.width.max(initial=0) + trace_spacing)
+    a, b = WindowPairs(offset, reach)
+    keep = (np.abs(direction[a] - direction[b]) <= ANGLE_TOLERANCE) & (
+        np.abs(stretches.rank[rows[a]] - stretches.rank[rows[b]]) <= 1
+    )
+    a, b = a[keep], b[keep]
+
+    # Positions along the direction of a
+    tangent = np.column_stack((np.cos(direction[a]), np.sin(direction[a])))
+    pa, qa = np.sum(p[a] * tangent, axis=1), np.sum(q[a] * tangent, axis=1)
+    pb, qb = np.sum(p[b] * tangent, axis=1), np.sum(q[b] * tangent, axis=1)
+    first = np.maximum(np.minimum(pa, qa), np.minimum(pb, qb))
+    last = np.minimum(np.maximum(pa, qa), np.maximum(pb, qb))
+    overlap = np.maximum(last - first, 0)
+
+    def Along(line, u, start, end):
+        return stretches.Along(rows[line], (u - start) / (end - start))
+
+    d0 = Along(a, first, pa, qa) - Along(b, first, pb, qb)
+    d1 = Along(a, last, pa, qa) - Along(b, last, pb, qb)
+    per_length = Coupling(
+        stretches,
+        rows[a],
+        rows[b],
+        np.abs(offset[a] - offset[b]),
+        trace_spacing,
+        layer_spacing,
+        permittivity,
+    )
+    # The distance along the trace changes linearly over the overlap
+    return per_length * overlap * 1e-9, (d0 * d0 + d0 * d1 + d1 * d1) / 3
+
+
+class CapacitanceReport:
+    """
+    Equivalent parasitic capacitance across the pads of a coil (F), and the
+    self-resonant frequency (Hz) it makes with `inductance` (H).  Lengths are
+    in nm, `permittivity` is relative.  If the trace is broken, both are NaN.
+    """
+
+    def __init__(
+        self,
+        coil,
+        inductance,
+        trace_spacing,
+        layer_spacing,
+        permittivity,
+    ):
+        self.permittivity = permittivity
+        try:
+            stretches = Stretches(coil)
+        except ValueError:
+            self.capacitance = self.self_resonance = math.nan
+            return
+
+        couplings = [
+            Couplings(stretches, trace_spacing, layer_spacing, permittivity)
+            for Couplings in (ArcCouplings, LineCouplings)
+        ]
+        capacitance = np.concatenate([c for c, _ in couplings])
+        distance_squared = np.concatenate([d for _, d in couplings])
+        self.capacitance = float(
+            np.nansum(capacitance * distance_squared)
+            / max(stretches.trace_length, 1) ** 2
+        )
+        self.self_resonance = float(SelfResonance(inductance, self.capacitance))
+
+    def Text(self):
+        """Capacitance and self-resonant frequency, for the Fab text."""
+        if math.isnan(self.capacitance):
+            return "C: n/a (broken trace)\n"
+        return (
+            f"C (er {self.permittivity:g}): {self.capacitance * 1e12:.3f} pF, "
+            f"SRF: {self.self_resonance / 1e6:.2f} MHz\n"
+        )
+
+    def Summary(self):
+        return {
+            "capacitance_pf": self.capacitance * 1e12,
+            "self_resonance_mhz": self.self_resonance / 1e6,
+            "permittivity": self.permittivity,
+        }
+
+
+def Estimate(generator, parameters=None, coil=None):
+    """
+    CapacitanceReport of a generator's coil, with the inductance estimate of
+    geometry.Inductance().  The coil is built from `parameters` unless it is
+    given.
+    """
+    parameters = geometry.MergeDefaults(generator, parameters)
+    if coil is None:
+        coil = geometry.Build(generator, parameters)
+    fab = parameters["Fab Specs"]
+    return CapacitanceReport(
+        coil,
+        float(geometry.Inductance(generator, parameters)),
+        fab["Trace Spacing"],
+        fab.get("Layer Spacing", 0),
+        fab.get("Dielectric Constant", geometry.DIELECTRIC_CONSTANT),
+    )
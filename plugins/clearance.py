@@ -0,0 +1,831 @@
+"""
+Clearance check of the generated copper, long before PCBNew's DRC sees it.
+
+Every copper arc is cut into pieces of at most MAX_PIECE_ANGLE, long lines
+into pieces as well, and the pieces, pads and vias become capsules: an arc or
+segment plus half its width (pads are segments of zero length).  The
+capsules' boxes, grown by half the clearance, are dropped into a uniform grid
+with a plane per copper layer (pads and vias are in all of them).  The boxes
+are in radius and angle around the origin, where the turns of most coils
+wind, unless axis aligned ones overlap less.  Only capsules sharing a cell
+are compared, in blocks under a memory ceiling: first their chords, then
+their circles, which sorts out neighbouring turns by their radial gap, and
+what is left exactly, on the arcs themselves.  The pieces do not get finer
+with the radius, so the check costs about as much as the coil has turns.
+
+Copper that is meant to touch is not reported: traces ending on a pad of the
+net tie group, traces joined end to end (near their joint), and two points
+that are close along the trace path anyway, like the inside of a tight bend.
+Everything else on a common copper layer closer than the clearance is a
+violation, down to the rounding of the coordinates to whole nanometers.
+"""
+
+import math
+
+import numpy as np
+
+from . import geometry
+from . import path
+
+DEFAULT_MAX_MEMORY = 64 * 1024 * 1024
+
+# Lines are cut into pieces at most this many times the median capsule length
+MAX_PIECE_RATIO = 4
+# Arcs are cut into pieces of at most this many degrees, the pieces are measured
+# exactly, so this only trades pieces against looser boxes
+MAX_PIECE_ANGLE = 45
+
+# Bytes of temporaries per candidate pair while a block is checked
+_BYTES_PER_PAIR = 8 * 48
+
+# Angles within this many radians of an arc's ends are on the arc
+ANGLE_EPSILON = 1e-9
+
+# Boxes sampled to choose between polar and axis aligned boxes
+BOX_SAMPLES = 256
+
+PAD = 2  # Primitive kind of pads and vias, next to path.ARC and path.LINE
+ALL_LAYERS = -1  # Layer of pads and vias
+
+# Two points of the trace closer than this many (clearance + width) along the
+# path are neighbours on the same stretch of copper, not a short between turns.
+NEIGHBOUR_DISTANCE = math.pi
+
+MARKER_LAYER = "User_3"
+MARKER_RADIUS = 500000  # Smallest marker circle, nm
+
+VIOLATION_DTYPE = np.dtype(
+    [
+        ("layer", "i2"),  # ALL_LAYERS for two pads
+        ("x", "i8"),  # Middle of the closest approach
+        ("y", "i8"),
+        ("gap", "i8"),  # Copper to copper, negative for overlaps
+        ("first_kind", "u1"),  # path.ARC, path.LINE or PAD
+        ("first_index", "i8"),  # Row in coil.arcs, coil.lines or coil.pads
+        ("second_kind", "u1"),
+        ("second_index", "i8"),
+    ]
+)
+
+
+class Capsules:
+    """
+    Arcs and segments with a width, from (`x1`, `y1`) to (`x2`, `y2`).  Arcs
+    have a `radius` around (`cx`, `cy`) and run `sweep` radians from angle
+    `a0`; segments have a radius of 0.  `parent` is the primitive each one
+    belongs to, as a row in the (kind, index, ...) arrays returned by
+    Primitives(), and the capsule runs from `u1` to `u2` (nm) along it.
+    """
+
+    def __init__(
+        self, x1, y1, x2, y2, width, layer, parent, u1, u2, cx, cy, radius, a0, sweep
+    ):
+        self.x1 = x1
+        self.y1 = y1
+        self.x2 = x2
+        self.y2 = y2
+        self.width = width
+        self.layer = layer
+        self.parent = parent
+        self.u1 = u1
+        self.u2 = u2
+        self.cx = cx
+        self.cy = cy
+        self.radius = radius
+        self.a0 = a0
+        self.sweep = sweep
+
+    def __len__(self):
+        return len(self.x1)
+
+    def Segments(self, rows):
+        """Start and end points of the capsules in `rows`, as (n, 2) arrays."""
+        return (
+            np.column_stack((self.x1[rows], self.y1[rows])),
+            np.column_stack((self.x2[rows], self.y2[rows])),
+        )
+
+    def Bulge(self):
+        """How far each capsule strays from its chord (nm), 0 for segments."""
+        return self.radius * (1 - np.cos(self.sweep / 2))
+
+    def Closest(self, rows, point):
+        """Closest points to `point` ((n, 2)) on the capsules in `rows`."""
+        p, q = self.Segments(rows)
+        d = q - p
+        length2 = np.sum(d * d, axis=1)
+        t = np.divide(
+            np.sum((point - p) * d, axis=1),
+            length2,
+            out=np.zeros(len(d)),
+            where=length2 > 0,
+        )
+        on_segment = p + d * np.clip(t, 0, 1)[:, None]
+
+        center = np.column_stack((self.cx[rows], self.cy[rows]))
+        theta = np.arctan2(*(point - center).T[::-1])
+        direction = np.column_stack((np.cos(theta), np.sin(theta)))
+        on_circle = center + self.radius[rows][:, None] * direction
+        nearer = np.hypot(*(point - p).T) <= np.hypot(*(point - q).T)
+        on_arc = np.where(
+            InSweep(self.a0[rows], self.sweep[rows], theta)[:, None],
+            on_circle,
+            np.where(nearer[:, None], p, q),
+        )
+        return np.where((self.radius[rows] > 0)[:, None], on_arc, on_segment)
+
+    def Reach(self, rows, point):
+        """
+        How near and how far from `point` ((n, 2)) the capsules in `rows` come.
+        The farthest is only a bound for arcs: their circle's far side.
+        """
+        near = np.hypot(*(self.Closest(rows, point) - point).T)
+        p, q = self.Segments(rows)
+        center = np.column_stack((self.cx[rows], self.cy[rows]))
+        far = np.where(
+            self.radius[rows] > 0,
+            np.hypot(*(center - point).T) + self.radius[rows],
+            np.maximum(np.hypot(*(p - point).T), np.hypot(*(q - point).T)),
+        )
+        return near, far
+
+    def Fraction(self, rows, point):
+        """How far `point` on the capsules in `rows` is along them, 0 to 1."""
+        p, q = self.Segments(rows)
+        span = np.hypot(*(q - p).T)
+        straight = np.divide(
+            np.hypot(*(point - p).T), span, out=np.zeros(len(span)), where=span > 0
+        )
+        sweep = np.abs(self.sweep[rows])
+        theta = np.arctan2(point[:, 1] - self.cy[rows], point[:, 0] - self.cx[rows])
+        turned = np.mod((theta - self.a0[rows]) * np.sign(self.sweep[rows]), TAU)
+        # Just before the start, not near the end of the circle
+        turned = np.where(turned > math.pi + sweep / 2, turned - TAU, turned)
+        turned = np.divide(turned, sweep, out=np.zeros(len(sweep)), where=sweep > 0)
+        return np.clip(np.where(self.radius[rows] > 0, turned, straight), 0, 1)
+
+
+TAU = 2 * math.pi
+
+
+def InSweep(a0, sweep, theta):
+    """Whether the angles `theta` are on arcs running `sweep` from `a0`."""
+    turned = np.mod((theta - a0) * np.sign(sweep) + ANGLE_EPSILON, TAU)
+    return turned <= np.abs(sweep) + 2 * ANGLE_EPSILON
+
+
+def Primitives(coil):
+    """
+    Copper traces followed by the pads, as (kind, index, layer, start, end,
+    width) arrays like path.EndPoints().  Pads have the same start and end,
+    their diameter as width and ALL_LAYERS.
+    """
+    kind, index, layer, start, end, width = path.EndPoints(coil)
+    pads = coil.pads
+    pad_xy = np.column_stack((pads["x"], pads["y"])).astype(np.float64)
+    return (
+        np.concatenate((kind, np.full(len(pads), PAD, dtype="u1"))),
+        np.concatenate((index, np.arange(len(pads)))),
+        np.concatenate((layer.astype(np.int16), np.full(len(pads), ALL_LAYERS))),
+        np.concatenate((start, pad_xy)),
+        np.concatenate((end, pad_xy)),
+        np.concatenate((width, pads["diameter"])).astype(np.float64),
+    )
+
+
+def PieceCapsules(coil):
+    """
+    Capsules of all copper primitives and pads of `coil`, arcs cut into
+    pieces of at most MAX_PIECE_ANGLE.
+    """
+    kind, index, layer, start, end, width = Primitives(coil)
+
+    arcs = coil.arcs[index[kind == path.ARC]]
+    radius = np.hypot(arcs["sx"] - arcs["cx"], arcs["sy"] - arcs["cy"])
+    angle = np.radians(arcs["angle"])
+    step = math.radians(MAX_PIECE_ANGLE)
+    count = np.maximum(1, np.ceil(np.abs(angle) / step)).astype(np.int64)
+
+    # Piece k of arc i runs from angle k/count to (k + 1)/count of the sweep
+    owner = np.repeat(np.arange(len(arcs)), count)
+    k = np.arange(len(owner)) - np.repeat(np.cumsum(count) - count, count)
+    phase = np.arctan2(arcs["sy"] - arcs["cy"], arcs["sx"] - arcs["cx"])[owner]
+    sweep = (angle / count)[owner]
+    cx, cy, r = arcs["cx"][owner], arcs["cy"][owner], radius[owner]
+    a0 = phase + sweep * k
+    a1 = a0 + sweep
+
+    """
+    Long lines are cut into pieces as well: next to short arc pieces, a long
+    slanted line would cover a large block of cells of CandidatePairs' grid.
+    """
+    rest = np.flatnonzero(kind != path.ARC)
+    piece_length = radius * np.abs(angle) / count
+    rest_length = np.hypot(*(end[rest] - start[rest]).T)
+    lengths = np.concatenate((piece_length, rest_length))
+    lengths = lengths[lengths > 0]  # Pads are points
+    longest = MAX_PIECE_RATIO * np.median(lengths) if len(lengths) else 1
+    pieces = np.maximum(1, np.ceil(rest_length / max(longest, 1))).astype(np.int64)
+    piece = np.repeat(np.arange(len(rest)), pieces)
+    j = np.arange(len(piece)) - np.repeat(np.cumsum(pieces) - pieces, pieces)
+    f0 = (j / pieces[piece])[:, np.newaxis]
+    f1 = ((j + 1) / pieces[piece])[:, np.newaxis]
+    p, q = start[rest[piece]], end[rest[piece]]
+    p0, p1 = p + (q - p) * f0, p + (q - p) * f1
+
+    # Arcs come first in Primitives(), so an arc's row is its parent
+    parent = np.concatenate((owner, rest[piece]))
+    arc_length = piece_length[owner]
+    straight = np.zeros(len(piece))
+    return Capsules(
+        np.concatenate((cx + r * np.cos(a0), p0[:, 0])),
+        np.concatenate((cy + r * np.sin(a0), p0[:, 1])),
+        np.concatenate((cx + r * np.cos(a1), p1[:, 0])),
+        np.concatenate((cy + r * np.sin(a1), p1[:, 1])),
+        width[parent],
+        layer[parent],
+        parent,
+        np.concatenate((arc_length * k, rest_length[piece] * f0[:, 0])),
+        np.concatenate((arc_length * (k + 1), rest_length[piece] * f1[:, 0])),
+        np.concatenate((cx, straight)).astype(np.float64),
+        np.concatenate((cy, straight)).astype(np.float64),
+        np.concatenate((r, straight)),
+        np.concatenate((a0, straight)),
+        np.concatenate((sweep, straight)),
+    )
+
+
+def PolarBoxes(capsules, grow):
+    """
+    Boxes in radius and angle around the origin, (capsule, r0, r1, phi0,
+    phi1) arrays, that hold the capsules grown by `grow` (nm).  A box that
+    runs past +pi has a copy one turn back, so the capsule it wraps around to
+    is found as well.
+    """
+    p, q = capsules.Segments(slice(None))
+    rho_p, rho_q = np.hypot(*p.T), np.hypot(*q.T)
+    phi_p, phi_q = np.arctan2(p[:, 1], p[:, 0]), np.arctan2(q[:, 1], q[:, 0])
+
+    """
+    Anything within `reach` of a segment that passes `nearest` from the
+    origin is within arcsin(reach / nearest) of the angles the segment spans.
+    An arc piece strays at most its bulge from its chord.
+    """
+    d = q - p
+    length2 = np.sum(d * d, axis=1)
+    t = np.divide(
+        np.sum(-p * d, axis=1), length2, out=np.zeros(len(d)), where=length2 > 0
+    )
+    nearest = np.hypot(*(p + d * np.clip(t, 0, 1)[:, None]).T)
+    bulge = capsules.Bulge()
+    reach = grow + bulge
+    r0 = nearest - bulge
+    r1 = np.maximum(rho_p, rho_q) + bulge
+    span = np.mod(phi_q - phi_p + math.pi, TAU) - math.pi
+    phi0 = phi_p + np.minimum(span, 0)
+    phi1 = phi0 + np.abs(span)
+
+    """
+    Arcs around the origin have tight bounds: their angle around the origin
+    grows with their own, and their radius is extreme at their ends or on
+    the line through their center.
+    """
+    center = np.hypot(capsules.cx, capsules.cy)
+    around = capsules.radius > center
+    toward = np.arctan2(capsules.cy, capsules.cx)
+    a0, sweep = capsules.a0, capsules.sweep
+    r0 = np.where(
+        around,
+        np.where(
+            InSweep(a0, sweep, toward + math.pi),
+            capsules.radius - center,
+            np.minimum(rho_p, rho_q),
+        ),
+        r0,
+    )
+    r1 = np.where(
+        around,
+        np.where(
+            InSweep(a0, sweep, toward),
+            capsules.radius + center,
+            np.maximum(rho_p, rho_q),
+        ),
+        r1,
+    )
+    turned = np.mod((phi_q - phi_p) * np.sign(sweep), TAU) * np.sign(sweep)
+    phi0 = np.where(around, phi_p + np.minimum(turned, 0), phi0)
+    phi1 = np.where(around, phi0 + np.abs(turned), phi1)
+    nearest = np.where(around, r0, nearest)
+    reach = np.where(around, grow, reach)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        widen = np.arcsin(np.clip(reach / nearest, 0, 1))
+    phi0, phi1 = phi0 - widen, phi1 + widen
+    full = (reach >= nearest) | (phi1 - phi0 >= TAU)
+    phi0 = np.where(full, -math.pi, phi0)
+    phi1 = np.where(full, math.pi, phi1)
+    r0, r1 = np.maximum(r0 - grow, 0), r1 + grow
+
+    # Angles from -pi on, the boxes that run past +pi again one turn back
+    turns = np.floor((phi0 + math.pi) / TAU) * TAU
+    phi0, phi1 = phi0 - turns, phi1 - turns
+    wrap = np.flatnonzero(phi1 > math.pi)
+    return (
+        np.concatenate((np.arange(len(capsules)), wrap)),
+        np.concatenate((r0, r0[wrap])),
+        np.concatenate((r1, r1[wrap])),
+        np.concatenate((phi0, phi0[wrap] - TAU)),
+        np.concatenate((phi1, phi1[wrap] - TAU)),
+    )
+
+
+def CartesianBoxes(capsules, grow):
+    """
+    Axis aligned boxes, (capsule, x0, x1, y0, y1) arrays, that hold the
+    capsules grown by `grow` (nm).  An arc piece strays at most its bulge
+    from its chord.
+    """
+    p, q = capsules.Segments(slice(None))
+    reach = grow + capsules.Bulge()
+    return (
+        np.arange(len(capsules)),
+        np.minimum(p[:, 0], q[:, 0]) - reach,
+        np.maximum(p[:, 0], q[:, 0]) + reach,
+        np.minimum(p[:, 1], q[:, 1]) - reach,
+        np.maximum(p[:, 1], q[:, 1]) + reach,
+    )
+
+
+def Overlaps(boxes, samples=BOX_SAMPLES):
+    """
+    Estimated number of overlapping pairs among `boxes`, counted for every
+    so many boxes against all of them.
+    """
+    _, x0, x1, y0, y1 = boxes
+    sample = np.arange(0, len(x0), max(len(x0) // samples, 1))
+    count = 0
+    for i in sample:
+        count += np.count_nonzero(
+            (np.maximum(x0, x0[i]) <= np.minimum(x1, x1[i]))
+            & (np.maximum(y0, y0[i]) <= np.minimum(y1, y1[i]))
+        )
+    return count * len(x0) / len(sample)
+
+
+def Boxes(capsules, grow):
+    """
+    The boxes the capsules are sorted into a grid by: in radius and angle
+    (PolarBoxes()) with the angles scaled to the typical box's radial size,
+    or axis aligned (CartesianBoxes()), whichever overlaps less.  Arcs around
+    the origin fit polar boxes tightly, long lines past it fit axis aligned
+    ones.
+    """
+    owner, x0, x1, y0, y1 = PolarBoxes(capsules, grow)
+    partial = (y1 - y0) < TAU
+    angular = float(np.median((y1 - y0)[partial])) if partial.any() else 0
+    scale = float(np.median(x1 - x0)) / angular if angular > 0 else 1.0
+    polar = owner, x0, x1, y0 * scale, y1 * scale
+    cartesian = CartesianBoxes(capsules, grow)
+    return min((polar, cartesian), key=Overlaps)
+
+
+def CandidatePairs(capsules, clearance, max_pairs=None):
+    """
+    Blocks of pairs (a, b) of capsules on a common layer whose boxes
+    (Boxes()), grown by half the clearance, overlap.  Found in a uniform grid
+    sized to the typical box, one plane of it per layer.  Each pair of boxes
+    is reported once, by the cell holding the lower left corner of their
+    overlap.  A block holds the pairs of whole cells, up to about `max_pairs`.
+    """
+    if not len(capsules):
+        return
+    owner, x0, x1, y0, y1 = Boxes(capsules, capsules.width / 2 + clearance / 2)
+
+    cell = max(2 * float(np.median(np.maximum(x1 - x0, y1 - y0))), 1.0)
+    ix0 = np.floor(x0 / cell).astype(np.int64)
+    iy0 = np.floor(y0 / cell).astype(np.int64)
+    nx = np.floor(x1 / cell).astype(np.int64) - ix0 + 1
+    ny = np.floor(y1 / cell).astype(np.int64) - iy0 + 1
+    ix0 -= ix0.min()
+    iy0 -= iy0.min()
+    height = int((iy0 + ny).max())
+    plane_size = int((ix0 + nx).max()) * height
+
+    # Every copper layer has a plane of cells of its own, so the copper of
+    # stacked layers never shares a cell; pads and vias are in all planes
+    layer = capsules.layer[owner]
+    layers = np.unique(layer[layer != ALL_LAYERS])
+    everywhere = layer == ALL_LAYERS
+    copies = np.where(everywhere, max(len(layers), 1), 1)
+    entry = np.repeat(np.arange(len(owner)), copies)
+    rank = np.arange(len(entry)) - np.repeat(np.cumsum(copies) - copies, copies)
+    plane = np.where(everywhere[entry], rank, np.searchsorted(layers, layer[entry]))
+    del rank
+
+    # One entry per (capsule, plane, covered cell), sorted by cell
+    cells = nx[entry] * ny[entry]
+    item = np.repeat(entry, cells)
+    offset = np.arange(len(item)) - np.repeat(np.cumsum(cells) - cells, cells)
+    key = (
+        np.repeat(plane, cells) * plane_size
+        + (ix0[item] + offset % nx[item]) * height
+        + iy0[item]
+        + offset // nx[item]
+    )
+    del offset, entry, plane
+    order = np.argsort(key, kind="stable")
+    key, item = key[order], item[order]
+    del order
+
+    first = np.flatnonzero(np.r_[True, key[1:] != key[:-1]])
+    size = np.diff(np.r_[first, len(key)])
+    pairs = np.cumsum(size * (size - 1) // 2)
+    blocks = np.searchsorted(
+        pairs, np.arange(0, pairs[-1], max_pairs or pairs[-1] + 1), side="right"
+    )
+
+    for block_start, block_end in zip(blocks, np.r_[blocks[1:], len(first)]):
+        if block_start == block_end:
+            continue
+        # Every entry pairs with the entries after it in its cell
+        first_b = first[block_start:block_end]
+        size_b = size[block_start:block_end]
+        position = np.arange(first_b[0], first_b[-1] + size_b[-1])
+        after = np.repeat(first_b + size_b, size_b) - position - 1
+        a = np.repeat(position, after)
+        b = a + 1 + np.arange(len(a)) - np.repeat(np.cumsum(after) - after, after)
+        pair_key, a, b = key[a], item[a], item[b]
+
+        overlap = (np.maximum(x0[a], x0[b]) <= np.minimum(x1[a], x1[b])) & (
+            np.maximum(y0[a], y0[b]) <= np.minimum(y1[a], y1[b])
+        )
+        corner = np.maximum(ix0[a], ix0[b]) * height + np.maximum(iy0[a], iy0[b])
+        # Two pads meet in every plane, they are reported in the first one
+        once = ~(everywhere[a] & everywhere[b]) | (pair_key < plane_size)
+        keep = overlap & (corner == pair_key % plane_size) & once
+        yield owner[a[keep]], owner[b[keep]]
+
+
+def SegmentDistance(p1, q1, p2, q2):
+    """
+    Closest points of segments p1-q1 and p2-q2 ((n, 2) arrays), after Ericson,
+    "Real-Time Collision Detection".  Returns (distance, c1, c2).
+    """
+    d1, d2, r = q1 - p1, q2 - p2, p1 - p2
+    a = np.sum(d1 * d1, axis=1)
+    e = np.sum(d2 * d2, axis=1)
+    f = np.sum(d2 * r, axis=1)
+    c = np.sum(d1 * r, axis=1)
+    b = np.sum(d1 * d2, axis=1)
+    denominator = a * e - b * b
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Segment 2 degenerates to a point (pads): closest point on segment 1
+        s = np.where(a > 0, np.clip(-c / a, 0, 1), 0.0)
+        s = np.where(
+            (e > 0) & (denominator > 0),
+            np.clip((b * f - c * e) / denominator, 0, 1),
+            np.where(e > 0, 0.0, s),
+        )
+        t = np.where(e > 0, (b * s + f) / e, 0.0)
+        # Clamp t, then recompute s for the clamped t
+        s = np.where(t < 0, np.where(a > 0, np.clip(-c / a, 0, 1), 0.0), s)
+        s = np.where(t > 1, np.where(a > 0, np.clip((b - c) / a, 0, 1), 0.0), s)
+    t = np.clip(t, 0, 1)
+
+    c1 = p1 + d1 * s[:, None]
+    c2 = p2 + d2 * t[:, None]
+    return np.hypot(*(c1 - c2).T), c1, c2
+
+
+def ArcSegmentPoints(capsules, arc, segment):
+    """
+    Candidate closest points (on arc, on segment, valid) of the arcs and the
+    segments in rows `arc` and `segment` away from their ends: where the arc
+    is nearest to the segment's line, and where the two cross.
+    """
+    center = np.column_stack((capsules.cx[arc], capsules.cy[arc]))
+    r = capsules.radius[arc]
+    p, q = capsules.Segments(segment)
+    d = q - p
+    length = np.maximum(np.hypot(*d.T), 1e-9)
+    e = d / length[:, None]
+    t = np.sum((center - p) * e, axis=1)
+    foot = p + e * t[:, None]
+    normal = foot - center
+    offset = np.hypot(*normal.T)
+    # A line through the center is nearest the arc at the ends or crossings
+    aside = offset > 1e-3
+    v = normal / np.maximum(offset, 1e-3)[:, None]
+    a0, sweep = capsules.a0[arc], capsules.sweep[arc]
+
+    points = []
+    for sign in (1, -1):
+        on_arc = center + sign * r[:, None] * v
+        theta = np.arctan2(sign * v[:, 1], sign * v[:, 0])
+        valid = aside & (t >= 0) & (t <= length) & InSweep(a0, sweep, theta)
+        points.append((on_arc, foot, valid))
+
+        half = np.sqrt(np.maximum(r * r - offset * offset, 0))
+        cross = foot + sign * half[:, None] * e
+        theta = np.arctan2(*(cross - center).T[::-1])
+        along = t + sign * half
+        valid = (offset <= r) & (along >= 0) & (along <= length)
+        points.append((cross, cross, valid & InSweep(a0, sweep, theta)))
+    return points
+
+
+def ArcArcPoints(capsules, a, b):
+    """
+    Candidate closest points (on a, on b, valid) of the arcs in rows `a` and
+    `b` away from their ends: on the line through both centers, and where
+    the two cross.  Concentric arcs have none, their ends are closest.
+    """
+    ca = np.column_stack((capsules.cx[a], capsules.cy[a]))
+    cb = np.column_stack((capsules.cx[b], capsules.cy[b]))
+    ra, rb = capsules.radius[a], capsules.radius[b]
+    d = cb - ca
+    distance = np.hypot(*d.T)
+    apart = distance > 1
+    u = d / np.maximum(distance, 1e-9)[:, None]
+    theta = np.arctan2(u[:, 1], u[:, 0])
+
+    def OnBoth(theta_a, theta_b):
+        return InSweep(capsules.a0[a], capsules.sweep[a], theta_a) & InSweep(
+            capsules.a0[b], capsules.sweep[b], theta_b
+        )
+
+    points = []
+    for sign_a in (1, -1):
+        for sign_b in (1, -1):
+            valid = apart & OnBoth(
+                theta + (sign_a < 0) * math.pi, theta + (sign_b < 0) * math.pi
+            )
+            points.append(
+                (ca + sign_a * ra[:, None] * u, cb + sign_b * rb[:, None] * u, valid)
+            )
+
+    x = np.divide(
+        distance**2 + ra**2 - rb**2,
+        2 * distance,
+        out=np.zeros(len(distance)),
+        where=apart,
+    )
+    half = np.sqrt(np.maximum(ra * ra - x * x, 0))
+    meet = apart & (np.abs(ra - rb) <= distance) & (distance <= ra + rb)
+    normal = np.column_stack((-u[:, 1], u[:, 0]))
+    for sign in (1, -1):
+        cross = ca + x[:, None] * u + sign * half[:, None] * normal
+        valid = meet & OnBoth(
+            np.arctan2(*(cross - ca).T[::-1]), np.arctan2(*(cross - cb).T[::-1])
+        )
+        points.append((cross, cross, valid))
+    return points
+
+
+def CapsuleDistance(capsules, a, b):
+    """
+    Closest points of the capsules in rows `a` and `b`, measured on the arcs
+    themselves.  Returns (distance, c1, c2) like SegmentDistance().
+    """
+    pa, qa = capsules.Segments(a)
+    pb, qb = capsules.Segments(b)
+    arc_a, arc_b = capsules.radius[a] > 0, capsules.radius[b] > 0
+    everywhere = np.ones(len(a), dtype=bool)
+
+    """
+    The ends of each against the other, the straight pairs as a whole, and
+    the points away from the ends the arcs add
+    """
+    points = [
+        (pa, capsules.Closest(b, pa), everywhere),
+        (qa, capsules.Closest(b, qa), everywhere),
+        (capsules.Closest(a, pb), pb, everywhere),
+        (capsules.Closest(a, qb), qb, everywhere),
+    ]
+    _, c1, c2 = SegmentDistance(pa, qa, pb, qb)
+    points.append((c1, c2, ~arc_a & ~arc_b))
+    for on_a, on_b, valid in ArcSegmentPoints(capsules, a, b):
+        points.append((on_a, on_b, valid & arc_a & ~arc_b))
+    for on_b, on_a, valid in ArcSegmentPoints(capsules, b, a):
+        points.append((on_a, on_b, valid & ~arc_a & arc_b))
+    for on_a, on_b, valid in ArcArcPoints(capsules, a, b):
+        points.append((on_a, on_b, valid & arc_a & arc_b))
+
+    distance = np.stack(
+        [np.where(valid, np.hypot(*(c1 - c2).T), np.inf) for c1, c2, valid in points]
+    )
+    best = np.argmin(distance, axis=0)
+    rows = np.arange(len(a))
+    c1 = np.stack([c1 for c1, _, _ in points])[best, rows]
+    c2 = np.stack([c2 for _, c2, _ in points])[best, rows]
+    return distance[best, rows], c1, c2
+
+
+def RingGap(capsules, a, b):
+    """
+    Lower bound on the distance of the center lines of capsules `a` and `b`:
+    how far `b` stays off the circle of `a`, inside or outside it.  0 where `a`
+    is a segment.  Exact for concentric arcs, the bulk of most coils.
+    """
+    center = np.column_stack((capsules.cx[a], capsules.cy[a]))
+    near, far = capsules.Reach(b, center)
+    radius = capsules.radius[a]
+    off = np.maximum(np.maximum(near - radius, radius - far), 0)
+    return np.where(radius > 0, off, 0)
+
+
+def CloseCapsules(capsules, clearance, max_memory):
+    """
+    Pairs of capsules on a common layer closer than `clearance`, as arrays
+    (a, b, gap, closest point on a, closest point on b).
+    """
+    close = [
+        (
+            np.empty(0, dtype=np.int64),
+            np.empty(0, dtype=np.int64),
+            np.empty(0),
+            np.empty((0, 2)),
+            np.empty((0, 2)),
+        )
+    ]
+    bulge = capsules.Bulge()
+    for a, b in CandidatePairs(capsules, clearance, max_memory // _BYTES_PER_PAIR):
+        # Same primitive, or different copper layers
+        pa, pb = capsules.parent[a], capsules.parent[b]
+        la, lb = capsules.layer[a], capsules.layer[b]
+        keep = (pa != pb) & ((la == lb) | (la == ALL_LAYERS) | (lb == ALL_LAYERS))
+        # In primitive order, so every pair of primitives is reported once
+        a, b = np.where(pa < pb, a, b)[keep], np.where(pa < pb, b, a)[keep]
+
+        # The chords first: an arc strays at most its bulge from its chord
+        distance, _, _ = SegmentDistance(*capsules.Segments(a), *capsules.Segments(b))
+        reach = (capsules.width[a] + capsules.width[b]) / 2 + bulge[a] + bulge[b]
+        near = distance < clearance + reach
+        a, b = a[near], b[near]
+
+        # Then the circles of the arcs, which rule out neighbouring turns
+        ring = np.maximum(RingGap(capsules, a, b), RingGap(capsules, b, a))
+        near = ring < clearance + (capsules.width[a] + capsules.width[b]) / 2
+        a, b = a[near], b[near]
+
+        distance, ca, cb = CapsuleDistance(capsules, a, b)
+        gap = distance - (capsules.width[a] + capsules.width[b]) / 2
+        # Leave room for the rounding to integer coordinates
+        bad = gap < clearance - 2
+        close.append((a[bad], b[bad], gap[bad], ca[bad], cb[bad]))
+    return tuple(np.concatenate(column) for column in zip(*close))
+
+
+def CheckClearance(
+    coil,
+    clearance,
+    net_tie=None,
+    max_memory=DEFAULT_MAX_MEMORY,
+):
+    """
+    Places where the copper of `coil` comes closer than `clearance` (nm), as
+    a VIOLATION_DTYPE array with the worst spot of each pair of primitives.
+
+    Traces may end on the pads whose numbers are in `net_tie` (default: all
+    pads, like the footprint's net tie group).  Candidate pairs are checked
+    in blocks that stay below about `max_memory` bytes.
+    """
+    kind, index, layer, start, end, width = Primitives(coil)
+    if net_tie is None:
+        net_tie = coil.pads["number"]
+    tied = np.zeros(len(kind), dtype=bool)
+    tied[kind == PAD] = np.isin(coil.pads["number"], list(net_tie))
+    length = np.hypot(*(end - start).T)
+    length[kind == path.ARC] = geometry.ArcLengths(coil.arcs[index[kind == path.ARC]])
+    try:
+        offset, reverse = path.PathOffsets(coil, kind, index, length)
+    except ValueError:
+        # A broken trace has no neighbours along it, open ends are reported
+        offset = np.full(len(kind), np.nan)
+        reverse = np.zeros(len(kind), dtype=bool)
+
+    capsules = PieceCapsules(coil)
+    a, b, gap, ca, cb = CloseCapsules(capsules, clearance, max_memory)
+    pa, pb = capsules.parent[a], capsules.parent[b]
+    spot = (ca + cb) / 2
+
+    def Along(capsule, point):
+        """Distance of `point` along the trace, from pad 1."""
+        fraction = capsules.Fraction(capsule, point)
+        u = capsules.u1[capsule] + fraction * (
+            capsules.u2[capsule] - capsules.u1[capsule]
+        )
+        parent = capsules.parent[capsule]
+        return offset[parent] + np.where(reverse[parent], length[parent] - u, u)
+
+    along_a = Along(a, ca)
+    along_b = Along(b, cb)
+
+    """
+    Drop the intended connections.  A trace ending on a net tie pad may touch
+    it, and traces joined end to end may come close near their joint.
+    """
+    ends = np.stack((start, end), axis=1)  # (primitive, 2, xy)
+    pad_a, pad_b = kind[pa] == PAD, kind[pb] == PAD
+
+    trace = np.where(pad_a, pb, pa)
+    pad = np.where(pad_a, pa, pb)
+    on_pad = np.linalg.norm(ends[trace] - start[pad][:, None], axis=2)
+    ending = (pad_a ^ pad_b) & (on_pad.min(axis=1) <= width[pad] / 2)
+    connected = ending & tied[pad]
+
+    # A pad sits on the trace where a trace ends on it
+    end_along = offset[trace] + np.where(
+        reverse[trace] != (np.argmin(on_pad, axis=1) == 1), length[trace], 0
+    )
+    pad_along = np.full(len(kind), np.nan)
+    np.fmin.at(pad_along, pad[ending], end_along[ending])
+    along_a = np.where(pad_a, pad_along[pa], along_a)
+    along_b = np.where(pad_b, pad_along[pb], along_b)
+
+    joint = np.linalg.norm(ends[pa][:, :, None] - ends[pb][:, None], axis=3)
+    joint_tolerance = np.minimum(width[pa], width[pb]) / 2
+    joined = joint <= joint_tolerance[:, None, None]
+    near = (
+        np.linalg.norm(
+            spot[:, None, None] - (ends[pa][:, :, None] + ends[pb][:, None]) / 2, axis=3
+        )
+        <= ((width[pa] + width[pb]) / 2 + clearance)[:, None, None]
+    )
+    connected |= ~pad_a & ~pad_b & np.any(joined & near, axis=(1, 2))
+
+    neighbours = NEIGHBOUR_DISTANCE * (clearance + (width[pa] + width[pb]) / 2)
+    with np.errstate(invalid="ignore"):
+        connected |= np.abs(along_a - along_b) <= neighbours
+
+    pa, pb, gap, spot = (
+        pa[~connected],
+        pb[~connected],
+        gap[~connected],
+        spot[~connected],
+    )
+
+    # Worst spot of each pair of primitives
+    order = np.lexsort((gap, pb, pa))
+    pa, pb, gap, spot = pa[order], pb[order], gap[order], spot[order]
+    first = np.ones(len(pa), dtype=bool)
+    first[1:] = (pa[1:] != pa[:-1]) | (pb[1:] != pb[:-1])
+    pa, pb, gap, spot = pa[first], pb[first], gap[first], spot[first]
+
+    violations = np.empty(len(pa), dtype=VIOLATION_DTYPE)
+    violations["layer"] = np.where(layer[pa] == ALL_LAYERS, layer[pb], layer[pa])
+    violations["x"] = np.round(spot[:, 0])
+    violations["y"] = np.round(spot[:, 1])
+    violations["gap"] = np.floor(gap)
+    violations["first_kind"] = kind[pa]
+    violations["first_index"] = index[pa]
+    violations["second_kind"] = kind[pb]
+    violations["second_index"] = index[pb]
+    return violations
+
+
+def Markers(violations, clearance, line_thickness=geometry.DEFAULT_LINE_THICKNESS):
+    """A circle and a cross on MARKER_LAYER at every violation."""
+    draw = geometry.GeometryBuilder()
+    draw.SetLayer(geometry.LayerCode(MARKER_LAYER))
+    draw.SetLineThickness(line_thickness)
+    if not len(violations):
+        return draw.Build()
+
+    x, y = violations["x"], violations["y"]
+    r = max(MARKER_RADIUS, clearance)
+    draw.Circle(x, y, r)
+    arm = r / math.sqrt(2)
+    draw.Line(x - arm, y - arm, x + arm, y + arm)
+    draw.Line(x - arm, y + arm, x + arm, y - arm)
+    return draw.Build()
+
+
+KIND_NAMES = {path.ARC: "arc", path.LINE: "line", PAD: "pad"}
+
+
+def Describe(violation):
+    """One line description of a violation, in mm."""
+    layer = (
+        "all layers"
+        if violation["layer"] == ALL_LAYERS
+        else geometry.LAYER_NAMES[violation["layer"]]
+    )
+    return (
+        f"{KIND_NAMES[int(violation['first_kind'])]} {violation['first_index']} "
+        f"and {KIND_NAMES[int(violation['second_kind'])]} {violation['second_index']} "
+        f"{violation['gap'] / 1e6:.4f} mm apart at "
+        f"({violation['x'] / 1e6:.4f}, {violation['y'] / 1e6:.4f}) on {layer}"
+    )
+
+
+def Check(generator, parameters=None, coil=None):
+    """
+    Clearance violations of a generator's coil against its `Trace Spacing`.
+    The coil is built from `parameters` unless it is given.
+    """
+    parameters = geometry.MergeDefaults(generator, parameters)
+    if coil is None:
+        coil = geometry.Build(generator, parameters)
+    return CheckClearance(coil, parameters["Fab Specs"]["Trace Spacing"])
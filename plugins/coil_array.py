@@ -0,0 +1,282 @@
+"""
+Arrays of identical coils on a board.
+
+The coil is generated once, by its Footprint Wizard with the parameters of a
+preset, and every instance is a copy of that one footprint, moved and
+rotated into place.  The instances are numbered from the first reference
+designators not yet on the board, their pads 1 and 2 get nets of their own,
+and they are kept apart by at least the coil's `Trace Spacing` (or `Keep
+Out`): a grid without a pitch gets the smallest pitch that does that, and
+positions that come closer are refused.  All of them go into one group.
+
+The array is described by a dictionary like ARRAY_DEFAULTS, lengths in nm.
+The "Coil Array" action plugin reads it from a JSON file next to the board
+(see SpecPath()), writing one with the defaults the first time.
+"""
+
+import json
+import os
+import time
+
+import numpy as np
+
+from . import cache
+from . import geometry
+from . import registry
+from . import settings
+
+ARRAY_DEFAULTS = {
+    "Generator": "CoilGenerator1L1T",
+    "Preset": None,  # Preset of the generator's wizard, None for the active one
+    "Parameters": {},  # Changes to the preset, pages like the wizard's
+    "Rows": 4,
+    "Columns": 4,
+    "Pitch X": 0,  # 0 for the smallest pitch that keeps the keep-out
+    "Pitch Y": 0,
+    "Origin": [100000000, 100000000],  # Center of the first coil
+    "Rotation": 0,  # Degrees, of every coil of the grid
+    "Positions": [],  # [x, y] or [x, y, rotation] per coil, replaces the grid
+    "Keep Out": None,  # Gap between the copper of neighbours, None for spacing
+    "Reference Prefix": "L",
+    "Net Names": {"1": "{ref}_1", "2": "{ref}_2"},  # Pad number -> net name
+    "Group": "Coil array",  # Name of the group of the instances, None for none
+}
+
+SPEC_SUFFIX = "-coil-array.json"
+TOUCH = 1  # Overlap of the keep-outs of neighbours that is let through, nm
+
+
+def SpecPath(board_file):
+    """Where the array spec of a board is kept."""
+    return os.path.splitext(board_file)[0] + SPEC_SUFFIX
+
+
+def MergeSpec(spec):
+    merged = dict(ARRAY_DEFAULTS)
+    merged.update(spec or {})
+    return merged
+
+
+def CopperBounds(coil):
+    """
+    (x0, y0, x1, y1) of the copper and the pads of a coil, in nm around the
+    footprint origin.  Arcs count with their whole circle.
+    """
+    copper = [
+        table[geometry.IsCopper(table["layer"])] for table in (coil.arcs, coil.lines)
+    ]
+    arcs, lines = copper
+    radius = np.hypot(arcs["sx"] - arcs["cx"], arcs["sy"] - arcs["cy"].astype(float))
+    pads = coil.pads
+    x = [
+        arcs["cx"] - radius - arcs["width"] / 2,
+        arcs["cx"] + radius + arcs["width"] / 2,
+        np.minimum(lines["x1"], lines["x2"]) - lines["width"] / 2,
+        np.maximum(lines["x1"], lines["x2"]) + lines["width"] / 2,
+        pads["x"] - pads["diameter"] / 2,
+        pads["x"] + pads["diameter"] / 2,
+    ]
+    y = [
+        arcs["cy"] - radius - arcs["width"] / 2,
+        arcs["cy"] + radius + arcs["width"] / 2,
+        np.minimum(lines["y1"], lines["y2"]) - lines["width"] / 2,
+        np.maximum(lines["y1"], lines["y2"]) + lines["width"] / 2,
+        pads["y"] - pads["diameter"] / 2,
+        pads["y"] + pads["diameter"] / 2,
+    ]
+    x, y = np.concatenate(x), np.concatenate(y)
+    return float(x.min()), float(y.min()), float(x.max()), float(y.max())
+
+
+def RotatedBounds(bounds, rotation):
+    """
+    Bounds of `bounds` rotated by `rotation` (degrees, an array), as arrays
+    x0, y0, x1, y1.  Rotations follow pcbnew: positive is counter-clockwise
+    on the screen, where Y points down.
+    """
+    x0, y0, x1, y1 = bounds
+    corners = np.array(((x0, y0), (x1, y0), (x1, y1), (x0, y1)))
+    angle = -np.radians(np.asarray(rotation, dtype=np.float64))[..., np.newaxis]
+    cos, sin = np.cos(angle), np.sin(angle)
+    x = corners[:, 0] * cos - corners[:, 1] * sin
+    y = corners[:, 0] * sin + corners[:, 1] * cos
+    return x.min(axis=-1), y.min(axis=-1), x.max(axis=-1), y.max(axis=-1)
+
+
+def Positions(spec, bounds, keep_out):
+    """
+    (x, y, rotation) of every coil, as an (n, 3) array: the `Positions` of
+    the spec, or its grid of `Rows` x `Columns`.  A pitch of 0 becomes the
+    size of the rotated copper plus `keep_out`.
+    """
+    if spec["Positions"]:
+        positions = np.zeros((len(spec["Positions"]), 3))
+        positions[:, 2] = spec["Rotation"]
+        for row, position in zip(positions, spec["Positions"]):
+            row[: len(position)] = position
+        return positions
+
+    x0, y0, x1, y1 = RotatedBounds(bounds, spec["Rotation"])
+    pitch_x = spec["Pitch X"] or x1 - x0 + keep_out
+    pitch_y = spec["Pitch Y"] or y1 - y0 + keep_out
+    row, column = np.divmod(np.arange(spec["Rows"] * spec["Columns"]), spec["Columns"])
+    return np.column_stack(
+        (
+            spec["Origin"][0] + column * pitch_x,
+            spec["Origin"][1] + row * pitch_y,
+            np.full(len(row), float(spec["Rotation"])),
+        )
+    )
+
+
+def Crowded(positions, bounds, keep_out):
+    """
+    Pairs (i, j) of coils whose copper bounds, grown by half of `keep_out`,
+    overlap.  The bounds are sorted along X, so only coils in reach of each
+    other are compared.
+    """
+    x0, y0, x1, y1 = RotatedBounds(bounds, positions[:, 2])
+    grow = keep_out / 2
+    x0 = x0 + positions[:, 0] - grow
+    x1 = x1 + positions[:, 0] + grow
+    y0 = y0 + positions[:, 1] - grow
+    y1 = y1 + positions[:, 1] + grow
+
+    order = np.argsort(x0, kind="stable")
+    x0, y0, x1, y1 = x0[order], y0[order], x1[order], y1[order]
+    # Coil i can only overlap the ones after it that start before it ends.
+    # Bounds that just touch, like those of a grid at the smallest pitch, are
+    # fine; TOUCH absorbs the rounding of the positions.
+    reach = np.searchsorted(x0, x1 - TOUCH, side="left")
+    count = np.maximum(reach - np.arange(len(x0)) - 1, 0)
+    a = np.repeat(np.arange(len(x0)), count)
+    b = a + 1 + np.arange(len(a)) - np.repeat(np.cumsum(count) - count, count)
+    overlap = np.maximum(y0[a], y0[b]) < np.minimum(y1[a], y1[b]) - TOUCH
+    pairs = np.column_stack((order[a[overlap]], order[b[overlap]]))
+    return np.sort(pairs, axis=1)
+
+
+def FreeReferences(used, prefix, count):
+    """The first `count` references prefix + number not in `used`."""
+    references = []
+    number = 1
+    while len(references) < count:
+        reference = f"{prefix}{number}"
+        if reference not in used:
+            references.append(reference)
+        number += 1
+    return references
+
+
+def Template(generator, parameters):
+    """
+    Generate the coil once with its Footprint Wizard, every turn drawn.
+    Returns the footprint, the geometry it was drawn from and the wizard's
+    parameters.  Raises ValueError if the parameters do not make a coil.
+    """
+    module, _ = registry.ImportModule(registry.WIZARDS[generator].module)
+    wizard = getattr(module, generator)()
+    for page, values in parameters.items():
+        for name, value in values.items():
+            wizard.parameters.setdefault(page, {})[name] = value
+    wizard.parameters.setdefault("Preview", {})["Full Resolution"] = True
+    wizard.BuildFootprint()
+
+    coil = cache.Build(generator, wizard.GeometryParameters())
+    footprint = wizard.module
+    footprint.SetValue(wizard.GetValue())
+    return footprint, coil, wizard.parameters
+
+
+def Place(pcbnew, board, spec):
+    """
+    Place the array described by `spec` on `board`, with `pcbnew` the module
+    to create the board items with.  Returns a report of what was placed;
+    raises ValueError (and places nothing) if the coils come too close.
+    """
+    start_time = time.perf_counter()
+    spec = MergeSpec(spec)
+    generator = spec["Generator"]
+    if generator not in registry.WIZARDS:
+        raise ValueError(f"Unknown generator: {generator}")
+
+    parameters = settings.Load(generator, spec["Preset"])
+    for page, values in spec["Parameters"].items():
+        parameters.setdefault(page, {}).update(values)
+    footprint, coil, parameters = Template(generator, parameters)
+    generated = time.perf_counter()
+
+    keep_out = spec["Keep Out"]
+    if keep_out is None:
+        keep_out = parameters["Fab Specs"]["Trace Spacing"]
+    bounds = CopperBounds(coil)
+    positions = Positions(spec, bounds, keep_out)
+    crowded = Crowded(positions, bounds, keep_out)
+    if len(crowded):
+        i, j = crowded[0]
+        raise ValueError(
+            f"{len(crowded)} pairs of coils are closer than the keep-out of "
+            f"{keep_out / 1e6} mm, e.g. coil {i + 1} at "
+            f"({positions[i, 0] / 1e6:.3f}, {positions[i, 1] / 1e6:.3f}) and "
+            f"coil {j + 1} at ({positions[j, 0] / 1e6:.3f}, "
+            f"{positions[j, 1] / 1e6:.3f})"
+        )
+
+    used = {fp.GetReference() for fp in board.GetFootprints()}
+    references = FreeReferences(used, spec["Reference Prefix"], len(positions))
+    nets = {}
+
+    def Net(name):
+        if name not in nets:
+            net = board.FindNet(name)
+            if net is None:
+                net = pcbnew.NETINFO_ITEM(board, name)
+                board.Add(net)
+            nets[name] = net
+        return nets[name]
+
+    group = None
+    if spec["Group"]:
+        group = pcbnew.PCB_GROUP(board)
+        group.SetName(spec["Group"])
+        board.Add(group)
+
+    for reference, (x, y, rotation) in zip(references, positions.tolist()):
+        instance = pcbnew.Cast_to_FOOTPRINT(footprint.Duplicate())
+        instance.SetReference(reference)
+        instance.SetPosition(pcbnew.VECTOR2I(int(round(x)), int(round(y))))
+        instance.SetOrientationDegrees(rotation)
+        for pad in instance.Pads():
+            name = spec["Net Names"].get(str(pad.GetNumber()))
+            if name:
+                pad.SetNet(Net(name.format(ref=reference, pad=pad.GetNumber())))
+        board.Add(instance)
+        if group is not None:
+            group.AddItem(instance)
+
+    elapsed = time.perf_counter() - start_time
+    return (
+        f"Placed {len(references)} x {generator} "
+        f"({references[0]}..{references[-1]}) in {elapsed * 1e3:.0f} ms, "
+        f"{(generated - start_time) * 1e3:.0f} ms of it generating the coil.\n"
+        if references
+        else "The array has no coils.\n"
+    )
+
+
+def PlaceFromFile(pcbnew, board):
+    """
+    Place the array of the spec file next to the board.  If there is none
+    yet, write one with the defaults and return a note instead.
+    """
+    path = SpecPath(board.GetFileName())
+    if not os.path.exists(path):
+        with open(path, "w") as f:
+            json.dump(ARRAY_DEFAULTS, f, indent=4)
+        return (
+            f"Wrote an example array to {path}.  Edit it (lengths in nm) and "
+            "run Coil Array again to place the coils.\n"
+        )
+    with open(path, "r") as f:
+        spec = json.load(f)
+    return Place(pcbnew, board, spec)
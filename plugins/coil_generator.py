@@ -1,8 +1,4 @@
 import pcbnew
-import FootprintWizardBase
-import math
-import json
-import os
 
 from .PCBTraceComponent import *
 
@@ -11,42 +7,14 @@ class CoilGeneratorID2L(PCBTraceComponent):
     center_x = 0
     center_y = 0
 
-    json_file = os.path.join(
-        os.path.dirname(os.path.abspath(__file__)), "CoilGeneratorID2L.json"
-    )
-
-    GetName = lambda self: "Coil Generator from ID"
-    GetDescription = lambda self: "Generates a coil around a circular aperture."
-    GetValue = lambda self: "Coil based on ID"
+    GetName = lambda self: registry.WIZARDS["CoilGeneratorID2L"].name
+    GetDescription = lambda self: registry.WIZARDS["CoilGeneratorID2L"].description
+    GetValue = lambda self: registry.WIZARDS["CoilGeneratorID2L"].value
 
     def GenerateParameterList(self):
-        # Set some reasonable default values for the parameters
-        defaults = {
-            "Coil specs": {
-                "Total Turns": 15,
-                "First Layer": "F_Cu",
-                "Second Layer": "B_Cu",
-                "Direction": True,
-            },
-            "Install Info": {
-                "Inside Diameter, Radius": 30000000,
-                "Inner Ring gap": 500000,
-            },
-            "Fab Specs": {
-                "Trace Width": 200000,
-                "Trace Spacing": 200000,
-                "Via Drill": 300000,
-                "Via Annular Ring": 150000,
-                "Pad Drill": 500000,
-                "Pad Annular Ring": 200000,
-                "Copper Thickness (Oz.Cu.)": 1,
-            },
-        }
-
-        # If this has been run before, load the previous values
-        if os.path.exists(self.json_file):
-            with open(self.json_file, "r") as f:
-                defaults = json.load(f)
+        # The active preset, i.e. the values of the last run, completed with
+        # reasonable defaults
+        defaults = settings.Load("CoilGeneratorID2L")
 
         # Info about the coil itself.
         self.AddParam(
@@ -146,6 +114,25 @@ class CoilGeneratorID2L(PCBTraceComponent):
             defaults["Fab Specs"]["Copper Thickness (Oz.Cu.)"],
             min_value=0.01,
         )
+        self.AddParam(
+            "Fab Specs",
+            "Layer Spacing",
+            self.uMM,
+            pcbnew.ToMM(defaults["Fab Specs"]["Layer Spacing"]),
+            min_value=0,
+            hint="Dielectric thickness between the two layers",
+        )
+        self.AddParam(
+            "Fab Specs",
+            "Dielectric Constant",
+            self.uFloat,
+            defaults["Fab Specs"]["Dielectric Constant"],
+            min_value=1,
+            hint="Relative permittivity of the board, for the parasitic capacitance",
+        )
+
+        # How much of the coil is drawn while editing
+        self.AddPreviewParameters(defaults)
 
     def CheckParameters(self):
         self.aperture_r = self.parameters["Install Info"]["Inside Diameter, Radius"]
@@ -160,6 +147,7 @@ class CoilGeneratorID2L(PCBTraceComponent):
         self.copper_thickness = self.parameters["Fab Specs"][
             "Copper Thickness (Oz.Cu.)"
         ]
+        self.layer_spacing = self.parameters["Fab Specs"]["Layer Spacing"]
 
         self.turns = self.parameters["Coil specs"]["Total Turns"]
         self.first_layer = getattr(pcbnew, self.parameters["Coil specs"]["First Layer"])
@@ -168,186 +156,227 @@ class CoilGeneratorID2L(PCBTraceComponent):
         )
         self.clockwise_bool = self.parameters["Coil specs"]["Direction"]
 
-        with open(self.json_file, "w") as f:
-            json.dump(self.parameters, f, indent=4)
+        settings.Save("CoilGeneratorID2L", self.parameters)
 
     def BuildThisFootprint(self):
-        self.trace_length = 0
-        self.vias = 0
-
-        self.odd_loops = (self.turns % 2) == 1
-        self.odd_loops_multiplier = -1 if self.odd_loops else 1
-        self.cw_multiplier = 1 if self.clockwise_bool else -1
-
-        """Draw the outline circle as reference."""
-        self.draw.SetLayer(pcbnew.User_1)
-        self.draw.Circle(self.center_x, self.center_y, self.aperture_r)
-
-        self.draw.SetLayer(pcbnew.F_Fab)
-        self.draw.Value(0, 0, pcbnew.FromMM(1))
-        self.draw.SetLayer(pcbnew.F_SilkS)
-        self.draw.Reference(0, 0, pcbnew.FromMM(1))
+        coil = self.BuildGeometry()
 
-        """ Calculate several of the internal variables needed. """
-        via_d = self.via_ann_ring * 2 + self.via_hole
-        pad_d = self.pad_ann_ring * 2 + self.pad_hole
-
-        self.draw.SetLineThickness(self.trace_width)
-
-        # Set the arc origins
-        del_o_1 = max(via_d, self.trace_width) / 2 - self.trace_width / 2
-        del_o_2 = max(via_d, self.trace_width) / 2 + self.trace_space / 2
+        """
+        Draw only some of the turns while previewing a large coil
+        """
+        shown = self.Preview(coil)
 
         """
-        Draw the starting via between the front and back layers
+        Draw the reference outline, fields, coils, pads and parameter text
+        computed by the geometry core.
         """
-        pad_number = 3
-        pos = pcbnew.VECTOR2I(
-            int(self.aperture_r + self.aperture_gap + max(via_d, self.trace_width) / 2)
-            * self.odd_loops_multiplier,
-            0,
-        )
-        self.PlacePad(pad_number, pos, via_d, self.via_hole, via=True)
+        self.DrawGeometry(shown)
 
         """
-        Draw the coils themselves
+        Add Net Tie Group to the footprint. This allows the DRC to understand 
+        that the shorting traces are OK for this component
         """
-        # Draw the first winding
-        arc_center_x = self.center_x + del_o_1 / 2 * self.odd_loops_multiplier
-        arc_start_x = (
-            self.aperture_r + self.aperture_gap + max(via_d, self.trace_width) / 2
-        ) * self.odd_loops_multiplier
-        degrees = 180
-        self.DrawArcsYSym2Layer(
-            self.first_layer, self.second_layer, arc_center_x, arc_start_x, degrees
-        )
-
-        for ii in range(1, self.turns, 2):
-            arc_center_x = self.center_x + del_o_2 * self.odd_loops_multiplier
-            arc_start_x = (
-                -(
-                    self.aperture_r
-                    + self.aperture_gap
-                    + (ii / 2) * (self.trace_width + self.trace_space)
-                    - 0.5 * self.trace_space
-                )
-                * self.odd_loops_multiplier
-            )
-            degrees = 180
-            self.DrawArcsYSym2Layer(
-                self.first_layer, self.second_layer, arc_center_x, arc_start_x, degrees
-            )
-
-        for ii in range(2, self.turns, 2):
-            arc_center_x = (
-                self.center_x
-                + del_o_1 * (0.5 if ii == 0 else 1) * self.odd_loops_multiplier
-            )
-            arc_start_x = (
-                self.aperture_r
-                + self.aperture_gap
-                + max(via_d, self.trace_width)
-                + (ii / 2) * (self.trace_width + self.trace_space)
-                - 0.5 * self.trace_width
-            ) * self.odd_loops_multiplier
-            degrees = 180
-            self.DrawArcsYSym2Layer(
-                self.first_layer, self.second_layer, arc_center_x, arc_start_x, degrees
-            )
+        self.GenerateNetTiePadGroup()
 
         """
-        Finish the inductor with nice tails and pads.
+        Check the copper against the trace spacing, so bad parameter
+        combinations show up before DRC.  The full coil is checked, and only
+        with Full Resolution on: a preview leaves out turns, and checking
+        every turn of a large coil would make previews slow.
         """
-        arc_start_x = (
-            self.center_x
-            + self.aperture_r
-            + self.aperture_gap
-            + (self.trace_width if self.odd_loops else max(via_d, self.trace_width))
-            + (self.turns // 2) * (self.trace_space + self.trace_width)
-            - self.trace_width / 2
+        self.CheckClearance(coil, shown)
+
+
+class CoilGeneratorIDNL(PCBTraceComponent):
+    center_x = 0
+    center_y = 0
+
+    GetName = lambda self: registry.WIZARDS["CoilGeneratorIDNL"].name
+    GetDescription = lambda self: registry.WIZARDS["CoilGeneratorIDNL"].description
+    GetValue = lambda self: registry.WIZARDS["CoilGeneratorIDNL"].value
+
+    def GenerateParameterList(self):
+        # The active preset, i.e. the values of the last run, completed with
+        # reasonable defaults
+        defaults = settings.Load("CoilGeneratorIDNL")
+
+        # Info about the coil itself.
+        self.AddParam(
+            "Coil specs",
+            "Turns per Layer",
+            self.uInteger,
+            defaults["Coil specs"]["Turns per Layer"],
+            min_value=1,
+        )
+        self.AddParam(
+            "Coil specs",
+            "Layers",
+            self.uString,
+            defaults["Coil specs"]["Layers"],
+            hint="Comma separated layer names from start to finish, an even "
+            "number of them.  Uses '_' instead of '.'",
         )
-        arc_center_x = arc_start_x + max(via_d, self.trace_width) * 2
-        degrees = -90
-        self.DrawArcsYSym2Layer(
-            self.first_layer, self.second_layer, arc_center_x, arc_start_x, degrees
+        self.AddParam(
+            "Coil specs",
+            "Direction",
+            self.uBool,
+            defaults["Coil specs"]["Direction"],
+            hint="Set to True for clockwise, False for counter-clockwise",
         )
 
-        pad_number = 1
-        pos = pcbnew.VECTOR2I(
-            int(arc_center_x),
-            -int(max(via_d, self.trace_width) * 2 * self.cw_multiplier),
+        # Information about where this footprint needs to fit into.
+        self.AddParam(
+            "Install Info",
+            "Inside Diameter, Radius",
+            self.uMM,
+            pcbnew.ToMM(defaults["Install Info"]["Inside Diameter, Radius"]),
+        )
+        self.AddParam(
+            "Install Info",
+            "Inner Ring gap",
+            self.uMM,
+            pcbnew.ToMM(defaults["Install Info"]["Inner Ring gap"]),
+            hint="Gap between the inner vias of this coil and the aperture",
         )
-        self.PlacePad(pad_number, pos, pad_d, self.pad_hole)
 
-        pad_number = 2
-        pos = pcbnew.VECTOR2I(
-            int(arc_center_x),
-            int(max(via_d, self.trace_width)) * 2 * self.cw_multiplier,
+        # Info about the fabrication capabilities
+        self.AddParam(
+            "Fab Specs",
+            "Trace Width",
+            self.uMM,
+            pcbnew.ToMM(defaults["Fab Specs"]["Trace Width"]),
+            min_value=0,
+        )
+        self.AddParam(
+            "Fab Specs",
+            "Trace Spacing",
+            self.uMM,
+            pcbnew.ToMM(defaults["Fab Specs"]["Trace Spacing"]),
+            min_value=0,
+        )
+        self.AddParam(
+            "Fab Specs",
+            "Via Drill",
+            self.uMM,
+            pcbnew.ToMM(defaults["Fab Specs"]["Via Drill"]),
+            min_value=0,
+            hint="Diameter",
+        )
+        self.AddParam(
+            "Fab Specs",
+            "Via Annular Ring",
+            self.uMM,
+            pcbnew.ToMM(defaults["Fab Specs"]["Via Annular Ring"]),
+            min_value=0,
+            hint="Radius",
+        )
+        self.AddParam(
+            "Fab Specs",
+            "Pad Drill",
+            self.uMM,
+            pcbnew.ToMM(defaults["Fab Specs"]["Pad Drill"]),
+            min_value=0,
+        )
+        self.AddParam(
+            "Fab Specs",
+            "Pad Annular Ring",
+            self.uMM,
+            pcbnew.ToMM(defaults["Fab Specs"]["Pad Annular Ring"]),
+            min_value=0,
+        )
+        self.AddParam(
+            "Fab Specs",
+            "Copper Thickness (Oz.Cu.)",
+            self.uFloat,
+            defaults["Fab Specs"]["Copper Thickness (Oz.Cu.)"],
+            min_value=0.01,
+        )
+        self.AddParam(
+            "Fab Specs",
+            "Layer Spacing",
+            self.uMM,
+            pcbnew.ToMM(defaults["Fab Specs"]["Layer Spacing"]),
+            min_value=0,
+            hint="Dielectric thickness between neighbouring layers of the list",
+        )
+        self.AddParam(
+            "Fab Specs",
+            "Dielectric Constant",
+            self.uFloat,
+            defaults["Fab Specs"]["Dielectric Constant"],
+            min_value=1,
+            hint="Relative permittivity of the board, for the parasitic capacitance",
         )
-        self.PlacePad(pad_number, pos, pad_d, self.pad_hole)
 
+        # How much of the coil is drawn while editing
+        self.AddPreviewParameters(defaults)
+
+    def CheckParameters(self):
+        self.trace_width = self.parameters["Fab Specs"]["Trace Width"]
+        self.trace_space = self.parameters["Fab Specs"]["Trace Spacing"]
+        self.copper_thickness = self.parameters["Fab Specs"][
+            "Copper Thickness (Oz.Cu.)"
+        ]
+
+        self.turns = self.parameters["Coil specs"]["Turns per Layer"]
+        self.layers = [
+            getattr(pcbnew, name.strip())
+            for name in self.parameters["Coil specs"]["Layers"].split(",")
+        ]
+        self.clockwise_bool = self.parameters["Coil specs"]["Direction"]
+
+        settings.Save("CoilGeneratorIDNL", self.parameters)
+
+    def BuildThisFootprint(self):
         """
-        Add Net Tie Group to the footprint. This allows the DRC to understand 
-        that the shorting traces are OK for this component
+        Layer lists and vias that do not fit are reported in the build
+        messages instead of drawing a broken coil.
         """
-        self.GenerateNetTiePadGroup()
+        try:
+            coil = self.BuildGeometry()
+        except ValueError as error:
+            self.buildmessages += f"Cannot build the coil: {error}\n"
+            return
 
         """
-        Capture the parameters in the Fab layer
+        Draw only some of the turns while previewing a large coil
         """
-        fab_text_s = (
-            f"Coil Generator from ID, 2 Layers\n"
-            f'Direction: {"CW" if self.clockwise_bool else "CCW"}\n'
-            f"Inner Radius: {self.aperture_r/1e6}\n"
-            f"Inner Ring Gap: {self.aperture_gap/1e6}\n"
-            f"Turns: {self.turns}\n"
-            f'Layers (Start->Finish): {self.parameters["Coil specs"]["First Layer"]}->{self.parameters["Coil specs"]["Second Layer"]}\n'
-            f"Trace Width/space: {self.trace_width/1e6}/{self.trace_space/1e6}\n"
-            f"Via Drill/annular ring: {self.via_hole/1e6}/{self.via_ann_ring/1e6}\n"
-            f"Pad Drill/annular ring: {self.pad_hole/1e6}/{self.pad_ann_ring/1e6}\n"
-        )
-        self.DrawText(fab_text_s, pcbnew.User_2)
+        shown = self.Preview(coil)
 
         """
-        Capture the basic parameters in the Silk layer
+        Draw the reference outline, fields, coils, vias, pads and parameter
+        text computed by the geometry core.
         """
-        basic_fab_text_s = (
-            f"Turns: {self.turns}\n"
-            f"R(@25C & {self.copper_thickness:.1f} Oz Cu): {self.GetResistance():.4f} Ohms\n"
-        )
-        self.DrawText(basic_fab_text_s, pcbnew.F_SilkS)
+        self.DrawGeometry(shown)
+
+        """
+        Add Net Tie Group to the footprint. This allows the DRC to understand
+        that the shorting traces are OK for this component
+        """
+        self.GenerateNetTiePadGroup()
+
+        """
+        Check the copper against the trace spacing, so bad parameter
+        combinations show up before DRC.  The full coil is checked, and only
+        with Full Resolution on: a preview leaves out turns, and checking
+        every turn of a large coil would make previews slow.
+        """
+        self.CheckClearance(coil, shown)
 
 
 class CoilGenerator1L1T(PCBTraceComponent):
     center_x = 0
     center_y = 0
 
-    json_file = os.path.join(
-        os.path.dirname(os.path.abspath(__file__)), "CoilGenerator1L1T.json"
-    )
-
-    GetName = lambda self: "Coil Generator, single layer, 1 turn"
-    GetDescription = lambda self: "Generates a single turn loop at a circular aperture."
-    GetValue = lambda self: "Single coil, single layer"
+    GetName = lambda self: registry.WIZARDS["CoilGenerator1L1T"].name
+    GetDescription = lambda self: registry.WIZARDS["CoilGenerator1L1T"].description
+    GetValue = lambda self: registry.WIZARDS["CoilGenerator1L1T"].value
 
     def GenerateParameterList(self):
 
-        # Set some reasonable default values for the parameters
-        defaults = {
-            "Coil specs": {"Stub Length": 5000000, "Layer": "F_Cu", "Direction": True},
-            "Install Info": {"Radius": 30000000},
-            "Fab Specs": {
-                "Trace Width": 200000,
-                "Trace Spacing": 200000,
-                "Pad Drill": 500000,
-                "Pad Annular Ring": 200000,
-            },
-        }
-
-        # If this has been run before, load the previous values
-        if os.path.exists(self.json_file):
-            with open(self.json_file, "r") as f:
-                defaults = json.load(f)
+        # The active preset, i.e. the values of the last run, completed with
+        # reasonable defaults
+        defaults = settings.Load("CoilGenerator1L1T")
 
         # Info about the coil itself.
         self.AddParam(
@@ -409,6 +438,13 @@ class CoilGenerator1L1T(PCBTraceComponent):
             pcbnew.ToMM(defaults["Fab Specs"]["Pad Annular Ring"]),
             min_value=0,
         )
+        self.AddParam(
+            "Fab Specs",
+            "Copper Thickness (Oz.Cu.)",
+            self.uFloat,
+            defaults["Fab Specs"]["Copper Thickness (Oz.Cu.)"],
+            min_value=0.01,
+        )
 
     def CheckParameters(self):
         self.radius = self.parameters["Install Info"]["Radius"]
@@ -417,90 +453,24 @@ class CoilGenerator1L1T(PCBTraceComponent):
         self.trace_space = self.parameters["Fab Specs"]["Trace Spacing"]
         self.pad_hole = self.parameters["Fab Specs"]["Pad Drill"]
         self.pad_ann_ring = self.parameters["Fab Specs"]["Pad Annular Ring"]
+        self.copper_thickness = self.parameters["Fab Specs"][
+            "Copper Thickness (Oz.Cu.)"
+        ]
 
         self.layer = getattr(pcbnew, self.parameters["Coil specs"]["Layer"])
         self.clockwise_bool = self.parameters["Coil specs"]["Direction"]
         self.stub_length = self.parameters["Coil specs"]["Stub Length"]
 
-        with open(self.json_file, "w") as f:
-            json.dump(self.parameters, f, indent=4)
+        settings.Save("CoilGenerator1L1T", self.parameters)
 
     def BuildThisFootprint(self):
-        self.cw_multiplier = 1 if self.clockwise_bool else -1
-
-        """ Calculate several of the internal variables needed. """
-        pad_d = self.pad_ann_ring * 2 + self.pad_hole
-        radius1 = self.radius + self.trace_width / 2
-        radius2 = self.trace_width
-
-        theta2 = math.acos(
-            (self.trace_space + max(pad_d, self.trace_width) / 2 + radius2)
-            / (radius1 + radius2)
-        )
-        theta1 = math.pi / 2 - theta2
-
-        self.draw.SetLayer(self.layer)
-        self.draw.SetLineThickness(self.trace_width)
-
-        """ Draw the main arc """
-        arc_start_x = self.center_x + radius1 * math.cos(theta1)
-        arc_start_y = self.center_y - radius1 * math.sin(theta1)
-        self.draw.Arc(
-            self.center_x,
-            self.center_y,
-            arc_start_x,
-            arc_start_y,
-            pcbnew.EDA_ANGLE(
-                -2 * (math.pi - theta1) * self.cw_multiplier, pcbnew.RADIANS_T
-            ),
-        )
-
-        """ Draw the stubs """
-        arc_center_x = self.center_x + (radius1 + radius2) * math.cos(theta1)
-        arc_center_y = self.center_y - (radius1 + radius2) * math.sin(theta1)
-        self.draw.Arc(
-            arc_center_x,
-            arc_center_y,
-            arc_start_x,
-            arc_start_y,
-            pcbnew.EDA_ANGLE(-theta2 * self.cw_multiplier, pcbnew.RADIANS_T),
-        )
-        self.draw.Arc(
-            arc_center_x,
-            -arc_center_y,
-            arc_start_x,
-            -arc_start_y,
-            pcbnew.EDA_ANGLE(theta2 * self.cw_multiplier, pcbnew.RADIANS_T),
-        )
-
-        self.draw.Line(
-            arc_center_x,
-            max(pad_d, self.trace_width) / 2 + self.trace_space,
-            arc_center_x + self.stub_length,
-            max(pad_d, self.trace_width) / 2 + self.trace_space,
-        )
-        self.draw.Line(
-            arc_center_x,
-            -max(pad_d, self.trace_width) / 2 - self.trace_space,
-            arc_center_x + self.stub_length,
-            -max(pad_d, self.trace_width) / 2 - self.trace_space,
-        )
-
-        pad_number = 1
-        pos = pcbnew.VECTOR2I(
-            int(arc_center_x + self.stub_length),
-            -int(max(pad_d, self.trace_width) / 2 + self.trace_space)
-            * self.cw_multiplier,
-        )
-        self.PlacePad(pad_number, pos, pad_d, self.pad_hole)
-
-        pad_number = 2
-        pos = pcbnew.VECTOR2I(
-            int(arc_center_x + self.stub_length),
-            int(max(pad_d, self.trace_width) / 2 + self.trace_space)
-            * self.cw_multiplier,
-        )
-        self.PlacePad(pad_number, pos, pad_d, self.pad_hole)
+        coil = self.BuildGeometry()
+
+        """
+        Draw the loop, stubs, pads and parameter text computed by the geometry
+        core.
+        """
+        self.DrawGeometry(coil)
 
         """
         Add Net Tie Group to the footprint. This allows the DRC to understand 
@@ -509,16 +479,7 @@ class CoilGenerator1L1T(PCBTraceComponent):
         self.GenerateNetTiePadGroup()
 
         """
-        Capture the parameters in the Fab layer
+        Check the copper against the trace spacing, so bad parameter
+        combinations show up before DRC.
         """
-        fab_text_s = (
-            f"Coil Generator, Single Layer, 1 Turn\n"
-            f'Direction {"CCW" if self.clockwise_bool else "CW"}\n'
-            f"Diameter: {self.radius/1e6}\n"
-            f'Layer: {self.parameters["Coil specs"]["Layer"]}\n'
-            f"Trace Width/space: {self.trace_width/1e6}/{self.trace_space/1e6}\n"
-            f"Pad Drill/annular ring: {self.pad_hole/1e6}/{self.pad_ann_ring/1e6}\n"
-            f"Stub Length: {self.stub_length/1e6}"
-        )
-
-        self.DrawText(fab_text_s, pcbnew.User_2)
+        self.CheckClearance(coil)
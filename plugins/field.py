@@ -0,0 +1,194 @@
+"""
+Biot-Savart field map of a generated coil.
+
+The copper path is cut into the same oriented straight filaments used by
+partial_inductance.py, and the field of each filament at a grid point is
+summed in closed form.  Grid points are processed in chunks sized to a
+memory ceiling, spread over all cores by default.
+
+Besides the map, FieldMetrics() quantifies how well a flux-neutral coil
+rejects a uniform field: the net area-turns of the winding (the flux it
+links from a uniform field, per Tesla) against those of each lobe, from
+balance.WindingBalance(), and the flux of the map through each lobe.
+"""
+
+import concurrent.futures
+import json
+import math
+import os
+
+import numpy as np
+
+from . import balance
+from . import geometry
+from . import partial_inductance
+from .inductance import MU_0
+
+DEFAULT_MAX_MEMORY = 256 * 1024 * 1024
+DEFAULT_HEIGHT = 1e-3  # Field plane above the top copper layer, m
+
+# float64 temporaries per point and filament while a chunk is computed
+_ARRAYS_PER_PAIR = 16
+
+
+def SegmentField(points, start, end, current=1.0, core=0.0):
+    """
+    Field (T) of straight filaments carrying `current` (A) at `points`.
+
+    `points` is (n, 3), `start` and `end` are (m, 3); returns (n, 3), summed
+    over the filaments.  `core` softens the field within that radius (m) of a
+    filament so points on the copper stay finite.
+    """
+    r1 = [points[:, None, k] - start[None, :, k] for k in range(3)]
+    r2 = [points[:, None, k] - end[None, :, k] for k in range(3)]
+    d1 = np.sqrt(r1[0] ** 2 + r1[1] ** 2 + r1[2] ** 2 + core**2)
+    d2 = np.sqrt(r2[0] ** 2 + r2[1] ** 2 + r2[2] ** 2 + core**2)
+    dot = r1[0] * r2[0] + r1[1] * r2[1] + r1[2] * r2[2]
+    scale = (d1 + d2) / (d1 * d2 * (d1 * d2 + dot))
+    del d1, d2, dot
+
+    cross = (
+        r1[1] * r2[2] - r1[2] * r2[1],
+        r1[2] * r2[0] - r1[0] * r2[2],
+        r1[0] * r2[1] - r1[1] * r2[0],
+    )
+    field = np.stack([np.sum(c * scale, axis=1) for c in cross], axis=1)
+    return MU_0 * current / (4 * math.pi) * field
+
+
+def ChunkSize(filaments, max_memory):
+    """Grid points per chunk so one chunk stays below max_memory."""
+    return max(1, int(max_memory / (8 * _ARRAYS_PER_PAIR * max(1, len(filaments)))))
+
+
+_worker_filaments = None
+
+
+def _InitWorker(filaments):
+    global _worker_filaments
+    _worker_filaments = filaments
+
+
+def _WorkerChunk(job):
+    points, current, core = job
+    filaments = _worker_filaments
+    return SegmentField(points, filaments.start, filaments.end, current, core)
+
+
+def FilamentField(
+    filaments, points, current=1.0, max_memory=DEFAULT_MAX_MEMORY, workers=None
+):
+    """
+    Field (T) of series connected filaments at `points` ((n, 3) in m).
+    `workers` processes share `max_memory`; None or 0 uses all cores.
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    workers = workers or os.cpu_count() or 1
+    size = ChunkSize(filaments, max_memory // workers)
+    core = geometry.inductance.WindingGMD(
+        filaments.width.mean() if len(filaments) else 0, filaments.thickness
+    )
+    jobs = [
+        (points[start : start + size], current, core)
+        for start in range(0, len(points), size)
+    ]
+
+    if workers == 1 or len(jobs) <= 1:
+        _InitWorker(filaments)
+        chunks = [_WorkerChunk(job) for job in jobs]
+    else:
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers, initializer=_InitWorker, initargs=(filaments,)
+        ) as pool:
+            chunks = list(pool.map(_WorkerChunk, jobs))
+    return np.concatenate(chunks) if chunks else np.empty((0, 3))
+
+
+def FieldMap(
+    coil,
+    x,
+    y,
+    z=DEFAULT_HEIGHT,
+    current=1.0,
+    spacing=partial_inductance.DEFAULT_SPACING,
+    thickness=geometry.TRACE_THICKNESS_1OZ,
+    max_angle=partial_inductance.DEFAULT_MAX_ANGLE,
+    max_memory=DEFAULT_MAX_MEMORY,
+    workers=None,
+):
+    """
+    Field of a CoilGeometry on the grid spanned by `x`, `y` and `z` (1D
+    arrays or scalars, in m; z = 0 is the top copper layer, the others lie
+    below it).  Returns B with shape (len(x), len(y), len(z), 3) in T.
+    """
+    filaments = partial_inductance.CoilFilaments(
+        coil, spacing, thickness, None, max_angle
+    )
+    grid = np.meshgrid(
+        np.atleast_1d(x), np.atleast_1d(y), np.atleast_1d(z), indexing="ij"
+    )
+    points = np.stack([axis.ravel() for axis in grid], axis=1)
+    field = FilamentField(filaments, points, current, max_memory, workers)
+    return field.reshape(grid[0].shape + (3,))
+
+
+def Extent(coil):
+    """Largest |x| or |y| (m) reached by the coil's copper and pads."""
+    arcs, lines, pads = coil.arcs, coil.lines, coil.pads
+    radius = np.hypot(arcs["sx"] - arcs["cx"], arcs["sy"] - arcs["cy"])
+    reach = [
+        np.abs(arcs["cx"]) + radius,
+        np.abs(arcs["cy"]) + radius,
+        np.abs(lines[["x1", "y1", "x2", "y2"]].tolist()).ravel(),
+        np.abs(pads["x"]) + pads["diameter"] / 2,
+        np.abs(pads["y"]) + pads["diameter"] / 2,
+    ]
+    return max((float(np.max(r)) for r in reach if np.size(r)), default=0.0) / 1e9
+
+
+def FieldMetrics(coil, field=None, x=None, y=None, axis_x=0.0):
+    """
+    Uniform field rejection of a coil, with the lobes split at x = `axis_x`
+    (m).  The area-turns of the lobes come from balance.WindingBalance():
+
+    uniform_field_coupling  |net area| / sum of the lobes' |area|, 0 for
+                            perfect cancellation, 1 for a plain coil
+    lobe_imbalance          (|left| - |right|) / (|left| + |right|) areas
+
+    Given a `field` map from FieldMap() on `x`, `y`, the z-flux through each
+    half of the first plane is compared the same way (field_lobe_imbalance).
+    """
+    lobes = balance.WindingBalance(coil, axis_x * 1e9)
+    metrics = {
+        "net_area_m2": lobes.net / 1e18,
+        "left_area_m2": lobes.left / 1e18,
+        "right_area_m2": lobes.right / 1e18,
+        "uniform_field_coupling": lobes.coupling,
+        "lobe_imbalance": lobes.imbalance,
+    }
+
+    if field is not None:
+        metrics["peak_field_T"] = float(np.abs(field).max())
+
+    x, y = np.atleast_1d(x), np.atleast_1d(y)
+    if field is not None and len(x) > 1 and len(y) > 1:
+        flux = field[:, :, 0, 2] * (np.gradient(x)[:, None] * np.gradient(y))
+        flux_left = abs(flux[x < axis_x].sum())
+        flux_right = abs(flux[x >= axis_x].sum())
+        total = flux_left + flux_right
+        metrics["field_lobe_imbalance"] = (
+            float((flux_left - flux_right) / total) if total else 0.0
+        )
+    return metrics
+
+
+def SaveFieldMap(path, x, y, z, field, metrics):
+    """Write the map and its metrics to an .npz file (grid in m, B in T)."""
+    np.savez_compressed(
+        path,
+        x=np.atleast_1d(x),
+        y=np.atleast_1d(y),
+        z=np.atleast_1d(z),
+        B=field,
+        metrics=np.array(json.dumps(metrics)),
+    )
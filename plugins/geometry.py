@@ -0,0 +1,2422 @@
+"""
+Headless geometry core for the coil generators.
+
+The build functions in here turn a parameter set (the same nested dictionary
+the Footprint Wizard keeps in `self.parameters`, lengths in KiCAD internal
+units) into compact primitive tables.  Nothing in this module needs `pcbnew`,
+so coils can be generated and analyzed without a running copy of KiCAD.  The
+wizards replay the tables into the footprint with
+`PCBTraceComponent.DrawGeometry`.
+"""
+
+import collections
+import copy
+import hashlib
+import json
+import math
+
+import numpy as np
+
+from . import balance
+from . import capacitance
+from . import inductance
+from . import registry
+from . import spiral
+
+# Bump whenever a change alters the generated primitives, so cached geometry
+# from older versions is not reused.
+GEOMETRY_VERSION = 10
+
+TRACE_THICKNESS_1OZ = 0.035e-3  # 35um in meters
+RHO = 1.678e-8  # Copper resistivity at REFERENCE_TEMPERATURE (ohm-m)
+REFERENCE_TEMPERATURE = 25  # C
+COPPER_TEMPERATURE_COEFFICIENT = 0.00393  # 1/C
+VIA_PLATING_THICKNESS = 25000  # Barrel plating, IPC-6012 class 2 (nm)
+DIELECTRIC_CONSTANT = 4.4  # Relative permittivity of FR-4 around 1 MHz
+
+DEFAULT_LINE_THICKNESS = 150000  # FootprintWizardDrawingAids default, 0.15mm
+
+NO_TURN = -1  # Turn index of primitives that are not part of a winding
+
+# Layer names in PCB_LAYER_ID order (KiCAD 8), so a layer code is also the
+# pcbnew layer id.
+LAYER_NAMES = (
+    ("F_Cu",)
+    + tuple(f"In{ii}_Cu" for ii in range(1, 31))
+    + (
+        "B_Cu",
+        "B_Adhes",
+        "F_Adhes",
+        "B_Paste",
+        "F_Paste",
+        "B_SilkS",
+        "F_SilkS",
+        "B_Mask",
+        "F_Mask",
+        "Dwgs_User",
+        "Cmts_User",
+        "Eco1_User",
+        "Eco2_User",
+        "Edge_Cuts",
+        "Margin",
+        "B_CrtYd",
+        "F_CrtYd",
+        "B_Fab",
+        "F_Fab",
+    )
+    + tuple(f"User_{ii}" for ii in range(1, 10))
+)
+
+ARC_DTYPE = np.dtype(
+    [
+        ("layer", "u1"),
+        ("cx", "i8"),
+        ("cy", "i8"),
+        ("sx", "i8"),
+        ("sy", "i8"),
+        ("ex", "i8"),  # End point, the start rotated by `angle` around the center
+        ("ey", "i8"),
+        ("angle", "f8"),  # Degrees, same sign convention as pcbnew.EDA_ANGLE
+        ("width", "i8"),
+    ]
+)
+LINE_DTYPE = np.dtype(
+    [
+        ("layer", "u1"),
+        ("x1", "i8"),
+        ("y1", "i8"),
+        ("x2", "i8"),
+        ("y2", "i8"),
+        ("width", "i8"),
+    ]
+)
+CIRCLE_DTYPE = np.dtype(
+    [
+        ("layer", "u1"),
+        ("cx", "i8"),
+        ("cy", "i8"),
+        ("r", "i8"),
+        ("width", "i8"),
+    ]
+)
+PAD_DTYPE = np.dtype(
+    [
+        ("number", "i4"),
+        ("x", "i8"),
+        ("y", "i8"),
+        ("diameter", "i8"),
+        ("drill", "i8"),
+        ("via", "?"),
+    ]
+)
+
+ID2L_DEFAULTS = {
+    "Coil specs": {
+        "Total Turns": 15,
+        "First Layer": "F_Cu",
+        "Second Layer": "B_Cu",
+        "Direction": True,
+    },
+    "Install Info": {
+        "Inside Diameter, Radius": 30000000,
+        "Inner Ring gap": 500000,
+    },
+    "Fab Specs": {
+        "Trace Width": 200000,
+        "Trace Spacing": 200000,
+        "Via Drill": 300000,
+        "Via Annular Ring": 150000,
+        "Pad Drill": 500000,
+        "Pad Annular Ring": 200000,
+        "Copper Thickness (Oz.Cu.)": 1,
+        "Layer Spacing": 1510000,
+        "Dielectric Constant": DIELECTRIC_CONSTANT,
+    },
+}
+
+IDNL_DEFAULTS = {
+    "Coil specs": {
+        "Turns per Layer": 8,
+        "Layers": "F_Cu,In1_Cu,In2_Cu,B_Cu",
+        "Direction": True,
+    },
+    "Install Info": {
+        "Inside Diameter, Radius": 30000000,
+        "Inner Ring gap": 500000,
+    },
+    "Fab Specs": {
+        "Trace Width": 200000,
+        "Trace Spacing": 200000,
+        "Via Drill": 300000,
+        "Via Annular Ring": 150000,
+        "Pad Drill": 500000,
+        "Pad Annular Ring": 200000,
+        "Copper Thickness (Oz.Cu.)": 1,
+        "Layer Spacing": 200000,
+        "Dielectric Constant": DIELECTRIC_CONSTANT,
+    },
+}
+
+L1T_DEFAULTS = {
+    "Coil specs": {"Stub Length": 5000000, "Layer": "F_Cu", "Direction": True},
+    "Install Info": {"Radius": 30000000},
+    "Fab Specs": {
+        "Trace Width": 200000,
+        "Trace Spacing": 200000,
+        "Pad Drill": 500000,
+        "Pad Annular Ring": 200000,
+        "Copper Thickness (Oz.Cu.)": 1,
+    },
+}
+
+FLUX_NEUTRAL_DEFAULTS = {
+    "Coil specs": {
+        "Turns": 5,
+        "Minimum Radius": 1000000,
+        "Stub Length": 5000000,
+        "First Layer": "F_Cu",
+        "Second Layer": "In1_Cu",
+    },
+    "Install Info": {"Outer Ring radius": 75000000, "Outer Ring gap": 2000000},
+    "Fab Specs": {
+        "Trace Width": 200000,
+        "Trace Spacing": 200000,
+        "Via Drill": 254000,
+        "Via Annular Ring": 127000,
+        "Pad Drill": 500000,
+        "Pad Annular Ring": 200000,
+        "Copper Thickness (Oz.Cu.)": 1,
+        "Layer Spacing": 100000,
+        "Dielectric Constant": DIELECTRIC_CONSTANT,
+    },
+}
+
+
+def LayerCode(name):
+    """Convert a layer name such as 'F_Cu' into its layer code."""
+    try:
+        return LAYER_NAMES.index(name)
+    except ValueError:
+        raise ValueError(f"Unknown layer name: {name}") from None
+
+
+def ToIU(values):
+    """
+    Convert coordinates to integer KiCAD internal units, rounding half away
+    from zero like KiROUND.  This is the only place where the generators'
+    float geometry is rounded: two ends computed to meet in floating point
+    land on the same nanometer, where truncation splits values a hair either
+    side of an integer by 1 nm.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    return (np.sign(values) * np.floor(np.abs(values) + 0.5)).astype(np.int64)
+
+
+def IsCopper(layers):
+    """True for copper layer codes (F_Cu, In1_Cu .. In30_Cu, B_Cu)."""
+    return np.asarray(layers) <= LayerCode("B_Cu")
+
+
+def GetResistance(trace_length, trace_width, copper_thickness):
+    """DC resistance (Ohms) of a trace, lengths in KiCAD internal units."""
+    return (
+        RHO
+        * (trace_length / 1e9)
+        / (TRACE_THICKNESS_1OZ * copper_thickness * trace_width / 1e9)
+    )
+
+
+def ViaResistance(drill, barrel_length, plating=VIA_PLATING_THICKNESS):
+    """
+    DC resistance (Ohms) of plated via barrels, lengths in KiCAD internal
+    units.  The barrel is a copper tube of wall thickness `plating` lining the
+    drilled hole.
+    """
+    drill = np.asarray(drill, dtype=np.float64)
+    inner = np.maximum(drill - 2 * plating, 0)
+    area = math.pi / 4 * (drill**2 - inner**2) / 1e18
+    return RHO * (barrel_length / 1e9) / area
+
+
+def AdjustResistance(resistance, temperature):
+    """Copper resistance at `temperature` (C), from its REFERENCE_TEMPERATURE value."""
+    return resistance * (
+        1 + COPPER_TEMPERATURE_COEFFICIENT * (temperature - REFERENCE_TEMPERATURE)
+    )
+
+
+def ArcLengths(arcs):
+    """Length of each arc of an ARC_DTYPE table (nm)."""
+    radius = np.hypot(arcs["sx"] - arcs["cx"], arcs["sy"] - arcs["cy"])
+    return radius * np.radians(np.abs(arcs["angle"]))
+
+
+def LineLengths(lines):
+    """Length of each line of a LINE_DTYPE table (nm)."""
+    return np.hypot(lines["x2"] - lines["x1"], lines["y2"] - lines["y1"])
+
+
+class CoilGeometry:
+    """
+    Primitive tables for one generated coil.
+
+    `arcs`, `lines`, `circles` and `pads` are NumPy structured arrays (see the
+    *_DTYPE definitions above), and `texts` is a list of (layer code, string).
+    `fields` holds the placement of the footprint's "Value" and "Reference"
+    fields as (layer code, x, y, size, thickness), if the generator sets them.
+    `resistance` is the DC resistance in Ohms (at REFERENCE_TEMPERATURE) and
+    `inductance` the estimated inductance in Henries, for generators that
+    compute them.  The trace length is measured from the copper primitives.
+    `turns` maps "arcs" and "lines" to the turn index of each of their rows
+    (NO_TURN outside of the windings), used to draw a Preview().
+    """
+
+    def __init__(
+        self,
+        arcs,
+        lines,
+        circles,
+        pads,
+        texts,
+        fields=None,
+        resistance=None,
+        inductance=None,
+        turns=None,
+    ):
+        self.arcs = arcs
+        self.lines = lines
+        self.circles = circles
+        self.pads = pads
+        self.texts = texts
+        self.fields = fields or {}
+        self.resistance = resistance
+        self.inductance = inductance
+        self.turns = turns or {
+            "arcs": np.full(len(arcs), NO_TURN, dtype=np.int32),
+            "lines": np.full(len(lines), NO_TURN, dtype=np.int32),
+        }
+
+    @property
+    def vias(self):
+        return int(np.count_nonzero(self.pads["via"]))
+
+    def CopperTraces(self):
+        """(layer, length, width) arrays of every copper arc and line."""
+        arcs = self.arcs[IsCopper(self.arcs["layer"])]
+        lines = self.lines[IsCopper(self.lines["layer"])]
+        return (
+            np.concatenate((arcs["layer"], lines["layer"])),
+            np.concatenate((ArcLengths(arcs), LineLengths(lines))),
+            np.concatenate((arcs["width"], lines["width"])),
+        )
+
+    @property
+    def trace_length(self):
+        """Total length (nm) of the copper traces."""
+        return float(np.sum(self.CopperTraces()[1]))
+
+    def CopperRadius(self):
+        """
+        Distance (nm) from the footprint origin to the farthest copper, pads
+        included.  Arcs count with the farthest point of their sweep.
+        """
+        arcs = self.arcs[IsCopper(self.arcs["layer"])]
+        lines = self.lines[IsCopper(self.lines["layer"])]
+        pads = self.pads
+
+        cx, cy = arcs["cx"].astype(np.float64), arcs["cy"].astype(np.float64)
+        radius = np.hypot(arcs["sx"] - cx, arcs["sy"] - cy)
+        start = np.arctan2(arcs["sy"] - cy, arcs["sx"] - cx)
+        sweep = np.radians(arcs["angle"])
+        end = start + sweep
+        # The point of the circle farthest from the origin, if the arc gets there
+        away = np.arctan2(cy, cx)
+        reached = np.mod((away - start) * np.sign(sweep), 2 * np.pi) <= np.abs(sweep)
+        ends = np.maximum(
+            np.hypot(arcs["sx"], arcs["sy"]),
+            np.hypot(cx + radius * np.cos(end), cy + radius * np.sin(end)),
+        )
+        far = [
+            np.where(reached, np.hypot(cx, cy) + radius, ends) + arcs["width"] / 2,
+            np.maximum(
+                np.hypot(lines["x1"], lines["y1"]), np.hypot(lines["x2"], lines["y2"])
+            )
+            + lines["width"] / 2,
+            np.hypot(pads["x"], pads["y"]) + pads["diameter"] / 2,
+        ]
+        return float(np.max(np.concatenate(far), initial=0))
+
+    def LayerLengths(self):
+        """Trace length (nm) per copper layer name."""
+        layer, length, _ = self.CopperTraces()
+        totals = np.bincount(layer, weights=length, minlength=len(LAYER_NAMES))
+        return {LAYER_NAMES[code]: float(totals[code]) for code in np.unique(layer)}
+
+    def Save(self, file):
+        """Write the tables and scalars to an uncompressed .npz file."""
+        meta = {
+            "texts": self.texts,
+            "fields": self.fields,
+            "resistance": self.resistance,
+            "inductance": self.inductance,
+        }
+        np.savez(
+            file,
+            arcs=self.arcs,
+            lines=self.lines,
+            circles=self.circles,
+            pads=self.pads,
+            arc_turns=self.turns["arcs"],
+            line_turns=self.turns["lines"],
+            meta=np.array(json.dumps(meta)),
+        )
+
+    @classmethod
+    def Load(cls, file):
+        with np.load(file) as data:
+            meta = json.loads(str(data["meta"]))
+            return cls(
+                data["arcs"],
+                data["lines"],
+                data["circles"],
+                data["pads"],
+                [tuple(text) for text in meta["texts"]],
+                {name: tuple(field) for name, field in meta["fields"].items()},
+                meta["resistance"],
+                meta["inductance"],
+                {"arcs": data["arc_turns"], "lines": data["line_turns"]},
+            )
+
+    def TurnIndices(self):
+        """The distinct turn indices of the tagged windings, sorted."""
+        turns = np.unique(np.concatenate(list(self.turns.values())))
+        return turns[turns != NO_TURN]
+
+    def TurnCount(self):
+        return len(self.TurnIndices())
+
+    def Preview(self, max_turns):
+        """
+        A simplified copy for drawing coils with many turns: the innermost and
+        outermost turns plus every k-th turn in between, at most `max_turns`
+        of them, with everything that is not part of a winding (tails, pads,
+        vias, texts).  Returns the coil itself if it has no more turns than
+        that.  The resistance and inductance stay the ones of the full coil.
+        """
+        indices = self.TurnIndices()
+        if len(indices) <= max_turns:
+            return self
+
+        step = math.ceil(len(indices) / max(max_turns - 2, 1))
+        first, last = indices[0], indices[-1]
+
+        def Keep(turns):
+            return (
+                (turns == NO_TURN)
+                | (turns == first)
+                | (turns == last)
+                | ((turns - first) % step == 0)
+            )
+
+        keep = {name: Keep(turns) for name, turns in self.turns.items()}
+        return CoilGeometry(
+            self.arcs[keep["arcs"]],
+            self.lines[keep["lines"]],
+            self.circles,
+            self.pads,
+            self.texts,
+            self.fields,
+            self.resistance,
+            self.inductance,
+            {name: turns[keep[name]] for name, turns in self.turns.items()},
+        )
+
+    def Digest(self):
+        """
+        SHA-256 (hex) of the primitive tables, turn tags, texts and fields.
+        The tables are integers, so equal coils have equal digests on every
+        platform.
+        """
+        digest = hashlib.sha256()
+        for table in (self.arcs, self.lines, self.circles, self.pads):
+            digest.update(table.dtype.str.encode() + table.tobytes())
+        for turns in self.turns.values():
+            digest.update(np.asarray(turns, dtype="<i4").tobytes())
+        digest.update(json.dumps([self.texts, self.fields]).encode())
+        return digest.hexdigest()
+
+    def PrimitiveCount(self):
+        return (
+            len(self.arcs)
+            + len(self.lines)
+            + len(self.circles)
+            + len(self.pads)
+            + len(self.texts)
+        )
+
+
+class GeometryBuilder:
+    """
+    Collects primitives into tables.  Mirrors the FootprintWizardDrawingAids
+    calls the generators used to make, but every coordinate argument may also
+    be a NumPy array to add a whole block of primitives at once.
+    """
+
+    def __init__(self):
+        self.layer = LayerCode("F_SilkS")
+        self.line_thickness = DEFAULT_LINE_THICKNESS
+        self.resistance = None
+        self.inductance = None
+        self.texts = []
+        self.fields = {}
+        self._arcs = []
+        self._lines = []
+        self._circles = []
+        self._pads = []
+        self._turns = {"arcs": [], "lines": []}
+
+    def SetLayer(self, layer):
+        self.layer = layer
+
+    def SetLineThickness(self, thickness):
+        self.line_thickness = thickness
+
+    def _Table(self, dtype, layer, **columns):
+        columns = dict(zip(columns, np.broadcast_arrays(*columns.values())))
+        table = np.empty(np.size(next(iter(columns.values()))), dtype=dtype)
+        for name, values in columns.items():
+            table[name] = np.ravel(values)
+        if layer is not None:
+            table["layer"] = self.layer if layer is True else np.ravel(layer)
+        if "width" in dtype.names:
+            table["width"] = self.line_thickness
+        return table
+
+    def _Turns(self, table, turn):
+        """Turn index per row of a table, see CoilGeometry.Preview()."""
+        return np.broadcast_to(np.asarray(turn, dtype=np.int32), len(table)).copy()
+
+    def Arc(self, cx, cy, sx, sy, angle, layer=True, turn=NO_TURN):
+        """
+        Add arcs.  `angle` is in degrees.  The end point is worked out before
+        any rounding, so it meets what the next primitive starts from.
+        """
+        cx, cy, sx, sy, angle = (
+            np.asarray(value, dtype=np.float64) for value in (cx, cy, sx, sy, angle)
+        )
+        cos, sin = np.cos(np.radians(angle)), np.sin(np.radians(angle))
+        table = self._Table(
+            ARC_DTYPE,
+            layer,
+            cx=ToIU(cx),
+            cy=ToIU(cy),
+            sx=ToIU(sx),
+            sy=ToIU(sy),
+            ex=ToIU(cx + (sx - cx) * cos - (sy - cy) * sin),
+            ey=ToIU(cy + (sx - cx) * sin + (sy - cy) * cos),
+            angle=angle,
+        )
+        self._arcs.append(table)
+        self._turns["arcs"].append(self._Turns(table, turn))
+
+    def Line(self, x1, y1, x2, y2, layer=True, turn=NO_TURN):
+        table = self._Table(
+            LINE_DTYPE,
+            layer,
+            x1=ToIU(x1),
+            y1=ToIU(y1),
+            x2=ToIU(x2),
+            y2=ToIU(y2),
+        )
+        self._lines.append(table)
+        self._turns["lines"].append(self._Turns(table, turn))
+
+    def Circle(self, cx, cy, r, layer=True):
+        self._circles.append(
+            self._Table(CIRCLE_DTYPE, layer, cx=ToIU(cx), cy=ToIU(cy), r=ToIU(r))
+        )
+
+    def Pad(self, number, x, y, diameter, drill, via=False):
+        self._pads.append(
+            self._Table(
+                PAD_DTYPE,
+                None,
+                number=np.asarray(number),
+                x=ToIU(x),
+                y=ToIU(y),
+                diameter=ToIU(diameter),
+                drill=ToIU(drill),
+                via=np.asarray(via),
+            )
+        )
+
+    def Text(self, text, layer):
+        self.texts.append((layer, text))
+
+    def Value(self, x, y, size):
+        x, y = int(ToIU(x)), int(ToIU(y))
+        self.fields["Value"] = (self.layer, x, y, size, self.line_thickness)
+
+    def Reference(self, x, y, size):
+        x, y = int(ToIU(x)), int(ToIU(y))
+        self.fields["Reference"] = (self.layer, x, y, size, self.line_thickness)
+
+    def ArcsYSym2Layer(
+        self, layer1, layer2, center_x, start_x, degrees, cw_multiplier, turn=NO_TURN
+    ):
+        """
+        Add a pair of arcs mirrored around the X axis, one per layer.  Used to
+        build the 2 layer circular coils.
+        """
+        self.Arc(
+            center_x, 0, start_x, 0, -degrees * cw_multiplier, layer=layer1, turn=turn
+        )
+        self.Arc(
+            center_x, 0, start_x, 0, degrees * cw_multiplier, layer=layer2, turn=turn
+        )
+
+    def Build(self):
+        return CoilGeometry(
+            self._Concatenate(self._arcs, ARC_DTYPE),
+            self._Concatenate(self._lines, LINE_DTYPE),
+            self._Concatenate(self._circles, CIRCLE_DTYPE),
+            self._Concatenate(self._pads, PAD_DTYPE),
+            list(self.texts),
+            dict(self.fields),
+            self.resistance,
+            self.inductance,
+            {
+                name: self._Concatenate(turns, np.int32)
+                for name, turns in self._turns.items()
+            },
+        )
+
+    @staticmethod
+    def _Concatenate(tables, dtype):
+        if not tables:
+            return np.empty(0, dtype=dtype)
+        return np.concatenate(tables)
+
+
+class GeometryGroup:
+    """
+    A block of primitives that only needs rebuilding when one of the
+    `parameters` ((page, name) pairs) or one of the `groups` it depends on
+    changes.
+
+    `build(parameters, groups, state)` returns the block as a CoilGeometry.
+    `groups` maps the names of the groups it depends on to their blocks, and
+    `state` is a dictionary the group may keep between rebuilds.
+    """
+
+    def __init__(self, name, parameters, build, groups=()):
+        self.name = name
+        self.parameters = parameters
+        self.build = build
+        self.groups = groups
+
+
+def Combine(blocks):
+    """Join the blocks of a generator's groups into one CoilGeometry."""
+    blocks = list(blocks)
+    fields = {}
+    for block in blocks:
+        fields.update(block.fields)
+    resistances = [b.resistance for b in blocks if b.resistance is not None]
+    inductances = [b.inductance for b in blocks if b.inductance is not None]
+    return CoilGeometry(
+        np.concatenate([b.arcs for b in blocks]),
+        np.concatenate([b.lines for b in blocks]),
+        np.concatenate([b.circles for b in blocks]),
+        np.concatenate([b.pads for b in blocks]),
+        [text for b in blocks for text in b.texts],
+        fields,
+        resistances[0] if resistances else None,
+        inductances[0] if inductances else None,
+        {
+            name: np.concatenate([b.turns[name] for b in blocks])
+            for name in ("arcs", "lines")
+        },
+    )
+
+
+class TraceReport:
+    """
+    Length and DC resistance accounting of a coil's copper.
+
+    Every copper arc and line counts towards the per layer `layer_lengths`
+    (nm) and `trace_resistance`, each at its own width.  Every via adds the
+    resistance of a barrel `barrel_length` long.  Resistances are in Ohms at
+    REFERENCE_TEMPERATURE; ResistanceAt() gives them at other temperatures.
+    """
+
+    def __init__(self, coil, copper_thickness=1, barrel_length=0):
+        _, length, width = coil.CopperTraces()
+        vias = coil.pads[coil.pads["via"]]
+
+        self.layer_lengths = coil.LayerLengths()
+        self.trace_length = float(np.sum(length))
+        self.vias = len(vias)
+        self.trace_resistance = float(
+            np.sum(GetResistance(length, width, copper_thickness))
+        )
+        self.via_resistance = float(np.sum(ViaResistance(vias["drill"], barrel_length)))
+        self.resistance = self.trace_resistance + self.via_resistance
+
+    def ResistanceAt(self, temperature):
+        return AdjustResistance(self.resistance, temperature)
+
+    def Text(self):
+        """Per layer lengths and vias, for the Fab text."""
+        lengths = ", ".join(
+            f"{layer} {length / 1e6:.1f}"
+            for layer, length in self.layer_lengths.items()
+        )
+        return (
+            f"Length: {lengths}\n"
+            f"Vias: {self.vias} ({self.via_resistance * 1e3:.3f} mOhms)\n"
+        )
+
+    def Summary(self, temperature=REFERENCE_TEMPERATURE):
+        """The report as a JSON friendly dictionary, lengths in mm."""
+        return {
+            "trace_length_mm": self.trace_length / 1e6,
+            "layer_lengths_mm": {
+                layer: length / 1e6 for layer, length in self.layer_lengths.items()
+            },
+            "vias": self.vias,
+            "trace_resistance_ohms": self.trace_resistance,
+            "via_resistance_ohms": self.via_resistance,
+            "resistance_ohms": self.resistance,
+            "temperature_c": temperature,
+            "resistance_at_temperature_ohms": self.ResistanceAt(temperature),
+        }
+
+
+def BarrelLength(layer_spacing, copper_thickness):
+    """
+    Via barrel length (nm) between two adjacent layers `layer_spacing` apart,
+    taken from the middle of one copper layer to the middle of the other.
+    """
+    return layer_spacing + TRACE_THICKNESS_1OZ * copper_thickness * 1e9
+
+
+class IncrementalBuilder:
+    """
+    Builds a generator's geometry group by group, and on later builds only
+    recomputes the groups whose dependencies changed.  `rebuilt` lists the
+    groups recomputed by the last Build().
+    """
+
+    def __init__(self, generator):
+        self.generator = generator
+        self.groups = GROUPS[generator]
+        self.rebuilt = []
+        self._blocks = {}  # name -> (dependency key, revision, block)
+        self._state = {group.name: {} for group in self.groups}
+        self._revision = 0
+
+    def Build(self, parameters):
+        parameters = MergeDefaults(self.generator, parameters)
+        self.rebuilt = []
+        blocks = {}
+        for group in self.groups:
+            key = tuple(parameters[page][name] for page, name in group.parameters)
+            key += tuple(self._blocks[name][1] for name in group.groups)
+
+            built = self._blocks.get(group.name)
+            if built is None or built[0] != key:
+                self._revision += 1
+                block = group.build(
+                    parameters,
+                    {name: blocks[name] for name in group.groups},
+                    self._state[group.name],
+                )
+                built = (key, self._revision, block)
+                self._blocks[group.name] = built
+                self.rebuilt.append(group.name)
+            blocks[group.name] = built[2]
+        return Combine(blocks.values())
+
+
+def Outline(parameters, radius_parameter):
+    """Reference circle on User_1 plus the Value/Reference fields."""
+    draw = GeometryBuilder()
+    draw.SetLayer(LayerCode("User_1"))
+    draw.Circle(0, 0, parameters["Install Info"][radius_parameter])
+
+    draw.SetLayer(LayerCode("F_Fab"))
+    draw.Value(0, 0, 1000000)
+    draw.SetLayer(LayerCode("F_SilkS"))
+    draw.Reference(0, 0, 1000000)
+    return draw.Build()
+
+
+"""
+CoilGeneratorID2L
+"""
+
+
+class ID2LDimensions:
+    """Values derived from the CoilGeneratorID2L parameters."""
+
+    def __init__(self, parameters):
+        self.aperture_r = parameters["Install Info"]["Inside Diameter, Radius"]
+        self.aperture_gap = parameters["Install Info"]["Inner Ring gap"]
+
+        self.trace_width = parameters["Fab Specs"]["Trace Width"]
+        self.trace_space = parameters["Fab Specs"]["Trace Spacing"]
+        self.via_hole = parameters["Fab Specs"]["Via Drill"]
+        self.via_ann_ring = parameters["Fab Specs"]["Via Annular Ring"]
+        self.pad_hole = parameters["Fab Specs"]["Pad Drill"]
+        self.pad_ann_ring = parameters["Fab Specs"]["Pad Annular Ring"]
+        self.copper_thickness = parameters["Fab Specs"]["Copper Thickness (Oz.Cu.)"]
+        self.layer_spacing = parameters["Fab Specs"]["Layer Spacing"]
+        self.permittivity = parameters["Fab Specs"]["Dielectric Constant"]
+
+        self.turns = parameters["Coil specs"]["Total Turns"]
+        self.first_layer = LayerCode(parameters["Coil specs"]["First Layer"])
+        self.second_layer = LayerCode(parameters["Coil specs"]["Second Layer"])
+        self.clockwise_bool = parameters["Coil specs"]["Direction"]
+
+        self.odd_loops = (self.turns % 2) == 1
+        self.odd_loops_multiplier = -1 if self.odd_loops else 1
+        self.cw_multiplier = 1 if self.clockwise_bool else -1
+
+        self.via_d = self.via_ann_ring * 2 + self.via_hole
+        self.pad_d = self.pad_ann_ring * 2 + self.pad_hole
+
+        # Set the arc origins
+        self.del_o_1 = max(self.via_d, self.trace_width) / 2 - self.trace_width / 2
+        self.del_o_2 = max(self.via_d, self.trace_width) / 2 + self.trace_space / 2
+
+        # Start of the tail, just outside of the last winding
+        self.tail_start_x = (
+            self.aperture_r
+            + self.aperture_gap
+            + (
+                self.trace_width
+                if self.odd_loops
+                else max(self.via_d, self.trace_width)
+            )
+            + (self.turns // 2) * (self.trace_space + self.trace_width)
+            - self.trace_width / 2
+        )
+        self.tail_center_x = self.tail_start_x + max(self.via_d, self.trace_width) * 2
+
+
+def ID2LInductance(parameters, model=inductance.DEFAULT_MODEL):
+    """
+    Estimated inductance (Henries) of a CoilGeneratorID2L.  Each layer is a
+    spiral of half the turns; the two are stacked `Layer Spacing` apart.
+    Parameter values may be NumPy arrays to evaluate many designs at once.
+    """
+    turns = np.asarray(parameters["Coil specs"]["Total Turns"])
+    r_in = (
+        parameters["Install Info"]["Inside Diameter, Radius"]
+        + parameters["Install Info"]["Inner Ring gap"]
+    )
+    w = parameters["Fab Specs"]["Trace Width"]
+    s = parameters["Fab Specs"]["Trace Spacing"]
+    via_d = 2 * parameters["Fab Specs"]["Via Annular Ring"] + (
+        parameters["Fab Specs"]["Via Drill"]
+    )
+    r_out = r_in + np.maximum(via_d, w) / 2 + (turns - 1) / 2 * (w + s) + w / 2
+
+    return inductance.StackedSpiralInductance(
+        turns / 2,
+        2 * r_out / 1e9,
+        2 * r_in / 1e9,
+        w / 1e9,
+        s / 1e9,
+        parameters["Fab Specs"]["Layer Spacing"] / 1e9,
+        TRACE_THICKNESS_1OZ * parameters["Fab Specs"]["Copper Thickness (Oz.Cu.)"],
+        model,
+    )
+
+
+ID2L_WINDING_PARAMETERS = [
+    ("Install Info", "Inside Diameter, Radius"),
+    ("Install Info", "Inner Ring gap"),
+    ("Fab Specs", "Trace Width"),
+    ("Fab Specs", "Trace Spacing"),
+    ("Fab Specs", "Via Drill"),
+    ("Fab Specs", "Via Annular Ring"),
+]
+
+
+def ID2LWindings(parameters, groups, state):
+    """
+    The half turn arcs of both layers.
+
+    The arcs are kept between builds for the odd_loops_multiplier = 1
+    orientation, so changing `Total Turns` only computes the arcs of the new
+    turns (changing its parity mirrors the coil around the Y axis).
+    """
+    d = ID2LDimensions(parameters)
+
+    key = tuple(parameters[page][name] for page, name in ID2L_WINDING_PARAMETERS)
+    if state.get("key") != key:
+        state.update(
+            key=key,
+            center_x=np.empty(0),
+            start_x=np.empty(0),
+        )
+
+    built = len(state["center_x"])
+    if built < d.turns:
+        ii = np.arange(built, d.turns)
+        odd = (ii % 2) == 1
+        center_x = np.where(odd, d.del_o_2, d.del_o_1)
+        start_x = np.where(
+            odd,
+            -(
+                d.aperture_r
+                + d.aperture_gap
+                + (ii / 2) * (d.trace_width + d.trace_space)
+                - 0.5 * d.trace_space
+            ),
+            d.aperture_r
+            + d.aperture_gap
+            + max(d.via_d, d.trace_width)
+            + (ii / 2) * (d.trace_width + d.trace_space)
+            - 0.5 * d.trace_width,
+        )
+        if built == 0:
+            # The first winding starts at the via
+            center_x[0] = d.del_o_1 / 2
+            start_x[0] = d.aperture_r + d.aperture_gap + max(d.via_d, d.trace_width) / 2
+        state["center_x"] = np.concatenate((state["center_x"], center_x))
+        state["start_x"] = np.concatenate((state["start_x"], start_x))
+
+    draw = GeometryBuilder()
+    draw.SetLineThickness(d.trace_width)
+    draw.ArcsYSym2Layer(
+        d.first_layer,
+        d.second_layer,
+        state["center_x"][: d.turns] * d.odd_loops_multiplier,
+        state["start_x"][: d.turns] * d.odd_loops_multiplier,
+        180,
+        d.cw_multiplier,
+        turn=np.arange(d.turns),
+    )
+    return draw.Build()
+
+
+def ID2LTail(parameters, groups, state):
+    """Finish the inductor with nice tails to the pads."""
+    d = ID2LDimensions(parameters)
+    draw = GeometryBuilder()
+    draw.SetLineThickness(d.trace_width)
+    draw.ArcsYSym2Layer(
+        d.first_layer,
+        d.second_layer,
+        d.tail_center_x,
+        d.tail_start_x,
+        -90,
+        d.cw_multiplier,
+    )
+    return draw.Build()
+
+
+def ID2LPads(parameters, groups, state):
+    """The starting via between the layers and the two pads."""
+    d = ID2LDimensions(parameters)
+    draw = GeometryBuilder()
+    draw.Pad(
+        3,
+        (d.aperture_r + d.aperture_gap + max(d.via_d, d.trace_width) / 2)
+        * d.odd_loops_multiplier,
+        0,
+        d.via_d,
+        d.via_hole,
+        via=True,
+    )
+    draw.Pad(
+        1,
+        d.tail_center_x,
+        -max(d.via_d, d.trace_width) * 2 * d.cw_multiplier,
+        d.pad_d,
+        d.pad_hole,
+    )
+    draw.Pad(
+        2,
+        d.tail_center_x,
+        max(d.via_d, d.trace_width) * 2 * d.cw_multiplier,
+        d.pad_d,
+        d.pad_hole,
+    )
+    return draw.Build()
+
+
+def ID2LText(parameters, groups, state):
+    d = ID2LDimensions(parameters)
+    draw = GeometryBuilder()
+    draw.inductance = float(ID2LInductance(parameters))
+    report = TraceReport(
+        Combine(groups.values()),
+        d.copper_thickness,
+        BarrelLength(d.layer_spacing, d.copper_thickness),
+    )
+    draw.resistance = report.resistance
+    parasitics = capacitance.CapacitanceReport(
+        Combine(groups.values()),
+        draw.inductance,
+        d.trace_space,
+        d.layer_spacing,
+        d.permittivity,
+    )
+
+    """
+    Capture the parameters in the Fab layer
+    """
+    fab_text_s = (
+        f"Coil Generator from ID, 2 Layers\n"
+        f'Direction: {"CW" if d.clockwise_bool else "CCW"}\n'
+        f"Inner Radius: {d.aperture_r/1e6}\n"
+        f"Inner Ring Gap: {d.aperture_gap/1e6}\n"
+        f"Turns: {d.turns}\n"
+        f'Layers (Start->Finish): {parameters["Coil specs"]["First Layer"]}->{parameters["Coil specs"]["Second Layer"]}\n'
+        f"Trace Width/space: {d.trace_width/1e6}/{d.trace_space/1e6}\n"
+        f"Via Drill/annular ring: {d.via_hole/1e6}/{d.via_ann_ring/1e6}\n"
+        f"Pad Drill/annular ring: {d.pad_hole/1e6}/{d.pad_ann_ring/1e6}\n"
+        f"Layer Spacing: {d.layer_spacing/1e6}\n"
+        f"L ({inductance.DEFAULT_MODEL}): {draw.inductance * 1e6:.3f} uH\n"
+        f"{parasitics.Text()}"
+        f"{report.Text()}"
+    )
+    draw.Text(fab_text_s, LayerCode("User_2"))
+
+    """
+    Capture the basic parameters in the Silk layer
+    """
+    basic_fab_text_s = (
+        f"Turns: {d.turns}\n"
+        f"R(@25C & {d.copper_thickness:.1f} Oz Cu): {draw.resistance:.4f} Ohms\n"
+        f"{parasitics.Text()}"
+        f"L: {draw.inductance * 1e6:.3f} uH\n"
+    )
+    draw.Text(basic_fab_text_s, LayerCode("F_SilkS"))
+    return draw.Build()
+
+
+ID2L_COIL_PARAMETERS = ID2L_WINDING_PARAMETERS + [
+    ("Coil specs", "Total Turns"),
+    ("Coil specs", "First Layer"),
+    ("Coil specs", "Second Layer"),
+    ("Coil specs", "Direction"),
+]
+
+ID2L_GROUPS = [
+    GeometryGroup(
+        "outline",
+        [("Install Info", "Inside Diameter, Radius")],
+        lambda parameters, groups, state: Outline(
+            parameters, "Inside Diameter, Radius"
+        ),
+    ),
+    GeometryGroup("windings", ID2L_COIL_PARAMETERS, ID2LWindings),
+    GeometryGroup("tail", ID2L_COIL_PARAMETERS, ID2LTail),
+    GeometryGroup(
+        "pads",
+        ID2L_COIL_PARAMETERS
+        + [("Fab Specs", "Pad Drill"), ("Fab Specs", "Pad Annular Ring")],
+        ID2LPads,
+    ),
+    GeometryGroup(
+        "text",
+        [(page, name) for page in ID2L_DEFAULTS for name in ID2L_DEFAULTS[page]],
+        ID2LText,
+        groups=("windings", "tail", "pads"),
+    ),
+]
+
+
+"""
+CoilGeneratorIDNL
+"""
+
+
+def LayerList(text):
+    """Layer codes of a comma separated list of layer names."""
+    return [LayerCode(name.strip()) for name in text.split(",")]
+
+
+def StaggerAngle(radius, diameter, trace_width, trace_space):
+    """
+    Smallest angle (radians) for which vias or pads of `diameter` on a ring
+    of `radius`, spaced twice that angle apart, clear each other and the
+    radial leads of their neighbours.
+    """
+    chord = (diameter + trace_space) / (2 * radius)
+    lead = ((diameter + trace_width) / 2 + trace_space) / radius
+    if chord > 1 or lead > 1:
+        raise ValueError("The vias do not fit around the aperture")
+    return max(math.asin(chord), math.asin(lead) / 2)
+
+
+class IDNLDimensions:
+    """
+    Values derived from the CoilGeneratorIDNL parameters.
+
+    Every layer carries the same spiral of half turn arcs from `start_r` out
+    to `end_r`, plus a part turn that ends `stagger` radians further round.
+    Layer 2k is that spiral rotated by -2k * `stagger` and layer 2k + 1 its
+    mirror image, rotated the same way: the two meet at an inner via, and
+    the outer end of layer 2k + 1 meets the one of layer 2k + 2 at an outer
+    via.  The inner vias sit on a ring at `inner_r` inside the windings, the
+    outer vias and the pads on a ring at `outer_r` outside of them, each at
+    its own angle, so no via lands on the copper of another layer.
+    """
+
+    def __init__(self, parameters):
+        self.aperture_r = parameters["Install Info"]["Inside Diameter, Radius"]
+        self.aperture_gap = parameters["Install Info"]["Inner Ring gap"]
+
+        self.trace_width = parameters["Fab Specs"]["Trace Width"]
+        self.trace_space = parameters["Fab Specs"]["Trace Spacing"]
+        self.via_hole = parameters["Fab Specs"]["Via Drill"]
+        self.via_ann_ring = parameters["Fab Specs"]["Via Annular Ring"]
+        self.pad_hole = parameters["Fab Specs"]["Pad Drill"]
+        self.pad_ann_ring = parameters["Fab Specs"]["Pad Annular Ring"]
+        self.copper_thickness = parameters["Fab Specs"]["Copper Thickness (Oz.Cu.)"]
+        self.layer_spacing = parameters["Fab Specs"]["Layer Spacing"]
+        self.permittivity = parameters["Fab Specs"]["Dielectric Constant"]
+
+        self.turns = parameters["Coil specs"]["Turns per Layer"]
+        self.layer_names = [
+            name.strip() for name in parameters["Coil specs"]["Layers"].split(",")
+        ]
+        self.layers = LayerList(parameters["Coil specs"]["Layers"])
+        self.clockwise_bool = parameters["Coil specs"]["Direction"]
+
+        count = len(self.layers)
+        if count < 2 or count % 2:
+            raise ValueError(f"The stack needs an even number of layers, not {count}")
+        if len(set(self.layers)) != count:
+            raise ValueError("Every layer of the stack must be a different one")
+
+        self.via_d = self.via_ann_ring * 2 + self.via_hole
+        self.pad_d = self.pad_ann_ring * 2 + self.pad_hole
+        self.pitch = self.trace_width + self.trace_space
+
+        self.inner_r = self.aperture_r + self.aperture_gap + self.via_d / 2
+        self.start_r = (
+            self.inner_r + self.via_d / 2 + self.trace_space + self.trace_width / 2
+        )
+        self.end_r = self.start_r + self.turns * self.pitch
+        # The part turn stays within half a pitch outside of end_r
+        terminal_d = max(self.via_d, self.pad_d)
+        self.outer_r = (
+            self.end_r
+            + self.pitch / 2
+            + self.trace_width / 2
+            + self.trace_space
+            + terminal_d / 2
+        )
+
+        # Sweep of the part turn around its center, and the angle it reaches
+        # around the origin
+        self.part = max(
+            StaggerAngle(self.inner_r, self.via_d, self.trace_width, self.trace_space),
+            StaggerAngle(self.outer_r, terminal_d, self.trace_width, self.trace_space),
+        )
+        radius = self.end_r + self.pitch / 4
+        self.part_end = np.array(
+            (
+                radius * math.cos(self.part) - self.pitch / 4,
+                radius * math.sin(self.part),
+            )
+        )
+        self.stagger = math.atan2(self.part_end[1], self.part_end[0])
+
+        # Pad 1, the outer vias and pad 2 are spread over count * stagger
+        if (count + 2) * self.stagger > 2 * math.pi:
+            raise ValueError(
+                f"The vias of {count} layers do not fit around the aperture"
+            )
+
+
+def IDNLInductance(parameters, model=inductance.DEFAULT_MODEL):
+    """
+    Estimated inductance (Henries) of a CoilGeneratorIDNL: a spiral of
+    `Turns per Layer` turns on each layer, the layers `Layer Spacing` apart.
+    Parameter values other than `Layers` may be NumPy arrays to evaluate
+    many designs at once.
+    """
+    turns = np.asarray(parameters["Coil specs"]["Turns per Layer"])
+    layers = len(LayerList(parameters["Coil specs"]["Layers"]))
+    w = parameters["Fab Specs"]["Trace Width"]
+    s = parameters["Fab Specs"]["Trace Spacing"]
+    via_d = 2 * parameters["Fab Specs"]["Via Annular Ring"] + (
+        parameters["Fab Specs"]["Via Drill"]
+    )
+    r_in = (
+        parameters["Install Info"]["Inside Diameter, Radius"]
+        + parameters["Install Info"]["Inner Ring gap"]
+        + via_d
+        + s
+    )
+    r_out = r_in + turns * (w + s) + w
+
+    return inductance.StackedSpiralInductance(
+        turns,
+        2 * r_out / 1e9,
+        2 * r_in / 1e9,
+        w / 1e9,
+        s / 1e9,
+        parameters["Fab Specs"]["Layer Spacing"] / 1e9,
+        TRACE_THICKNESS_1OZ * parameters["Fab Specs"]["Copper Thickness (Oz.Cu.)"],
+        model,
+        layers=layers,
+    )
+
+
+def IDNLLayerTrack(d):
+    """
+    The spiral of one layer in its own frame, from the inner via at angle 0
+    out to the outer via or pad at angle `d.stagger`.  Half turn i starts on
+    the X axis at start_r + i * pitch / 2, on alternating sides.
+    """
+    ii = np.arange(2 * d.turns + 1)
+    odd = (ii % 2) == 1
+    start_x = np.where(odd, -1, 1) * (d.start_r + ii * d.pitch / 2)
+    center_x = np.where(odd, 1, -1) * d.pitch / 4
+    sweep = np.full(len(ii), 180.0)
+    sweep[-1] = math.degrees(d.part)
+    arcs = np.column_stack(
+        (center_x, np.zeros(len(ii)), start_x, np.zeros(len(ii)), sweep)
+    )
+    arc_turns = np.where(ii < 2 * d.turns, ii // 2, NO_TURN)
+
+    outer = d.part_end / np.hypot(*d.part_end) * d.outer_r
+    lines = np.array(
+        ((d.inner_r, 0, d.start_r, 0), (*d.part_end, *outer)), dtype=np.float64
+    )
+    return spiral.Track(lines, arcs, np.full(2, NO_TURN), arc_turns)
+
+
+IDNL_WINDING_PARAMETERS = [
+    ("Install Info", "Inside Diameter, Radius"),
+    ("Install Info", "Inner Ring gap"),
+    ("Coil specs", "Turns per Layer"),
+    ("Fab Specs", "Trace Width"),
+    ("Fab Specs", "Trace Spacing"),
+    ("Fab Specs", "Via Drill"),
+    ("Fab Specs", "Via Annular Ring"),
+    ("Fab Specs", "Pad Drill"),
+    ("Fab Specs", "Pad Annular Ring"),
+]
+
+
+def IDNLWindings(parameters, groups, state):
+    """
+    The spirals of all layers with their leads to the vias and pads.
+
+    The spiral of one layer is computed once and kept between builds; every
+    layer is a rotated or mirrored copy of it, so changing the layers or
+    the direction only places the copies again.
+    """
+    d = IDNLDimensions(parameters)
+
+    key = tuple(parameters[page][name] for page, name in IDNL_WINDING_PARAMETERS)
+    if state.get("key") != key:
+        state.update(key=key, track=IDNLLayerTrack(d))
+    layer_track = state["track"]
+
+    count = len(d.layers)
+    index = np.arange(count)
+    track = layer_track.Placed(-2 * (index // 2) * d.stagger, (index % 2) == 1)
+    if d.clockwise_bool:
+        track = track.Mirrored(1)
+
+    draw = GeometryBuilder()
+    draw.SetLineThickness(d.trace_width)
+    draw.Line(
+        *track.lines.T,
+        layer=np.repeat(d.layers, len(layer_track.lines)),
+        turn=track.line_turns,
+    )
+    draw.Arc(
+        *track.arcs.T,
+        layer=np.repeat(d.layers, len(layer_track.arcs)),
+        turn=track.arc_turns,
+    )
+    return draw.Build()
+
+
+def IDNLPads(parameters, groups, state):
+    """
+    The inner vias joining the layers of each pair, the outer vias joining
+    each pair to the next, pad 1 at the outer end of the first layer and
+    pad 2 at the one of the last layer.
+    """
+    d = IDNLDimensions(parameters)
+    count = len(d.layers)
+    sign = -1 if d.clockwise_bool else 1
+
+    def Ring(radius, angles):
+        return radius * np.cos(angles), sign * radius * np.sin(angles)
+
+    inner = -2 * np.arange(count // 2) * d.stagger
+    outer = -(2 * np.arange(count // 2 - 1) + 1) * d.stagger
+
+    draw = GeometryBuilder()
+    draw.Pad(3, *Ring(d.inner_r, inner), d.via_d, d.via_hole, via=True)
+    draw.Pad(3, *Ring(d.outer_r, outer), d.via_d, d.via_hole, via=True)
+    draw.Pad(1, *Ring(d.outer_r, d.stagger), d.pad_d, d.pad_hole)
+    draw.Pad(2, *Ring(d.outer_r, -(count - 1) * d.stagger), d.pad_d, d.pad_hole)
+    return draw.Build()
+
+
+def IDNLText(parameters, groups, state):
+    d = IDNLDimensions(parameters)
+    draw = GeometryBuilder()
+    draw.inductance = float(IDNLInductance(parameters))
+    report = TraceReport(
+        Combine(groups.values()),
+        d.copper_thickness,
+        BarrelLength(d.layer_spacing, d.copper_thickness),
+    )
+    draw.resistance = report.resistance
+    parasitics = capacitance.CapacitanceReport(
+        Combine(groups.values()),
+        draw.inductance,
+        d.trace_space,
+        d.layer_spacing,
+        d.permittivity,
+    )
+
+    """
+    Capture the parameters in the Fab layer
+    """
+    fab_text_s = (
+        f"Coil Generator from ID, {len(d.layers)} Layers\n"
+        f'Direction: {"CW" if d.clockwise_bool else "CCW"}\n'
+        f"Inner Radius: {d.aperture_r/1e6}\n"
+        f"Inner Ring Gap: {d.aperture_gap/1e6}\n"
+        f"Turns per Layer: {d.turns}\n"
+        f'Layers (Start->Finish): {"->".join(d.layer_names)}\n'
+        f"Trace Width/space: {d.trace_width/1e6}/{d.trace_space/1e6}\n"
+        f"Via Drill/annular ring: {d.via_hole/1e6}/{d.via_ann_ring/1e6}\n"
+        f"Pad Drill/annular ring: {d.pad_hole/1e6}/{d.pad_ann_ring/1e6}\n"
+        f"Via Stagger: {math.degrees(2 * d.stagger):.2f} deg\n"
+        f"Layer Spacing: {d.layer_spacing/1e6}\n"
+        f"L ({inductance.DEFAULT_MODEL}): {draw.inductance * 1e6:.3f} uH\n"
+        f"{parasitics.Text()}"
+        f"{report.Text()}"
+    )
+    draw.Text(fab_text_s, LayerCode("User_2"))
+
+    """
+    Capture the basic parameters in the Silk layer
+    """
+    basic_fab_text_s = (
+        f"Turns: {d.turns * len(d.layers)}\n"
+        f"R(@25C & {d.copper_thickness:.1f} Oz Cu): {draw.resistance:.4f} Ohms\n"
+        f"{parasitics.Text()}"
+        f"L: {draw.inductance * 1e6:.3f} uH\n"
+    )
+    draw.Text(basic_fab_text_s, LayerCode("F_SilkS"))
+    return draw.Build()
+
+
+IDNL_COIL_PARAMETERS = IDNL_WINDING_PARAMETERS + [
+    ("Coil specs", "Layers"),
+    ("Coil specs", "Direction"),
+]
+
+IDNL_GROUPS = [
+    GeometryGroup(
+        "outline",
+        [("Install Info", "Inside Diameter, Radius")],
+        lambda parameters, groups, state: Outline(
+            parameters, "Inside Diameter, Radius"
+        ),
+    ),
+    GeometryGroup("windings", IDNL_COIL_PARAMETERS, IDNLWindings),
+    GeometryGroup("pads", IDNL_COIL_PARAMETERS, IDNLPads),
+    GeometryGroup(
+        "text",
+        [(page, name) for page in IDNL_DEFAULTS for name in IDNL_DEFAULTS[page]],
+        IDNLText,
+        groups=("windings", "pads"),
+    ),
+]
+
+
+"""
+CoilGenerator1L1T
+"""
+
+
+class L1TDimensions:
+    """Values derived from the CoilGenerator1L1T parameters."""
+
+    def __init__(self, parameters):
+        self.radius = parameters["Install Info"]["Radius"]
+
+        self.trace_width = parameters["Fab Specs"]["Trace Width"]
+        self.trace_space = parameters["Fab Specs"]["Trace Spacing"]
+        self.pad_hole = parameters["Fab Specs"]["Pad Drill"]
+        self.pad_ann_ring = parameters["Fab Specs"]["Pad Annular Ring"]
+        self.copper_thickness = parameters["Fab Specs"]["Copper Thickness (Oz.Cu.)"]
+
+        self.layer = LayerCode(parameters["Coil specs"]["Layer"])
+        self.clockwise_bool = parameters["Coil specs"]["Direction"]
+        self.stub_length = parameters["Coil specs"]["Stub Length"]
+
+        self.cw_multiplier = 1 if self.clockwise_bool else -1
+
+        self.pad_d = self.pad_ann_ring * 2 + self.pad_hole
+        self.radius1 = self.radius + self.trace_width / 2
+        self.radius2 = self.trace_width
+
+        self.theta2 = math.acos(
+            (self.trace_space + max(self.pad_d, self.trace_width) / 2 + self.radius2)
+            / (self.radius1 + self.radius2)
+        )
+        self.theta1 = math.pi / 2 - self.theta2
+
+        self.arc_start_x = self.radius1 * math.cos(self.theta1)
+        self.arc_start_y = -self.radius1 * math.sin(self.theta1)
+        self.arc_center_x = (self.radius1 + self.radius2) * math.cos(self.theta1)
+        self.arc_center_y = -(self.radius1 + self.radius2) * math.sin(self.theta1)
+
+        # Distance of the stubs and pads from the X axis
+        self.stub_offset = max(self.pad_d, self.trace_width) / 2 + self.trace_space
+
+
+def L1TInductance(parameters, model=inductance.DEFAULT_MODEL):
+    """
+    Inductance (Henries) of a CoilGenerator1L1T, taken as a closed circular
+    loop; the stubs are left out.  `model` is accepted for symmetry with the
+    spiral generators, a single loop has an exact filament solution.
+    """
+    w = parameters["Fab Specs"]["Trace Width"]
+    r = parameters["Install Info"]["Radius"] + w / 2
+    return inductance.LoopInductance(r / 1e9, w / 1e9, TRACE_THICKNESS_1OZ)
+
+
+def L1TLoop(parameters, groups, state):
+    d = L1TDimensions(parameters)
+    draw = GeometryBuilder()
+    draw.SetLayer(d.layer)
+    draw.SetLineThickness(d.trace_width)
+
+    """
+    Draw the main arc.  The loop is symmetric around the X axis, so the
+    direction only swaps the pads; the copper is the same either way.
+    """
+    draw.Arc(
+        0,
+        0,
+        d.arc_start_x,
+        d.arc_start_y,
+        math.degrees(-2 * (math.pi - d.theta1)),
+    )
+
+    """ Draw the stubs """
+    draw.Arc(
+        d.arc_center_x,
+        d.arc_center_y,
+        d.arc_start_x,
+        d.arc_start_y,
+        math.degrees(-d.theta2),
+    )
+    draw.Arc(
+        d.arc_center_x,
+        -d.arc_center_y,
+        d.arc_start_x,
+        -d.arc_start_y,
+        math.degrees(d.theta2),
+    )
+
+    draw.Line(
+        d.arc_center_x,
+        d.stub_offset,
+        d.arc_center_x + d.stub_length,
+        d.stub_offset,
+    )
+    draw.Line(
+        d.arc_center_x,
+        -max(d.pad_d, d.trace_width) / 2 - d.trace_space,
+        d.arc_center_x + d.stub_length,
+        -max(d.pad_d, d.trace_width) / 2 - d.trace_space,
+    )
+    return draw.Build()
+
+
+def L1TPads(parameters, groups, state):
+    d = L1TDimensions(parameters)
+    draw = GeometryBuilder()
+    draw.Pad(
+        1,
+        d.arc_center_x + d.stub_length,
+        -d.stub_offset * d.cw_multiplier,
+        d.pad_d,
+        d.pad_hole,
+    )
+    draw.Pad(
+        2,
+        d.arc_center_x + d.stub_length,
+        d.stub_offset * d.cw_multiplier,
+        d.pad_d,
+        d.pad_hole,
+    )
+    return draw.Build()
+
+
+def L1TText(parameters, groups, state):
+    d = L1TDimensions(parameters)
+    draw = GeometryBuilder()
+    draw.inductance = float(L1TInductance(parameters))
+    report = TraceReport(Combine(groups.values()), d.copper_thickness)
+    draw.resistance = report.resistance
+
+    """
+    Capture the parameters in the Fab layer
+    """
+    fab_text_s = (
+        f"Coil Generator, Single Layer, 1 Turn\n"
+        f'Direction {"CCW" if d.clockwise_bool else "CW"}\n'
+        f"Diameter: {d.radius/1e6}\n"
+        f'Layer: {parameters["Coil specs"]["Layer"]}\n'
+        f"Trace Width/space: {d.trace_width/1e6}/{d.trace_space/1e6}\n"
+        f"Pad Drill/annular ring: {d.pad_hole/1e6}/{d.pad_ann_ring/1e6}\n"
+        f"Stub Length: {d.stub_length/1e6}\n"
+        f"L (loop): {draw.inductance * 1e6:.3f} uH\n"
+        f"R(@25C & {d.copper_thickness:.1f} Oz Cu): {draw.resistance:.4f} Ohms\n"
+        f"{report.Text()}"
+    )
+    draw.Text(fab_text_s, LayerCode("User_2"))
+    return draw.Build()
+
+
+L1T_PARAMETERS = [(page, name) for page in L1T_DEFAULTS for name in L1T_DEFAULTS[page]]
+
+L1T_LOOP_PARAMETERS = [
+    (page, name) for page, name in L1T_PARAMETERS if name != "Copper Thickness (Oz.Cu.)"
+]
+
+L1T_GROUPS = [
+    GeometryGroup("loop", L1T_LOOP_PARAMETERS, L1TLoop),
+    GeometryGroup(
+        "pads",
+        [(page, name) for page, name in L1T_LOOP_PARAMETERS if name != "Layer"],
+        L1TPads,
+    ),
+    GeometryGroup("text", L1T_PARAMETERS, L1TText, groups=("loop",)),
+]
+
+
+"""
+FluxNeutralCoilGen
+"""
+
+
+class FluxNeutralDimensions:
+    """Values derived from the FluxNeutralCoilGen parameters."""
+
+    def __init__(self, parameters):
+        self.aperture_r = parameters["Install Info"]["Outer Ring radius"]
+        self.aperture_gap = parameters["Install Info"]["Outer Ring gap"]
+
+        self.trace_width = parameters["Fab Specs"]["Trace Width"]
+        self.trace_space = parameters["Fab Specs"]["Trace Spacing"]
+        self.via_hole = parameters["Fab Specs"]["Via Drill"]
+        self.via_ann_ring = parameters["Fab Specs"]["Via Annular Ring"]
+        self.pad_hole = parameters["Fab Specs"]["Pad Drill"]
+        self.pad_ann_ring = parameters["Fab Specs"]["Pad Annular Ring"]
+        self.copper_thickness = parameters["Fab Specs"]["Copper Thickness (Oz.Cu.)"]
+
+        self.turns = parameters["Coil specs"]["Turns"]
+        self.min_radius = parameters["Coil specs"]["Minimum Radius"]
+        self.stub_length = parameters["Coil specs"]["Stub Length"]
+        self.first_layer = LayerCode(parameters["Coil specs"]["First Layer"])
+        self.second_layer = LayerCode(parameters["Coil specs"]["Second Layer"])
+        self.layer_spacing = parameters["Fab Specs"]["Layer Spacing"]
+        self.permittivity = parameters["Fab Specs"]["Dielectric Constant"]
+
+        turns = self.turns
+        min_radius = self.min_radius
+
+        self.pitch = (
+            self.trace_space
+            + self.trace_width / 2
+            + np.maximum(self.trace_width / 2, self.via_hole / 2 + self.via_ann_ring)
+        )
+        pitch = self.pitch
+
+        # Pythagorean Theorem to determine via spacing
+        self.aa = (
+            self.via_hole / 2
+            + self.via_ann_ring
+            + self.trace_space
+            + self.trace_width / 2
+        )
+        cc = self.via_ann_ring * 2 + self.via_hole + self.trace_space
+        self.via_gap = np.sqrt(cc * cc - self.aa * self.aa)  # KiCAD_internal
+
+        self.pad_d = self.pad_ann_ring * 2 + self.pad_hole
+        self.via_d = self.via_ann_ring * 2 + self.via_hole
+
+        # The large curves defining the bulk of the coil
+        self.arc_center_x = -pitch * (turns - 1) / 2 - min_radius - self.via_gap
+        self.arc_center_y = 0
+        self.arc_start_x = self.arc_center_x
+        self.arc_start_y = (
+            self.arc_center_y
+            + self.aperture_r
+            - self.aperture_gap
+            - pitch * (turns - 1) / 2
+            - min_radius
+            - self.via_gap
+        )
+
+        # The vertical tracks, defined from the center of the shape
+        self.start_x = (turns - 1) / 2 * pitch
+        self.line_length = (
+            self.aperture_r
+            - self.aperture_gap
+            - pitch * (turns - 1) * 1.5
+            - min_radius * 2
+            - self.via_gap
+        )
+
+        # The smaller arcs connecting the large arcs and the vertical tracks
+        self.small_arc_center_x = (turns - 1) / 2 * pitch + min_radius
+        self.small_arc_center_y = self.line_length
+
+        # Bottom of the track from the inner tap back under the coils
+        self.tap_y = -self.line_length - self.aa - (turns - 1) * pitch
+
+
+def FluxNeutralInductance(parameters, model=inductance.DEFAULT_MODEL):
+    """
+    Estimated inductance (Henries) of a FluxNeutralCoilGen.
+
+    Each lobe is a D shaped spiral on one layer: a half circle plus the
+    rectangle up to its vertical tracks.  It is modeled as a circular spiral
+    with the same area for its outer and inner turns.  The straight sides of
+    the two lobes run on top of each other with the current in the same
+    direction, which adds their mutual inductance (twice).  The rest of the
+    coupling between the lobes is neglected.
+    """
+    d = FluxNeutralDimensions(parameters)
+    w = d.trace_width
+    thickness = TRACE_THICKNESS_1OZ
+
+    def EquivalentDiameter(ii):
+        radius = d.arc_start_y - ii * d.pitch
+        width = d.start_x - ii * d.pitch - d.arc_center_x
+        area = math.pi * radius**2 / 2 + 2 * radius * width
+        return 2 * np.sqrt(area / math.pi)
+
+    lobe = inductance.SpiralInductance(
+        d.turns,
+        (EquivalentDiameter(0) + w) / 1e9,
+        (EquivalentDiameter(d.turns - 1) - w) / 1e9,
+        w / 1e9,
+        d.trace_space / 1e9,
+        model,
+    )
+
+    bundle = inductance.WindingGMD(((d.turns - 1) * d.pitch + w) / 1e9, thickness)
+    distance = np.sqrt((d.layer_spacing / 1e9 + thickness) ** 2 + bundle**2)
+    sides = d.turns**2 * inductance.ParallelMutual(2 * d.line_length / 1e9, distance)
+    return 2 * lobe + 2 * sides
+
+
+def FluxNeutralCoil(parameters, groups, state):
+    """All of the copper tracks of both layers."""
+    d = FluxNeutralDimensions(parameters)
+    pitch = d.pitch
+    aa = d.aa
+    via_gap = d.via_gap
+    min_radius = d.min_radius
+    first_layer = d.first_layer
+    second_layer = d.second_layer
+    arc_start_x = d.arc_start_x
+    arc_start_y = d.arc_start_y
+    start_x = d.start_x
+    line_length = d.line_length
+    small_arc_center_x = d.small_arc_center_x
+    small_arc_center_y = d.small_arc_center_y
+
+    draw = GeometryBuilder()
+    draw.SetLineThickness(d.trace_width)
+
+    ii = np.arange(d.turns)
+
+    """ Draw the large curves defining the bulk of the coil"""
+    draw.Arc(
+        d.arc_center_x,
+        d.arc_center_y,
+        arc_start_x,
+        arc_start_y - ii * pitch,
+        180,
+        layer=first_layer,
+        turn=ii,
+    )
+    draw.Arc(
+        -d.arc_center_x,
+        -d.arc_center_y,
+        -arc_start_x,
+        -arc_start_y + ii * pitch,
+        180,
+        layer=second_layer,
+        turn=ii,
+    )
+
+    """
+    Draw the vertical tracks for both layers.  This should be defined as the
+      center of the shape, so it's easy to calculate.  There is one track
+      which will not be the same, and it's drawn separately.
+    """
+    draw.SetLayer(first_layer)
+    jj = ii[:-1]
+    draw.Line(
+        start_x - jj * pitch,
+        line_length,
+        start_x - jj * pitch,
+        -line_length,
+        turn=jj,
+    )
+    draw.Line(
+        -start_x, line_length, -start_x, -line_length + aa * 2
+    )  # Stub to breakout to tap point
+
+    draw.SetLayer(second_layer)
+    draw.Line(
+        start_x - ii * pitch,
+        line_length,
+        start_x - ii * pitch,
+        -line_length,
+        turn=ii,
+    )
+
+    """
+    Draw the smaller arcs connecting the large arcs and the vertical tracks.
+    The Front layer tracks on top will be off-set because they are the ones
+    connecting the coils together.  (The second block in this section is the
+    one that does this.)
+    """
+    # Skip radius=0 arcs. Might be overkill....
+    jj = ii if min_radius != 0 else ii[1:]
+
+    draw.SetLayer(first_layer)
+    draw.Arc(
+        small_arc_center_x,
+        small_arc_center_y,
+        small_arc_center_x - min_radius - jj * pitch,
+        small_arc_center_y,
+        -90,
+        turn=jj,
+    )
+    draw.Arc(
+        -small_arc_center_x + pitch,
+        -small_arc_center_y,
+        -small_arc_center_x + min_radius + ii[1:] * pitch,
+        -small_arc_center_y,
+        -90,
+        turn=ii[1:],
+    )
+
+    draw.SetLayer(second_layer)
+    draw.Arc(
+        -small_arc_center_x,
+        small_arc_center_y,
+        -small_arc_center_x + min_radius + jj * pitch,
+        small_arc_center_y,
+        90,
+        turn=jj,
+    )
+    draw.Arc(
+        small_arc_center_x,
+        -small_arc_center_y,
+        small_arc_center_x - min_radius - jj * pitch,
+        -small_arc_center_y,
+        90,
+        turn=jj,
+    )
+
+    """
+    Draw Horizontal Lines.  These are needed to give space to the vias for
+    stacking.  Otherwise, the coils would need to be further apart.
+    """
+    # Draw the simple ones first
+    draw.Line(
+        -arc_start_x,
+        -arc_start_y + ii * pitch,
+        -arc_start_x - via_gap,
+        -arc_start_y + ii * pitch,
+        layer=second_layer,
+        turn=ii,
+    )
+    draw.Line(
+        arc_start_x,
+        -arc_start_y + ii[1:] * pitch,
+        arc_start_x + via_gap + pitch,
+        -arc_start_y + ii[1:] * pitch,
+        layer=first_layer,
+        turn=ii[1:],
+    )
+
+    # Draw alternating Horizontal Lines for Vias
+    odd = (ii % 2) == 1
+    draw.Line(
+        arc_start_x,
+        arc_start_y - ii * pitch,
+        arc_start_x + via_gap,
+        arc_start_y - ii * pitch,
+        layer=np.where(odd, first_layer, second_layer),
+        turn=ii,
+    )
+    draw.Line(
+        -arc_start_x,
+        arc_start_y - ii * pitch,
+        -arc_start_x - via_gap,
+        arc_start_y - ii * pitch,
+        layer=np.where(odd, second_layer, first_layer),
+        turn=ii,
+    )
+
+    """
+    Draw the tap points from the coil.
+
+    The Front layer is easy.  The Back layer requres a little bit of work
+    and a via to get out.
+    """
+    # Draw arc and trace from outer coil
+    draw.SetLayer(first_layer)
+    draw.Arc(
+        d.arc_center_x,
+        -arc_start_y - aa,
+        d.arc_center_x,
+        -arc_start_y,
+        -90,
+    )
+    draw.Line(
+        d.arc_center_x + aa,
+        -arc_start_y - aa,
+        d.arc_center_x + aa,
+        -arc_start_y - aa - d.stub_length,
+    )
+
+    # Diagonal track to get to via
+    draw.Line(-start_x, -line_length + aa * 2, -start_x - aa, -line_length + aa)
+
+    # Vertical track to get under the coils.
+    draw.SetLayer(second_layer)
+    draw.Line(-start_x - aa, -line_length + aa, -start_x - aa, d.tap_y)
+
+    # Jogging right to clear space for Vias
+    draw.Line(
+        -start_x - aa,
+        d.tap_y,
+        -start_x - aa + min_radius,
+        d.tap_y - min_radius,
+    )
+
+    # Drawing stub section
+    draw.SetLayer(first_layer)
+    draw.Line(
+        -start_x - aa + min_radius,
+        d.tap_y - min_radius,
+        -start_x - aa + min_radius,
+        -arc_start_y - aa - d.stub_length,
+    )
+    return draw.Build()
+
+
+def FluxNeutralPads(parameters, groups, state):
+    """The stitching vias between the layers, and the pads at the taps."""
+    d = FluxNeutralDimensions(parameters)
+    draw = GeometryBuilder()
+
+    pad_number = 3
+
+    ii = np.arange(d.turns)
+    offset = np.where((ii % 2) == 1, d.via_gap, 0)
+    draw.Pad(
+        pad_number,
+        np.column_stack((d.arc_start_x + offset, -d.arc_start_x - offset)),
+        (d.arc_start_y - ii * d.pitch)[:, np.newaxis],
+        d.via_d,
+        d.via_hole,
+        via=True,
+    )
+
+    # Pad for one side of the coil
+    draw.Pad(
+        1,
+        d.arc_center_x + d.aa,
+        -d.arc_start_y - d.aa - d.stub_length,
+        d.pad_d,
+        d.pad_hole,
+    )
+
+    # Vias getting the inner tap under the coils
+    draw.Pad(
+        pad_number,
+        -d.start_x - d.aa,
+        -d.line_length + d.aa,
+        d.via_d,
+        d.via_hole,
+        via=True,
+    )
+    draw.Pad(
+        pad_number,
+        -d.start_x - d.aa + d.min_radius,
+        d.tap_y - d.min_radius,
+        d.via_d,
+        d.via_hole,
+        via=True,
+    )
+
+    # Pad for other side of the coil
+    draw.Pad(
+        2,
+        -d.start_x - d.aa + d.min_radius,
+        -d.arc_start_y - d.aa - d.stub_length,
+        d.pad_d,
+        d.pad_hole,
+    )
+    return draw.Build()
+
+
+def FluxNeutralText(parameters, groups, state):
+    d = FluxNeutralDimensions(parameters)
+    draw = GeometryBuilder()
+    draw.inductance = float(FluxNeutralInductance(parameters))
+    report = TraceReport(
+        Combine(groups.values()),
+        d.copper_thickness,
+        BarrelLength(d.layer_spacing, d.copper_thickness),
+    )
+    draw.resistance = report.resistance
+    parasitics = capacitance.CapacitanceReport(
+        Combine(groups.values()),
+        draw.inductance,
+        d.trace_space,
+        d.layer_spacing,
+        d.permittivity,
+    )
+    lobes = balance.WindingBalance(Combine(groups.values()))
+
+    """
+    Capture the parameters in the Fab layer
+    """
+    fab_text_s = (
+        f"Flux Neutral Coil\n"
+        f"Outer Diameter: {d.aperture_r/1e6}\n"
+        f"Outer Ring Gap: {d.aperture_gap/1e6}\n"
+        f"Turns: {d.turns}\n"
+        f"Min Radius: {d.min_radius/1e6}\n"
+        f'Layers (Start->Finish): {parameters["Coil specs"]["First Layer"]}->{parameters["Coil specs"]["Second Layer"]}\n'
+        f"Trace Width/space: {d.trace_width/1e6}/{d.trace_space/1e6}\n"
+        f"Via Drill/annular ring: {d.via_hole/1e6}/{d.via_ann_ring/1e6}\n"
+        f"Pad Drill/annular ring: {d.pad_hole/1e6}/{d.pad_ann_ring/1e6}\n"
+        f"Stub Length: {d.stub_length/1e6}\n"
+        f"Layer Spacing: {d.layer_spacing/1e6}\n"
+        f"L ({inductance.DEFAULT_MODEL}): {draw.inductance * 1e6:.3f} uH\n"
+        f"R(@25C & {d.copper_thickness:.1f} Oz Cu): {draw.resistance:.4f} Ohms\n"
+        f"{parasitics.Text()}"
+        f"{lobes.Text()}"
+        f"{report.Text()}"
+    )
+    draw.Text(fab_text_s, LayerCode("User_2"))
+    return draw.Build()
+
+
+FLUX_NEUTRAL_PARAMETERS = [
+    (page, name)
+    for page in FLUX_NEUTRAL_DEFAULTS
+    for name in FLUX_NEUTRAL_DEFAULTS[page]
+]
+
+FLUX_NEUTRAL_GROUPS = [
+    GeometryGroup(
+        "outline",
+        [("Install Info", "Outer Ring radius")],
+        lambda parameters, groups, state: Outline(parameters, "Outer Ring radius"),
+    ),
+    GeometryGroup(
+        "coil",
+        [
+            (page, name)
+            for page, name in FLUX_NEUTRAL_PARAMETERS
+            if name
+            not in (
+                "Pad Drill",
+                "Pad Annular Ring",
+                "Copper Thickness (Oz.Cu.)",
+                "Layer Spacing",
+                "Dielectric Constant",
+            )
+        ],
+        FluxNeutralCoil,
+    ),
+    GeometryGroup(
+        "pads",
+        [
+            (page, name)
+            for page, name in FLUX_NEUTRAL_PARAMETERS
+            if name
+            not in (
+                "First Layer",
+                "Second Layer",
+                "Copper Thickness (Oz.Cu.)",
+                "Layer Spacing",
+                "Dielectric Constant",
+            )
+        ],
+        FluxNeutralPads,
+    ),
+    GeometryGroup(
+        "text", FLUX_NEUTRAL_PARAMETERS, FluxNeutralText, groups=("coil", "pads")
+    ),
+]
+
+
+"""
+Spiral coils filling an outline: rectangle, trapezoid and wedge
+"""
+
+
+SPIRAL_COIL_SPECS = {
+    "Turns": 10,
+    "Corner Radius": 1000000,
+    "Stub Length": 2000000,
+    "First Layer": "F_Cu",
+    "Second Layer": "B_Cu",
+    "Direction": True,
+}
+
+SPIRAL_FAB_SPECS = {
+    "Trace Width": 200000,
+    "Trace Spacing": 200000,
+    "Via Drill": 300000,
+    "Via Annular Ring": 150000,
+    "Pad Drill": 500000,
+    "Pad Annular Ring": 200000,
+    "Copper Thickness (Oz.Cu.)": 1,
+    "Layer Spacing": 1510000,
+    "Dielectric Constant": DIELECTRIC_CONSTANT,
+}
+
+RECTANGULAR_SPIRAL_DEFAULTS = {
+    "Coil specs": dict(SPIRAL_COIL_SPECS),
+    "Install Info": {"Width": 20000000, "Height": 15000000},
+    "Fab Specs": dict(SPIRAL_FAB_SPECS),
+}
+
+TRAPEZOIDAL_SPIRAL_DEFAULTS = {
+    "Coil specs": dict(SPIRAL_COIL_SPECS),
+    "Install Info": {"Base Width": 20000000, "Top Width": 10000000, "Height": 15000000},
+    "Fab Specs": dict(SPIRAL_FAB_SPECS),
+}
+
+WEDGE_SPIRAL_DEFAULTS = {
+    "Coil specs": dict(SPIRAL_COIL_SPECS),
+    "Install Info": {"Inner Radius": 10000000, "Outer Radius": 30000000, "Angle": 40},
+    "Fab Specs": dict(SPIRAL_FAB_SPECS),
+}
+
+# Install Info values in degrees, all others are lengths
+SPIRAL_ANGLE_PARAMETERS = ("Angle",)
+
+
+def TrapezoidArea(base_width, top_width, height, t):
+    """
+    Area inside an isosceles trapezoid offset `t` inwards, with sharp
+    corners: A - P t + t^2 sum(cot(corner / 2)).
+    """
+    side = np.hypot(height, (base_width - top_width) / 2)
+    return (
+        (base_width + top_width) / 2 * height
+        - (base_width + top_width + 2 * side) * t
+        + 4 * side / height * t**2
+    )
+
+
+def AnnularSectorArea(inner_radius, outer_radius, angle, t):
+    """Area inside a wedge offset `t` inwards, with sharp corners."""
+    return np.radians(angle) / 2 * (
+        (outer_radius - t) ** 2 - (inner_radius + t) ** 2
+    ) - 2 * t * (outer_radius - inner_radius - 2 * t)
+
+
+# `outline(install)` gives the spiral.py outline for the Install Info page,
+# `area(install, t)` the area inside it offset `t` inwards, and `mirror` the
+# coordinate to negate for a counter-clockwise coil.
+SpiralShape = collections.namedtuple("SpiralShape", "title outline area mirror")
+
+SPIRAL_SHAPES = {
+    "RectangularSpiralCoilGen": SpiralShape(
+        "Rectangular Spiral Coil",
+        lambda install: spiral.Rectangle(install["Width"], install["Height"]),
+        lambda install, t: TrapezoidArea(
+            install["Width"], install["Width"], install["Height"], t
+        ),
+        0,
+    ),
+    "TrapezoidalSpiralCoilGen": SpiralShape(
+        "Trapezoidal Spiral Coil",
+        lambda install: spiral.Trapezoid(
+            install["Base Width"], install["Top Width"], install["Height"]
+        ),
+        lambda install, t: TrapezoidArea(
+            install["Base Width"], install["Top Width"], install["Height"], t
+        ),
+        0,
+    ),
+    "WedgeSpiralCoilGen": SpiralShape(
+        "Wedge Spiral Coil",
+        lambda install: spiral.AnnularSector(
+            install["Inner Radius"], install["Outer Radius"], install["Angle"]
+        ),
+        lambda install, t: AnnularSectorArea(
+            install["Inner Radius"], install["Outer Radius"], install["Angle"], t
+        ),
+        1,
+    ),
+}
+
+
+class SpiralDimensions:
+    """Values derived from the parameters of a spiral generator."""
+
+    def __init__(self, generator, parameters):
+        self.shape = SPIRAL_SHAPES[generator]
+        self.install = parameters["Install Info"]
+
+        self.trace_width = parameters["Fab Specs"]["Trace Width"]
+        self.trace_space = parameters["Fab Specs"]["Trace Spacing"]
+        self.via_hole = parameters["Fab Specs"]["Via Drill"]
+        self.via_ann_ring = parameters["Fab Specs"]["Via Annular Ring"]
+        self.pad_hole = parameters["Fab Specs"]["Pad Drill"]
+        self.pad_ann_ring = parameters["Fab Specs"]["Pad Annular Ring"]
+        self.copper_thickness = parameters["Fab Specs"]["Copper Thickness (Oz.Cu.)"]
+        self.layer_spacing = parameters["Fab Specs"]["Layer Spacing"]
+        self.permittivity = parameters["Fab Specs"]["Dielectric Constant"]
+
+        self.turns = parameters["Coil specs"]["Turns"]
+        self.corner_radius = parameters["Coil specs"]["Corner Radius"]
+        self.stub_length = parameters["Coil specs"]["Stub Length"]
+        self.first_layer = LayerCode(parameters["Coil specs"]["First Layer"])
+        self.second_layer = LayerCode(parameters["Coil specs"]["Second Layer"])
+        self.clockwise_bool = parameters["Coil specs"]["Direction"]
+
+        self.via_d = self.via_ann_ring * 2 + self.via_hole
+        self.pad_d = self.pad_ann_ring * 2 + self.pad_hole
+        self.pitch = self.trace_width + self.trace_space
+        # The copper of the outer turn ends at the outline
+        self.inset = self.trace_width / 2
+
+    def Outline(self):
+        return self.shape.outline(self.install)
+
+    def Mirror(self, points):
+        """`points` as they are for the chosen direction."""
+        points = np.array(points, dtype=np.float64)
+        if not self.clockwise_bool:
+            points[..., self.shape.mirror] *= -1
+        return points
+
+    def Track(self, track):
+        """A spiral.Track as it is for the chosen direction."""
+        return track if self.clockwise_bool else track.Mirrored(self.shape.mirror)
+
+
+def SpiralCoilInductance(generator, parameters, model=inductance.DEFAULT_MODEL):
+    """
+    Estimated inductance (Henries) of a spiral generator's coil, as the
+    square spiral whose outer and inner sides enclose the same areas as the
+    outline and the inner edge of the innermost turn.  The underpass back to
+    pad 2 is left out.  Parameter values may be NumPy arrays.
+    """
+    shape = SPIRAL_SHAPES[generator]
+    install = parameters["Install Info"]
+    turns = np.asarray(parameters["Coil specs"]["Turns"])
+    w = parameters["Fab Specs"]["Trace Width"]
+    s = parameters["Fab Specs"]["Trace Spacing"]
+
+    d_out = np.sqrt(shape.area(install, 0))
+    d_in = np.sqrt(np.maximum(shape.area(install, (turns - 1) * (w + s) + w), 0))
+    return inductance.SpiralInductance(
+        turns, d_out / 1e9, d_in / 1e9, w / 1e9, s / 1e9, model, "square"
+    )
+
+
+def DrawTrack(draw, track):
+    """Add a spiral.Track with the builder's layer and line thickness."""
+    draw.Line(*track.lines.T, turn=track.line_turns)
+    draw.Arc(*track.arcs.T, turn=track.arc_turns)
+
+
+def SpiralOutline(generator, parameters, groups, state):
+    """The outline on User_1 plus the Value/Reference fields inside of it."""
+    d = SpiralDimensions(generator, parameters)
+    edges, vertices = d.Outline()
+    x, y = d.Mirror(np.mean(vertices, axis=0))
+
+    draw = GeometryBuilder()
+    draw.SetLayer(LayerCode("User_1"))
+    DrawTrack(draw, d.Track(spiral.OutlineTrack(edges, vertices)))
+
+    draw.SetLayer(LayerCode("F_Fab"))
+    draw.Value(x, y, 1000000)
+    draw.SetLayer(LayerCode("F_SilkS"))
+    draw.Reference(x, y, 1000000)
+    return draw.Build()
+
+
+def SpiralWindings(generator, parameters, groups, state):
+    """The turns, on the first layer.  Raises ValueError if they do not fit."""
+    d = SpiralDimensions(generator, parameters)
+    track = spiral.Spiral(*d.Outline(), d.pitch, d.turns, d.corner_radius, d.inset)
+    draw = GeometryBuilder()
+    draw.SetLayer(d.first_layer)
+    draw.SetLineThickness(d.trace_width)
+    DrawTrack(draw, d.Track(track))
+    return draw.Build()
+
+
+def SpiralPads(generator, parameters, groups, state):
+    """
+    The leads from pad 1 to the outer end of the spiral and from its inner
+    end to the via, and the underpass on the second layer from the via
+    across the turns to pad 2.  Both pads sit outside of edge 0.
+    """
+    d = SpiralDimensions(generator, parameters)
+    edges, vertices = d.Outline()
+    start, end, via, room = spiral.Terminals(
+        edges, vertices, d.pitch, d.turns, d.corner_radius, d.inset
+    )
+    if room < (d.via_d + d.trace_width) / 2 + d.trace_space:
+        raise ValueError("No room for the via inside the innermost turn")
+
+    outer = edges[0]
+    pad_1 = start + outer.Outward(start) * (d.inset + d.stub_length)
+    pad_2 = via + outer.Outward(via) * (outer.Distance(via, 0) + d.stub_length)
+    start, end, via, pad_1, pad_2 = d.Mirror((start, end, via, pad_1, pad_2))
+
+    draw = GeometryBuilder()
+    draw.SetLineThickness(d.trace_width)
+    draw.SetLayer(d.first_layer)
+    draw.Line(*pad_1, *start)
+    draw.Line(*end, *via)
+    draw.SetLayer(d.second_layer)
+    draw.Line(*via, *pad_2)
+
+    draw.Pad(3, *via, d.via_d, d.via_hole, via=True)
+    draw.Pad(1, *pad_1, d.pad_d, d.pad_hole)
+    draw.Pad(2, *pad_2, d.pad_d, d.pad_hole)
+    return draw.Build()
+
+
+def SpiralText(generator, parameters, groups, state):
+    d = SpiralDimensions(generator, parameters)
+    draw = GeometryBuilder()
+    draw.inductance = float(SpiralCoilInductance(generator, parameters))
+    report = TraceReport(
+        Combine(groups.values()),
+        d.copper_thickness,
+        BarrelLength(d.layer_spacing, d.copper_thickness),
+    )
+    draw.resistance = report.resistance
+    parasitics = capacitance.CapacitanceReport(
+        Combine(groups.values()),
+        draw.inductance,
+        d.trace_space,
+        d.layer_spacing,
+        d.permittivity,
+    )
+
+    outline = "".join(
+        f"{name}: {value if name in SPIRAL_ANGLE_PARAMETERS else value / 1e6}\n"
+        for name, value in d.install.items()
+    )
+
+    """
+    Capture the parameters in the Fab layer
+    """
+    fab_text_s = (
+        f"{d.shape.title}\n"
+        f'Direction: {"CW" if d.clockwise_bool else "CCW"}\n'
+        f"{outline}"
+        f"Turns: {d.turns}\n"
+        f"Corner Radius: {d.corner_radius/1e6}\n"
+        f'Layers (Spiral, Underpass): {parameters["Coil specs"]["First Layer"]}, {parameters["Coil specs"]["Second Layer"]}\n'
+        f"Trace Width/space: {d.trace_width/1e6}/{d.trace_space/1e6}\n"
+        f"Via Drill/annular ring: {d.via_hole/1e6}/{d.via_ann_ring/1e6}\n"
+        f"Pad Drill/annular ring: {d.pad_hole/1e6}/{d.pad_ann_ring/1e6}\n"
+        f"Stub Length: {d.stub_length/1e6}\n"
+        f"Layer Spacing: {d.layer_spacing/1e6}\n"
+        f"L ({inductance.DEFAULT_MODEL}): {draw.inductance * 1e6:.3f} uH\n"
+        f"R(@25C & {d.copper_thickness:.1f} Oz Cu): {draw.resistance:.4f} Ohms\n"
+        f"{parasitics.Text()}"
+        f"{report.Text()}"
+    )
+    draw.Text(fab_text_s, LayerCode("User_2"))
+    return draw.Build()
+
+
+def SpiralGroups(generator, defaults):
+    """The geometry groups of a spiral generator."""
+    parameters = [(page, name) for page in defaults for name in defaults[page]]
+    install = [("Install Info", name) for name in defaults["Install Info"]]
+    copper = [
+        (page, name)
+        for page, name in parameters
+        if name
+        not in ("Copper Thickness (Oz.Cu.)", "Layer Spacing", "Dielectric Constant")
+    ]
+    windings = install + [
+        ("Coil specs", "Turns"),
+        ("Coil specs", "Corner Radius"),
+        ("Coil specs", "First Layer"),
+        ("Coil specs", "Direction"),
+        ("Fab Specs", "Trace Width"),
+        ("Fab Specs", "Trace Spacing"),
+    ]
+
+    def Group(name, dependencies, build, groups=()):
+        return GeometryGroup(
+            name,
+            dependencies,
+            lambda parameters, groups, state: build(
+                generator, parameters, groups, state
+            ),
+            groups,
+        )
+
+    return [
+        Group("outline", install + [("Coil specs", "Direction")], SpiralOutline),
+        Group("windings", windings, SpiralWindings),
+        Group("pads", copper, SpiralPads),
+        Group("text", parameters, SpiralText, groups=("windings", "pads")),
+    ]
+
+
+SPIRAL_DEFAULTS = {
+    "RectangularSpiralCoilGen": RECTANGULAR_SPIRAL_DEFAULTS,
+    "TrapezoidalSpiralCoilGen": TRAPEZOIDAL_SPIRAL_DEFAULTS,
+    "WedgeSpiralCoilGen": WEDGE_SPIRAL_DEFAULTS,
+}
+
+
+# Footprint value of each generator, as returned by its GetValue()
+VALUES = {generator: wizard.value for generator, wizard in registry.WIZARDS.items()}
+
+# Generator class name -> default parameters
+DEFAULTS = {
+    "CoilGeneratorID2L": ID2L_DEFAULTS,
+    "CoilGeneratorIDNL": IDNL_DEFAULTS,
+    "CoilGenerator1L1T": L1T_DEFAULTS,
+    "FluxNeutralCoilGen": FLUX_NEUTRAL_DEFAULTS,
+    **SPIRAL_DEFAULTS,
+}
+
+# Generator class name -> geometry groups
+GROUPS = {
+    "CoilGeneratorID2L": ID2L_GROUPS,
+    "CoilGeneratorIDNL": IDNL_GROUPS,
+    "CoilGenerator1L1T": L1T_GROUPS,
+    "FluxNeutralCoilGen": FLUX_NEUTRAL_GROUPS,
+    **{
+        generator: SpiralGroups(generator, defaults)
+        for generator, defaults in SPIRAL_DEFAULTS.items()
+    },
+}
+
+GENERATORS = GROUPS.keys()
+
+# Generator class name -> inductance estimate, f(parameters, model)
+INDUCTANCE = {
+    "CoilGeneratorID2L": ID2LInductance,
+    "CoilGeneratorIDNL": IDNLInductance,
+    "CoilGenerator1L1T": L1TInductance,
+    "FluxNeutralCoilGen": FluxNeutralInductance,
+    **{
+        generator: lambda parameters, model, generator=generator: SpiralCoilInductance(
+            generator, parameters, model
+        )
+        for generator in SPIRAL_DEFAULTS
+    },
+}
+
+
+def DefaultParameters(generator):
+    """A fresh copy of the default parameter set of a generator."""
+    return copy.deepcopy(DEFAULTS[generator])
+
+
+def MergeDefaults(generator, parameters):
+    """
+    `parameters` completed with the generator's defaults.  Raises KeyError
+    for a page or name the generator does not have, e.g. a misspelt one.
+    """
+    merged = DefaultParameters(generator)
+    for page, values in (parameters or {}).items():
+        if page not in merged:
+            raise KeyError(f"{generator} has no parameter page {page!r}")
+        for name in values:
+            if name not in merged[page]:
+                raise KeyError(f"{generator} has no parameter {page!r} {name!r}")
+        merged[page].update(values)
+    return merged
+
+
+def Build(generator, parameters=None):
+    """
+    Build the geometry of a generator by class name.  Missing parameters are
+    taken from the generator's defaults.
+    """
+    return IncrementalBuilder(generator).Build(parameters)
+
+
+def Inductance(generator, parameters=None, model=inductance.DEFAULT_MODEL):
+    """
+    Estimated inductance (Henries) of a generator's coil, without building
+    its geometry.  `model` is one of inductance.MODELS.  Parameter values may
+    be NumPy arrays of equal shape to estimate a whole batch of designs.
+    """
+    return INDUCTANCE[generator](MergeDefaults(generator, parameters), model)
+
+
+def Trace(generator, parameters=None, coil=None):
+    """
+    TraceReport (lengths, vias and DC resistance) of a generator's coil.  The
+    coil is built from `parameters` unless it is given.
+    """
+    parameters = MergeDefaults(generator, parameters)
+    if coil is None:
+        coil = Build(generator, parameters)
+    copper_thickness = parameters["Fab Specs"]["Copper Thickness (Oz.Cu.)"]
+    layer_spacing = parameters["Fab Specs"].get("Layer Spacing", 0)
+    return TraceReport(
+        coil, copper_thickness, BarrelLength(layer_spacing, copper_thickness)
+    )
+
+
+def BuildCoilID2L(parameters):
+    """Geometry for `CoilGeneratorID2L`."""
+    return Build("CoilGeneratorID2L", parameters)
+
+
+def BuildCoilIDNL(parameters):
+    """Geometry for `CoilGeneratorIDNL`."""
+    return Build("CoilGeneratorIDNL", parameters)
+
+
+def BuildCoil1L1T(parameters):
+    """Geometry for `CoilGenerator1L1T`."""
+    return Build("CoilGenerator1L1T", parameters)
+
+
+def BuildFluxNeutralCoil(parameters):
+    """Geometry for `FluxNeutralCoilGen`."""
+    return Build("FluxNeutralCoilGen", parameters)
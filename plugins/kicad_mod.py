@@ -0,0 +1,212 @@
+"""
+.kicad_mod writer for the headless geometry core.
+
+The footprint is written from the primitive tables of an already built
+CoilGeometry: their rows are formatted and written to the output file in
+fixed size chunks, so no pcbnew.FOOTPRINT is built and the file text is
+never held in memory as a whole.  The tables themselves are in memory, as
+compact arrays.  The layout follows what KiCAD 8 writes when a wizard
+footprint is exported and saved.
+"""
+
+import numpy as np
+
+from .geometry import LAYER_NAMES, ToIU
+
+FORMAT_VERSION = 20240108  # KiCAD 8.0 footprint format
+CHUNK_SIZE = 4096  # Rows formatted per batch while writing
+
+TEXT_SIZE = 1000000  # FootprintWizard.GetTextSize(), IPC nominal
+DEFAULT_FIELD_SIZE = 1270000  # Fields the generator doesn't place itself
+DEFAULT_FIELD_LAYERS = {"Reference": "F_SilkS", "Value": "F_Fab"}
+
+
+def KicadLayer(layer):
+    """File name of a layer, e.g. 'F_Cu' -> 'F.Cu'.  Accepts codes or names."""
+    if not isinstance(layer, str):
+        layer = LAYER_NAMES[layer]
+    return layer.replace("_", ".", 1)
+
+
+def FormatMM(value):
+    """Internal units to millimeters the way KiCAD formats them."""
+    s = f"{value / 1e6:.6f}".rstrip("0").rstrip(".")
+    return "0" if s == "-0" else s
+
+
+def Quote(text):
+    text = text.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return f'"{text}"'
+
+
+def ArcPoints(arcs):
+    """
+    Start, mid and end points of arcs as written to file.
+
+    The start and end points are the ones of the table, so they meet their
+    neighbours exactly; only the mid point is rounded here.  KiCAD stores
+    arcs counter-clockwise from start to end, so arcs with a negative angle
+    get their ends swapped, same as PCB_SHAPE.SetArcAngleAndEnd(angle, True)
+    does.
+    """
+    cx = arcs["cx"].astype(np.float64)
+    cy = arcs["cy"].astype(np.float64)
+    dx = arcs["sx"] - cx
+    dy = arcs["sy"] - cy
+    angle = np.radians(arcs["angle"])
+    cos, sin = np.cos(angle / 2), np.sin(angle / 2)
+    mid_x, mid_y = ToIU(cx + dx * cos - dy * sin), ToIU(cy + dx * sin + dy * cos)
+
+    end_x, end_y = arcs["ex"], arcs["ey"]
+    negative = angle < 0
+    start_x = np.where(negative, end_x, arcs["sx"])
+    start_y = np.where(negative, end_y, arcs["sy"])
+    end_x = np.where(negative, arcs["sx"], end_x)
+    end_y = np.where(negative, arcs["sy"], end_y)
+    return start_x, start_y, mid_x, mid_y, end_x, end_y
+
+
+def Stroke(width, layer):
+    return (
+        f"\t\t(stroke\n"
+        f"\t\t\t(width {FormatMM(width)})\n"
+        f"\t\t\t(type solid)\n"
+        f"\t\t)\n"
+        f'\t\t(layer "{KicadLayer(layer)}")\n'
+    )
+
+
+def Chunks(table):
+    for start in range(0, len(table), CHUNK_SIZE):
+        yield table[start : start + CHUNK_SIZE]
+
+
+def FormatField(name, text, field):
+    layer, x, y, size, thickness = field
+    if thickness:
+        thickness = f"\t\t\t\t(thickness {FormatMM(thickness)})\n"
+    else:
+        thickness = ""
+    return (
+        f"\t(property {Quote(name)} {Quote(text)}\n"
+        f"\t\t(at {FormatMM(x)} {FormatMM(y)} 0)\n"
+        f'\t\t(layer "{KicadLayer(layer)}")\n'
+        f"\t\t(effects\n"
+        f"\t\t\t(font\n"
+        f"\t\t\t\t(size {FormatMM(size)} {FormatMM(size)})\n"
+        f"{thickness}"
+        f"\t\t\t)\n"
+        f"\t\t)\n"
+        f"\t)\n"
+    )
+
+
+def FormatArcs(arcs):
+    for chunk in Chunks(arcs):
+        points = zip(*(p.tolist() for p in ArcPoints(chunk)))
+        for arc, (sx, sy, mx, my, ex, ey) in zip(chunk.tolist(), points):
+            layer, width = arc[0], arc[-1]
+            yield (
+                f"\t(fp_arc\n"
+                f"\t\t(start {FormatMM(sx)} {FormatMM(sy)})\n"
+                f"\t\t(mid {FormatMM(mx)} {FormatMM(my)})\n"
+                f"\t\t(end {FormatMM(ex)} {FormatMM(ey)})\n"
+                f"{Stroke(width, layer)}"
+                f"\t)\n"
+            )
+
+
+def FormatLines(lines):
+    for chunk in Chunks(lines):
+        for layer, x1, y1, x2, y2, width in chunk.tolist():
+            yield (
+                f"\t(fp_line\n"
+                f"\t\t(start {FormatMM(x1)} {FormatMM(y1)})\n"
+                f"\t\t(end {FormatMM(x2)} {FormatMM(y2)})\n"
+                f"{Stroke(width, layer)}"
+                f"\t)\n"
+            )
+
+
+def FormatCircles(circles):
+    for layer, cx, cy, r, width in circles.tolist():
+        yield (
+            f"\t(fp_circle\n"
+            f"\t\t(center {FormatMM(cx)} {FormatMM(cy)})\n"
+            f"\t\t(end {FormatMM(cx)} {FormatMM(cy + r)})\n"
+            f"\t\t(stroke\n"
+            f"\t\t\t(width {FormatMM(width)})\n"
+            f"\t\t\t(type solid)\n"
+            f"\t\t)\n"
+            f"\t\t(fill none)\n"
+            f'\t\t(layer "{KicadLayer(layer)}")\n'
+            f"\t)\n"
+        )
+
+
+def FormatTexts(texts):
+    for layer, text in texts:
+        yield (
+            f"\t(fp_text user {Quote(text)}\n"
+            f"\t\t(at 0 0 0)\n"
+            f'\t\t(layer "{KicadLayer(layer)}")\n'
+            f"\t\t(effects\n"
+            f"\t\t\t(font\n"
+            f"\t\t\t\t(size {FormatMM(TEXT_SIZE)} {FormatMM(TEXT_SIZE)})\n"
+            f"\t\t\t)\n"
+            f"\t\t\t(justify left)\n"
+            f"\t\t)\n"
+            f"\t)\n"
+        )
+
+
+def FormatPads(pads):
+    for chunk in Chunks(pads):
+        for number, x, y, diameter, drill, via in chunk.tolist():
+            yield (
+                f'\t(pad "{number}" thru_hole circle\n'
+                f"\t\t(at {FormatMM(x)} {FormatMM(y)})\n"
+                f"\t\t(size {FormatMM(diameter)} {FormatMM(diameter)})\n"
+                f"\t\t(drill {FormatMM(drill)})\n"
+                f'\t\t(layers "*.Cu")\n'
+                f"\t\t(remove_unused_layers no)\n"
+                f"\t)\n"
+            )
+
+
+def NetTiePadGroup(coil):
+    """Same group GenerateNetTiePadGroup adds: every pad number in the coil."""
+    return ",".join(str(n) for n in sorted(set(coil.pads["number"].tolist())))
+
+
+def WriteFootprint(stream, coil, name, value):
+    """
+    Write the footprint of a built `coil` in .kicad_mod format to an open
+    text file, the rows of its tables formatted chunk by chunk.
+    """
+    stream.write(
+        f"(footprint {Quote(name)}\n"
+        f"\t(version {FORMAT_VERSION})\n"
+        f'\t(generator "pcbnew")\n'
+        f'\t(generator_version "8.0")\n'
+        f'\t(layer "F.Cu")\n'
+    )
+    for field, text in (("Reference", "REF**"), ("Value", value)):
+        placement = coil.fields.get(field)
+        if placement is None:
+            placement = (DEFAULT_FIELD_LAYERS[field], 0, 0, DEFAULT_FIELD_SIZE, 0)
+        stream.write(FormatField(field, text, placement))
+    if len(coil.pads):
+        stream.write(f"\t(net_tie_pad_groups {Quote(NetTiePadGroup(coil))})\n")
+
+    stream.writelines(FormatLines(coil.lines))
+    stream.writelines(FormatArcs(coil.arcs))
+    stream.writelines(FormatCircles(coil.circles))
+    stream.writelines(FormatTexts(coil.texts))
+    stream.writelines(FormatPads(coil.pads))
+    stream.write(")\n")
+
+
+def SaveFootprint(path, coil, name, value):
+    with open(path, "w", encoding="utf-8") as f:
+        WriteFootprint(f, coil, name, value)
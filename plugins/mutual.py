@@ -0,0 +1,306 @@
+"""
+Mutual inductance between two generated coils, e.g. a CoilGeneratorID2L
+drive coil and a CoilGenerator1L1T pickup loop around the same aperture.
+
+The pickup is placed against the drive coil: turned by `rotation` degrees
+about the origin, moved by `offset` (x, y) and raised by `separation` along
+z, lengths in nm.  Both coils share one stackup (see
+partial_inductance.LayerHeights()), so coils on different layers of the same
+board are `Layer Spacing` apart without any separation.
+
+In general the mutual inductance is Neumann's double integral over the
+filaments of both traces (partial_inductance.CoilFilaments()), summed in
+blocks of filament pairs like the self inductance.
+
+Coaxial circular coils take a shortcut.  The vector potential of a coil
+that is symmetric about the axis is azimuthal, so the other coil only
+couples with it through the azimuthal part of its path, the same as its
+average over all rotations (which makes `rotation` moot).  The generated
+coils are nearly symmetric, so both are reduced to azimuthal elements:
+an arc around the axis is one element of its radius and sweep, lines and
+other arcs give an element per Gauss point with the local radius and sweep.
+Two elements sweeping a and b radians couple like a b / (2 pi)^2 times two
+coaxial circular loops (inductance.CoaxialMutual()), a few element pairs per
+pair of turns instead of thousands of filament pairs.  Radial leads carry
+no azimuthal current and drop out.  The two agree within a fraction of a
+percent for a CoilGeneratorID2L and a CoilGenerator1L1T.
+"""
+
+import math
+
+import numpy as np
+
+from . import geometry
+from . import inductance
+from . import partial_inductance
+from . import path
+
+# Arc centers within this fraction of the radius are on the axis, and a coil
+# is circular if no more than this fraction of its sweep is elsewhere
+AXIS_TOLERANCE = 0.02
+
+GAUSS_ORDER = 4  # Azimuthal elements per line
+METHODS = ("auto", "coaxial", "filaments")
+
+
+def CopperLayers(coil):
+    """Copper layers the primitives of a coil are on."""
+    layers = np.concatenate((coil.arcs["layer"], coil.lines["layer"]))
+    return np.unique(layers[geometry.IsCopper(layers)])
+
+
+class Elements:
+    """
+    Azimuthal elements of a coil: `radius` (nm), `layer` and `sweep` (rad,
+    counterclockwise positive in the direction of the current), in the order
+    of the trace path.  `circular` tells whether the arcs around the axis
+    make up the coil.  Raises ValueError if the trace is broken.
+    """
+
+    def __init__(self, coil, max_angle=partial_inductance.DEFAULT_MAX_ANGLE):
+        trace = path.TracePath(coil)
+        steps = trace[trace["kind"] == path.ARC]
+        arcs = coil.arcs[steps["index"]]
+        radius = np.hypot(arcs["sx"] - arcs["cx"], arcs["sy"] - arcs["cy"])
+        centered = np.hypot(arcs["cx"], arcs["cy"]) <= AXIS_TOLERANCE * radius
+        sign = np.where(steps["reversed"], -1, 1)
+        sweep = np.radians(arcs["angle"]) * sign
+
+        """
+        Everything else as straight pieces in the direction of the current:
+        lines, and the other arcs as chords of at most max_angle
+        """
+        other = arcs[~centered]
+        pieces = np.maximum(1, np.ceil(np.abs(other["angle"]) / max_angle))
+        pieces = pieces.astype(np.int64)
+        arc = np.repeat(np.arange(len(other)), pieces)
+        k = np.arange(len(arc)) - np.repeat(np.cumsum(pieces) - pieces, pieces)
+        theta = np.radians(other["angle"][arc]) / pieces[arc] * np.stack((k, k + 1))
+        cx, cy = other["cx"][arc], other["cy"][arc]
+        dx, dy = other["sx"][arc] - cx, other["sy"][arc] - cy
+        x = cx + dx * np.cos(theta) - dy * np.sin(theta)
+        y = cy + dx * np.sin(theta) + dy * np.cos(theta)
+        reverse = steps["reversed"][~centered][arc]
+
+        steps = trace[trace["kind"] == path.LINE]
+        lines = coil.lines[steps["index"]]
+        start = np.concatenate(
+            (np.column_stack((x[0], y[0])), np.column_stack((lines["x1"], lines["y1"])))
+        )
+        end = np.concatenate(
+            (np.column_stack((x[1], y[1])), np.column_stack((lines["x2"], lines["y2"])))
+        )
+        reverse = np.concatenate((reverse, steps["reversed"]))
+        start, end = np.where(reverse[:, None], end, start), np.where(
+            reverse[:, None], start, end
+        )
+        layer = np.concatenate((other["layer"][arc], lines["layer"]))
+
+        nodes, weights = partial_inductance.GaussPoints(GAUSS_ORDER)
+        delta = (end - start)[:, None, :]
+        point = start[:, None, :] + delta * nodes[:, None]
+        rho2 = np.maximum(point[..., 0] ** 2 + point[..., 1] ** 2, 1)
+        cross = point[..., 0] * delta[..., 1] - point[..., 1] * delta[..., 0]
+
+        self.radius = np.concatenate((radius[centered], np.sqrt(rho2).ravel()))
+        self.layer = np.concatenate(
+            (arcs["layer"][centered], np.repeat(layer, GAUSS_ORDER))
+        )
+        self.sweep = np.concatenate((sweep[centered], (cross / rho2 * weights).ravel()))
+        total = np.abs(self.sweep).sum()
+        self.circular = bool(
+            total and np.abs(sweep[centered]).sum() >= (1 - AXIS_TOLERANCE) * total
+        )
+
+
+def CoaxialSum(drive, pickup, layer_z, separation, gmd):
+    """
+    Mutual inductance (H) of the Elements of two coaxial coils, the pickup
+    `separation` (m) above the drive coil.  `gmd` (m) softens the distance
+    between elements on the same layer.
+    """
+    z_drive = np.array([layer_z[int(code)] for code in drive.layer])
+    z_pickup = np.array([layer_z[int(code)] for code in pickup.layer]) + separation
+    distance = np.hypot(z_drive[:, None] - z_pickup[None, :], gmd)
+    mutual = inductance.CoaxialMutual(
+        drive.radius[:, None] / 1e9, pickup.radius[None, :] / 1e9, distance
+    )
+    weight = drive.sweep[:, None] * pickup.sweep[None, :] / (2 * math.pi) ** 2
+    return float(np.sum(weight * mutual))
+
+
+def PlaceFilaments(filaments, offset=(0, 0), rotation=0, separation=0):
+    """
+    Filaments turned by `rotation` degrees about the origin, then moved by
+    `offset` (x, y) and `separation` (z), in nm.
+    """
+    angle = math.radians(rotation)
+    turn = np.array(
+        [
+            [math.cos(angle), -math.sin(angle), 0],
+            [math.sin(angle), math.cos(angle), 0],
+            [0, 0, 1],
+        ]
+    )
+    shift = np.array([offset[0], offset[1], separation]) / 1e9
+    return partial_inductance.Filaments(
+        filaments.start @ turn.T + shift,
+        filaments.end @ turn.T + shift,
+        filaments.width,
+        filaments.thickness,
+    )
+
+
+def FilamentMutual(drive, pickup, max_memory=partial_inductance.DEFAULT_MAX_MEMORY):
+    """Mutual inductance (H) between two sets of Filaments."""
+    both = partial_inductance.Filaments(
+        np.concatenate((drive.start, pickup.start)),
+        np.concatenate((drive.end, pickup.end)),
+        np.concatenate((drive.width, pickup.width)),
+        (drive.thickness + pickup.thickness) / 2,
+    )
+    size = partial_inductance.BlockSize(max_memory)
+    count = len(both)
+    return sum(
+        partial_inductance.BlockSum(
+            both, i0, min(i0 + size, len(drive)), j0, min(j0 + size, count)
+        )
+        for i0 in range(0, len(drive), size)
+        for j0 in range(len(drive), count, size)
+    )
+
+
+class CouplingReport:
+    """
+    Mutual inductance (H) between a `drive` and a `pickup` CoilGeometry, the
+    pickup placed as described in the module docstring, and the coupling
+    coefficient k = M / sqrt(L_drive L_pickup) with the inductance estimates
+    the coils carry.
+
+    `method` is "coaxial" (the shortcut), "filaments" or "auto": the shortcut
+    if the pickup is not offset and both coils are circular.
+    `spacing` (nm) and `thickness` (m) are the stackup, see
+    partial_inductance.Stackup().  `drive_elements` are the Elements of the
+    drive coil, to reuse them over a sweep of pickups.  Raises ValueError if
+    either trace is broken.
+    """
+
+    def __init__(
+        self,
+        drive,
+        pickup,
+        offset=(0, 0),
+        rotation=0,
+        separation=0,
+        spacing=partial_inductance.DEFAULT_SPACING,
+        thickness=geometry.TRACE_THICKNESS_1OZ,
+        method="auto",
+        drive_elements=None,
+    ):
+        if method not in METHODS:
+            raise ValueError(f"Unknown method {method}, one of {', '.join(METHODS)}")
+        layer_z = partial_inductance.LayerHeights(
+            np.concatenate((CopperLayers(drive), CopperLayers(pickup))),
+            spacing / 1e9,
+            thickness,
+        )
+
+        if method != "filaments":
+            drive_elements = drive_elements or Elements(drive)
+            pickup_elements = Elements(pickup)
+            if method == "auto":
+                circular = drive_elements.circular and pickup_elements.circular
+                method = "coaxial" if circular and not any(offset) else "filaments"
+        if method == "coaxial":
+            if any(offset):
+                raise ValueError("The coaxial shortcut needs the pickup on the axis")
+            width = np.concatenate(
+                [path.EndPoints(coil)[5] for coil in (drive, pickup)]
+            )
+            gmd = inductance.WindingGMD(width.mean() / 1e9, thickness)
+            self.mutual = CoaxialSum(
+                drive_elements, pickup_elements, layer_z, separation / 1e9, gmd
+            )
+        else:
+            self.mutual = FilamentMutual(
+                partial_inductance.CoilFilaments(drive, spacing, thickness, layer_z),
+                PlaceFilaments(
+                    partial_inductance.CoilFilaments(
+                        pickup, spacing, thickness, layer_z
+                    ),
+                    offset,
+                    rotation,
+                    separation,
+                ),
+            )
+        self.method = method
+        self.drive_inductance = drive.inductance
+        self.pickup_inductance = pickup.inductance
+        self.coupling = self.mutual / math.sqrt(
+            self.drive_inductance * self.pickup_inductance
+        )
+
+    def Summary(self):
+        return {
+            "mutual_uh": self.mutual * 1e6,
+            "coupling": self.coupling,
+            "drive_uh": self.drive_inductance * 1e6,
+            "pickup_uh": self.pickup_inductance * 1e6,
+            "method": self.method,
+        }
+
+
+def Estimate(
+    drive_generator,
+    pickup_generator,
+    drive_parameters=None,
+    pickup_parameters=None,
+    **kwargs,
+):
+    """
+    CouplingReport of two generators' coils, on the stackup of the drive
+    coil's parameters.  Keyword arguments go to CouplingReport.
+    """
+    drive_parameters = geometry.MergeDefaults(drive_generator, drive_parameters)
+    spacing, thickness = partial_inductance.Stackup(drive_parameters)
+    kwargs.setdefault("spacing", spacing)
+    kwargs.setdefault("thickness", thickness)
+    return CouplingReport(
+        geometry.Build(drive_generator, drive_parameters),
+        geometry.Build(pickup_generator, pickup_parameters),
+        **kwargs,
+    )
+
+
+def SweepPickup(
+    drive_generator,
+    pickup_generator,
+    page,
+    name,
+    values,
+    drive_parameters=None,
+    pickup_parameters=None,
+    **kwargs,
+):
+    """
+    CouplingReport.Summary() rows, with the swept value, for every value of
+    the pickup parameter `page`/`name`.  The drive coil is built and reduced
+    once.  Keyword arguments go to CouplingReport.
+    """
+    drive_parameters = geometry.MergeDefaults(drive_generator, drive_parameters)
+    spacing, thickness = partial_inductance.Stackup(drive_parameters)
+    kwargs.setdefault("spacing", spacing)
+    kwargs.setdefault("thickness", thickness)
+    drive = geometry.Build(drive_generator, drive_parameters)
+    if kwargs.get("method", "auto") != "filaments":
+        kwargs.setdefault("drive_elements", Elements(drive))
+
+    base = geometry.MergeDefaults(pickup_generator, pickup_parameters)
+    builder = geometry.IncrementalBuilder(pickup_generator)
+    rows = []
+    for value in values:
+        swept = {page: {**base.get(page, {}), name: value}}
+        parameters = geometry.MergeDefaults(pickup_generator, {**base, **swept})
+        report = CouplingReport(drive, builder.Build(parameters), **kwargs)
+        rows.append({f"{page}/{name}": value, **report.Summary()})
+    return rows
@@ -0,0 +1,421 @@
+"""
+Design search: the turns, trace width and trace spacing of a coil that meet
+a target inductance within the limits of the fab and of the board.
+
+The aperture (`Inside Diameter, Radius` or `Outer Ring radius`), the vias,
+pads, copper and stackup are taken from the base parameters, and the base
+`Trace Width` and `Trace Spacing` are the smallest the fab makes.  Every
+combination of the searched values is first screened with closed-form
+models: the inductance estimate of the generator, and a trace length, via
+count and outer radius worked out from its dimensions.  Those run on NumPy
+arrays, a batch of candidates per call.  The candidates that come within
+SCREEN_MARGIN of the targets are ranked by Pareto front on resistance and
+outer diameter, and the best of them (the finalists) are built in full on a
+process pool: their resistance and size are measured on the copper, their
+clearance is checked, the balance of their lobes is measured (coils with two
+lobes) and optionally their inductance is computed numerically.  The
+finalists that meet the targets make up the result, whose Pareto front is
+the set of designs no other one beats on both resistance and size.
+
+Targets are a dictionary like DEFAULT_TARGETS: inductance in Henries,
+resistance in Ohms, lengths in nm.
+"""
+
+import concurrent.futures
+import itertools
+import math
+import os
+
+import numpy as np
+
+from . import balance
+from . import clearance
+from . import geometry
+from . import partial_inductance
+
+DEFAULT_TARGETS = {
+    "Inductance": 10e-6,
+    "Tolerance": 0.05,  # Relative, of the inductance
+    "Max Resistance": None,  # Ohms, None for no limit
+    "Max Outer Diameter": None,  # nm, of the copper and the pads
+    "Max Lobe Imbalance": None,  # Relative, of coils with two lobes
+}
+
+# Screening keeps designs this much (relative) beyond the resistance and size
+# targets, for the error of the closed-form models
+SCREEN_MARGIN = 0.1
+
+DEFAULT_FINALISTS = 32
+DEFAULT_MAX_TURNS = 100
+BATCH_SIZE = 65536  # Candidates per call of the closed-form models
+
+# Default widths and spacings, as multiples of the fab minimum
+WIDTH_STEPS = np.linspace(1, 4, 13)
+SPACING_STEPS = np.linspace(1, 3, 9)
+STEP_ROUNDING = 1000  # nm
+
+TURNS_PARAMETER = {
+    "CoilGeneratorID2L": ("Coil specs", "Total Turns"),
+    "CoilGeneratorIDNL": ("Coil specs", "Turns per Layer"),
+    "FluxNeutralCoilGen": ("Coil specs", "Turns"),
+}
+
+
+def Stackup(parameters):
+    """(copper thickness in Oz, via barrel length in nm) of the parameters."""
+    thickness = parameters["Fab Specs"]["Copper Thickness (Oz.Cu.)"]
+    return thickness, geometry.BarrelLength(
+        parameters["Fab Specs"]["Layer Spacing"], thickness
+    )
+
+
+def ID2LEstimate(parameters):
+    """
+    (trace length, vias, outer radius, valid) of CoilGeneratorID2L designs.
+    Both layers carry `Total Turns` half turns, around the via ring; the
+    tails are quarter turns out to the pads.
+    """
+    turns = np.asarray(parameters["Coil specs"]["Total Turns"])
+    r_in = (
+        parameters["Install Info"]["Inside Diameter, Radius"]
+        + parameters["Install Info"]["Inner Ring gap"]
+    )
+    w = parameters["Fab Specs"]["Trace Width"]
+    s = parameters["Fab Specs"]["Trace Spacing"]
+    fab = parameters["Fab Specs"]
+    via_d = 2 * fab["Via Annular Ring"] + fab["Via Drill"]
+    pad_d = 2 * fab["Pad Annular Ring"] + fab["Pad Drill"]
+    big = np.maximum(via_d, w)
+
+    mean_r = r_in + big / 2 + (turns - 1) / 4 * (w + s)
+    tail_start = r_in + np.where(turns % 2 == 1, w, big) + turns // 2 * (w + s) - w / 2
+    tail_center = tail_start + 2 * big
+    length = 2 * turns * math.pi * mean_r + 2 * math.pi * big
+    outer_r = np.hypot(tail_center, 2 * big) + pad_d / 2
+    return length, np.ones_like(turns), outer_r, turns >= 1
+
+
+def IDNLEstimate(parameters):
+    """
+    (trace length, vias, outer radius, valid) of CoilGeneratorIDNL designs.
+    Every layer carries a spiral of `Turns per Layer` turns between the via
+    rings; the check that the vias fit around the aperture is left to the
+    full build.
+    """
+    turns = np.asarray(parameters["Coil specs"]["Turns per Layer"])
+    layers = len(geometry.LayerList(parameters["Coil specs"]["Layers"]))
+    w = parameters["Fab Specs"]["Trace Width"]
+    s = parameters["Fab Specs"]["Trace Spacing"]
+    fab = parameters["Fab Specs"]
+    via_d = 2 * fab["Via Annular Ring"] + fab["Via Drill"]
+    terminal_d = np.maximum(via_d, 2 * fab["Pad Annular Ring"] + fab["Pad Drill"])
+
+    inner_r = (
+        parameters["Install Info"]["Inside Diameter, Radius"]
+        + parameters["Install Info"]["Inner Ring gap"]
+        + via_d / 2
+    )
+    start_r = inner_r + via_d / 2 + s + w / 2
+    end_r = start_r + turns * (w + s)
+    outer_r = end_r + (w + s) / 2 + w / 2 + s + terminal_d / 2
+    layer_length = (
+        math.pi * turns * (start_r + end_r) + (start_r - inner_r) + (outer_r - end_r)
+    )
+    vias = np.full(np.shape(turns), layers - 1)
+    return (
+        layers * layer_length,
+        vias,
+        outer_r + terminal_d / 2,
+        (turns >= 1) & (layers >= 2) & (layers % 2 == 0),
+    )
+
+
+def FluxNeutralEstimate(parameters):
+    """
+    (trace length, vias, outer radius, valid) of FluxNeutralCoilGen designs.
+    Each turn of a lobe is taken as the D of FluxNeutralInductance(): a half
+    circle and the rectangle up to the vertical tracks.  The pads sit
+    `Stub Length` below the coil.
+    """
+    d = geometry.FluxNeutralDimensions(parameters)
+    turns = np.asarray(d.turns)
+
+    # Sum over the turns of the D perimeters, pi r + 2 r + 2 width
+    last = turns - 1
+    radius = d.arc_start_y - last / 2 * d.pitch
+    width = d.start_x - last / 2 * d.pitch - d.arc_center_x
+    length = 2 * turns * ((math.pi + 2) * radius + 2 * width)
+
+    pad_r = np.hypot(d.arc_center_x + d.aa, d.arc_start_y + d.aa + d.stub_length)
+    outer_r = np.maximum(
+        d.aperture_r - d.aperture_gap + d.trace_width / 2, pad_r + d.pad_d / 2
+    )
+    valid = (
+        (turns >= 1)
+        & (d.line_length > 0)
+        & (d.arc_start_y - last * d.pitch > d.min_radius)
+    )
+    return length, turns + 2, outer_r, valid
+
+
+ESTIMATES = {
+    "CoilGeneratorID2L": ID2LEstimate,
+    "CoilGeneratorIDNL": IDNLEstimate,
+    "FluxNeutralCoilGen": FluxNeutralEstimate,
+}
+
+
+def DefaultSteps(minimum, steps):
+    """Multiples `steps` of a fab minimum, rounded to STEP_ROUNDING."""
+    values = np.round(minimum * steps / STEP_ROUNDING) * STEP_ROUNDING
+    return sorted({int(max(value, minimum)) for value in values})
+
+
+def SearchSpace(generator, parameters, turns=None, widths=None, spacings=None):
+    """
+    The searched values of the turns, trace widths and spacings; widths and
+    spacings below the fab minimum of `parameters` are dropped.
+    """
+    fab = parameters["Fab Specs"]
+    turns = list(turns or range(1, DEFAULT_MAX_TURNS + 1))
+    widths = widths or DefaultSteps(fab["Trace Width"], WIDTH_STEPS)
+    spacings = spacings or DefaultSteps(fab["Trace Spacing"], SPACING_STEPS)
+    return (
+        turns,
+        [w for w in widths if w >= fab["Trace Width"]],
+        [s for s in spacings if s >= fab["Trace Spacing"]],
+    )
+
+
+def Candidates(generator, parameters, turns, widths, spacings):
+    """
+    `parameters` with the turns, width and spacing replaced by flat arrays of
+    every combination of the given values.
+    """
+    grid = np.array(list(itertools.product(turns, widths, spacings)), dtype=np.int64)
+    grid = grid.reshape(-1, 3)
+    candidates = {page: dict(values) for page, values in parameters.items()}
+    page, name = TURNS_PARAMETER[generator]
+    candidates[page][name] = grid[:, 0]
+    candidates["Fab Specs"]["Trace Width"] = grid[:, 1]
+    candidates["Fab Specs"]["Trace Spacing"] = grid[:, 2]
+    return candidates
+
+
+def Batch(candidates, start, stop):
+    """The candidates start:stop of Candidates()."""
+    return {
+        page: {
+            name: value[start:stop] if isinstance(value, np.ndarray) else value
+            for name, value in values.items()
+        }
+        for page, values in candidates.items()
+    }
+
+
+def Screen(generator, candidates, model=geometry.inductance.DEFAULT_MODEL):
+    """
+    Closed-form inductance (H), resistance (Ohms) and outer diameter (nm) of
+    every candidate, and whether its dimensions make a coil at all, as
+    arrays.
+    """
+    thickness, barrel = Stackup(candidates)
+    via_drill = candidates["Fab Specs"]["Via Drill"]
+    count = len(candidates["Fab Specs"]["Trace Width"])
+    results = {
+        name: np.empty(count) for name in ("inductance", "resistance", "outer_diameter")
+    }
+    results["valid"] = np.empty(count, dtype=bool)
+
+    for start in range(0, count, BATCH_SIZE):
+        batch = Batch(candidates, start, start + BATCH_SIZE)
+        part = slice(start, start + BATCH_SIZE)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            length, vias, outer_r, valid = ESTIMATES[generator](batch)
+            results["inductance"][part] = geometry.INDUCTANCE[generator](batch, model)
+        results["resistance"][part] = geometry.GetResistance(
+            length, batch["Fab Specs"]["Trace Width"], thickness
+        ) + vias * geometry.ViaResistance(via_drill, barrel)
+        results["outer_diameter"][part] = 2 * outer_r
+        results["valid"][part] = valid & np.isfinite(results["inductance"][part])
+    return results
+
+
+def MeetsTargets(
+    inductance, resistance, outer_diameter, targets, margin=0, inductance_margin=0
+):
+    """Whether designs meet the targets, with relative margins."""
+    error = np.abs(inductance / targets["Inductance"] - 1)
+    meets = error <= targets["Tolerance"] + inductance_margin
+    if targets["Max Resistance"] is not None:
+        meets &= resistance <= targets["Max Resistance"] * (1 + margin)
+    if targets["Max Outer Diameter"] is not None:
+        meets &= outer_diameter <= targets["Max Outer Diameter"] * (1 + margin)
+    return meets
+
+
+def ParetoFront(first, second):
+    """
+    Indices of the designs that no other one beats on both costs, sorted by
+    the first.  Of identical designs only one is kept.
+    """
+    order = np.lexsort((second, first))
+    best = np.minimum.accumulate(second[order])
+    kept = np.ones(len(order), dtype=bool)
+    kept[1:] = second[order][1:] < best[:-1]
+    return order[kept]
+
+
+def ParetoRanked(first, second, count):
+    """
+    Up to `count` indices, the Pareto front first, then the front of the
+    rest, and so on.
+    """
+    remaining = np.arange(len(first))
+    ranked = []
+    while len(ranked) < count and len(remaining):
+        front = remaining[ParetoFront(first[remaining], second[remaining])]
+        ranked.extend(front[: count - len(ranked)].tolist())
+        remaining = np.setdiff1d(remaining, front, assume_unique=True)
+    return ranked
+
+
+def Verify(job):
+    """
+    Build one finalist in full and measure it.  Runs in a worker process.
+    Returns a row of the result, with "error" set if the design does not
+    build.
+    """
+    generator, parameters, numerical = job
+    page, name = TURNS_PARAMETER[generator]
+    row = {
+        "turns": parameters[page][name],
+        "trace_width_mm": parameters["Fab Specs"]["Trace Width"] / 1e6,
+        "trace_spacing_mm": parameters["Fab Specs"]["Trace Spacing"] / 1e6,
+    }
+    try:
+        coil = geometry.Build(generator, parameters)
+    except ValueError as error:
+        return {**row, "error": str(error)}
+
+    parameters = geometry.MergeDefaults(generator, parameters)
+    report = geometry.Trace(generator, parameters, coil)
+    row.update(
+        inductance_uh=coil.inductance * 1e6,
+        resistance_ohms=report.resistance,
+        outer_diameter_mm=2 * coil.CopperRadius() / 1e6,
+        trace_length_mm=report.trace_length / 1e6,
+        vias=report.vias,
+        clearance_violations=len(clearance.Check(generator, parameters, coil=coil)),
+    )
+    if generator in balance.LOBED_GENERATORS:
+        row["lobe_imbalance"] = balance.WindingBalance(coil).imbalance
+    if numerical:
+        spacing, thickness = partial_inductance.Stackup(parameters)
+        row["numerical_inductance_uh"] = (
+            partial_inductance.CoilInductance(coil, spacing, thickness) * 1e6
+        )
+    return row
+
+
+def Feasible(row, targets):
+    if "error" in row or row["clearance_violations"]:
+        return False
+    limit = targets["Max Lobe Imbalance"]
+    if limit is not None and not abs(row.get("lobe_imbalance", 0)) <= limit:
+        return False
+    inductance = row.get("numerical_inductance_uh", row["inductance_uh"]) / 1e6
+    return bool(
+        MeetsTargets(
+            inductance,
+            row["resistance_ohms"],
+            row["outer_diameter_mm"] * 1e6,
+            targets,
+        )
+    )
+
+
+def Optimize(
+    generator,
+    base,
+    targets,
+    turns=None,
+    widths=None,
+    spacings=None,
+    finalists=DEFAULT_FINALISTS,
+    numerical=False,
+    workers=None,
+):
+    """
+    Search the turns, trace widths and spacings of a generator's coil for
+    `targets` (see DEFAULT_TARGETS), the rest of the coil as in `base`.
+    `turns`, `widths` and `spacings` are the values to try, defaults around
+    the fab minimum.  At most `finalists` designs are built in full, on
+    `workers` processes (None for all cores); `numerical` checks their
+    inductance with partial_inductance instead of the closed-form estimate.
+
+    Returns a dictionary with the number of "candidates" and of "screened"
+    ones, the verified "finalists" (rows with a "feasible" flag) and the
+    "front": the Pareto front of the feasible ones on resistance and outer
+    diameter, by resistance.
+    """
+    if generator not in ESTIMATES:
+        raise ValueError(
+            f"Cannot optimize {generator}, only {', '.join(sorted(ESTIMATES))}"
+        )
+    targets = {**DEFAULT_TARGETS, **targets}
+    parameters = geometry.MergeDefaults(generator, base)
+    space = SearchSpace(generator, parameters, turns, widths, spacings)
+    candidates = Candidates(generator, parameters, *space)
+
+    screen = Screen(generator, candidates)
+    passed = np.flatnonzero(
+        screen["valid"]
+        & MeetsTargets(
+            screen["inductance"],
+            screen["resistance"],
+            screen["outer_diameter"],
+            targets,
+            SCREEN_MARGIN,
+            # The closed-form inductance is also the verified one, unless the
+            # finalists get the numerical one
+            SCREEN_MARGIN if numerical else 0,
+        )
+    )
+    chosen = passed[
+        ParetoRanked(
+            screen["resistance"][passed], screen["outer_diameter"][passed], finalists
+        )
+    ]
+
+    page, name = TURNS_PARAMETER[generator]
+    jobs = []
+    for index in chosen:
+        design = {page: dict(values) for page, values in parameters.items()}
+        design[page][name] = int(candidates[page][name][index])
+        for key in ("Trace Width", "Trace Spacing"):
+            design["Fab Specs"][key] = int(candidates["Fab Specs"][key][index])
+        jobs.append((generator, design, numerical))
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(jobs) <= 1:
+        rows = list(map(Verify, jobs))
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+            rows = list(pool.map(Verify, jobs))
+
+    for row, index in zip(rows, chosen):
+        row["estimated_resistance_ohms"] = float(screen["resistance"][index])
+        row["feasible"] = Feasible(row, targets)
+
+    feasible = [row for row in rows if row["feasible"]]
+    front = ParetoFront(
+        np.array([row["resistance_ohms"] for row in feasible]),
+        np.array([row["outer_diameter_mm"] for row in feasible]),
+    )
+    return {
+        "candidates": len(candidates["Fab Specs"]["Trace Width"]),
+        "screened": len(passed),
+        "finalists": rows,
+        "front": [feasible[index] for index in front],
+    }
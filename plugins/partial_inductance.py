@@ -0,0 +1,337 @@
+"""
+Numerical inductance of the generated trace, for checking the closed-form
+estimates in inductance.py.
+
+The copper path (see path.TracePath) is cut into straight filaments, arcs
+into chords of at most `max_angle` degrees.  The coil inductance is the sum
+of all partial inductances between the oriented filaments:
+
+    L = sum_i Lp_ii + sum_i sum_j!=i Mp_ij
+
+Self terms use Grover's formula for a straight rectangular bar.  Mutual
+terms use Neumann's formula: the integral along one filament in closed form,
+the one along the other by Gauss-Legendre quadrature, with a higher order
+for filaments closer than a few lengths.  The distance is softened by the
+geometric mean distance of the trace cross-section so touching filaments
+stay finite.  Layers sit `spacing + thickness` apart.
+
+The filament pairs are evaluated in blocks sized to stay below `max_memory`
+bytes, optionally on a process pool.
+"""
+
+import concurrent.futures
+import math
+import os
+
+import numpy as np
+
+from . import geometry
+from . import path
+from .inductance import MU_0, WindingGMD
+
+DEFAULT_MAX_ANGLE = 10.0  # Degrees of arc per filament
+DEFAULT_MAX_MEMORY = 64 * 1024 * 1024
+DEFAULT_SPACING = 1510000  # Dielectric between adjacent copper layers, nm
+
+FAR_ORDER = 2  # Gauss points on the outer filament for distant pairs
+NEAR_ORDER = 8  # ... and for pairs closer than NEAR_DISTANCE lengths
+NEAR_DISTANCE = 2.0
+
+# float64 temporaries per point and filament while a block is computed
+_ARRAYS_PER_PAIR = 10
+
+
+class Filaments:
+    """
+    Straight, oriented current filaments.  `start` and `end` are (n, 3) in
+    meters, `width` and `thickness` the trace cross-section in meters.
+    """
+
+    def __init__(self, start, end, width, thickness):
+        self.start = start
+        self.end = end
+        self.width = width
+        self.thickness = thickness
+
+    def __len__(self):
+        return len(self.start)
+
+    @property
+    def length(self):
+        return np.linalg.norm(self.end - self.start, axis=1)
+
+
+def LayerHeights(layers, spacing, thickness):
+    """
+    Filament height (m) of each copper layer used, in stackup order with
+    `spacing + thickness` between neighbours.  Intermediate copper layers that
+    the coil doesn't use are assumed absent.
+    """
+    used = np.unique(layers)
+    return {
+        int(layer): -rank * (spacing + thickness) for rank, layer in enumerate(used)
+    }
+
+
+def CoilFilaments(
+    coil,
+    spacing=DEFAULT_SPACING,
+    thickness=geometry.TRACE_THICKNESS_1OZ,
+    layer_z=None,
+    max_angle=DEFAULT_MAX_ANGLE,
+):
+    """
+    Filaments along the trace path of a CoilGeometry, oriented in the
+    direction of the current.  `spacing` is in internal units (nm) like the
+    geometry, `thickness` in meters.  `layer_z` optionally maps layer codes
+    to filament heights in meters.
+    """
+    trace = path.TracePath(coil)
+    if layer_z is None:
+        layer_z = LayerHeights(trace["layer"], spacing / 1e9, thickness)
+
+    starts, ends, widths = [], [], []
+    for kind, table in ((path.ARC, coil.arcs), (path.LINE, coil.lines)):
+        steps = trace[trace["kind"] == kind]
+        rows = table[steps["index"]]
+        if kind == path.ARC:
+            # Chords of at most max_angle degrees per arc
+            pieces = np.maximum(1, np.ceil(np.abs(rows["angle"]) / max_angle))
+            pieces = pieces.astype(np.int64)
+            arc = np.repeat(np.arange(len(rows)), pieces)
+            first = np.repeat(np.cumsum(pieces) - pieces, pieces)
+            k = np.arange(len(arc)) - first
+            fraction = np.stack((k, k + 1)) / pieces[arc]
+
+            cx, cy = rows["cx"][arc], rows["cy"][arc]
+            dx, dy = rows["sx"][arc] - cx, rows["sy"][arc] - cy
+            theta = np.radians(rows["angle"][arc]) * fraction
+            x = cx + dx * np.cos(theta) - dy * np.sin(theta)
+            y = cy + dx * np.sin(theta) + dy * np.cos(theta)
+            a, b = np.stack((x[0], y[0]), 1), np.stack((x[1], y[1]), 1)
+            reverse = steps["reversed"][arc]
+            layer = rows["layer"][arc]
+            width = rows["width"][arc]
+        else:
+            a = np.column_stack((rows["x1"], rows["y1"])).astype(np.float64)
+            b = np.column_stack((rows["x2"], rows["y2"])).astype(np.float64)
+            reverse = steps["reversed"]
+            layer = rows["layer"]
+            width = rows["width"]
+
+        a, b = np.where(reverse[:, None], b, a), np.where(reverse[:, None], a, b)
+        z = np.array([layer_z[int(code)] for code in layer], dtype=np.float64)
+        starts.append(np.column_stack((a / 1e9, z)))
+        ends.append(np.column_stack((b / 1e9, z)))
+        widths.append(width / 1e9)
+
+    start, end = np.concatenate(starts), np.concatenate(ends)
+    keep = np.any(start != end, axis=1)  # Zero length primitives carry nothing
+    return Filaments(start[keep], end[keep], np.concatenate(widths)[keep], thickness)
+
+
+def SelfPartialInductance(length, width, thickness):
+    """Grover's partial self inductance of a straight rectangular bar (H)."""
+    wt = width + thickness
+    return (
+        MU_0
+        / (2 * math.pi)
+        * length
+        * (np.log(2 * length / wt) + 0.5 + 0.2235 * wt / length)
+    )
+
+
+def GaussPoints(order):
+    """Gauss-Legendre nodes and weights on [0, 1]."""
+    nodes, weights = np.polynomial.legendre.leggauss(order)
+    return (nodes + 1) / 2, weights / 2
+
+
+def SegmentIntegral(points, start, direction, length, gmd):
+    """
+    Closed form of the integral of 1/r along straight filaments, seen from
+    `points`.  The points and the filament `start` and unit `direction` are
+    (3, ...) arrays that broadcast against each other; `gmd` softens r.
+    """
+    along = 0
+    distance2 = 0
+    for axis in range(3):
+        offset = points[axis] - start[axis]
+        along = along + offset * direction[axis]
+        distance2 = distance2 + offset**2
+    across = distance2 - along**2
+    del distance2
+    rho = np.sqrt(np.maximum(across, 0) + gmd**2)
+    return np.arcsinh((length - along) / rho) + np.arcsinh(along / rho)
+
+
+def _Geometry(filaments, rows):
+    """Start, unit direction (both (3, n)) and length of filaments."""
+    start = filaments.start[rows].T
+    delta = filaments.end[rows].T - start
+    length = np.linalg.norm(delta, axis=0)
+    return start, delta / length, length
+
+
+def NeumannMutual(filaments, rows, cols, order):
+    """
+    Mutual partial inductances between filaments `rows` and `cols` (index
+    arrays of equal length, pairwise), by Neumann's formula.
+    """
+    nodes, weights = GaussPoints(order)
+    start_i, u_i, length_i = _Geometry(filaments, rows)
+    start_j, u_j, length_j = _Geometry(filaments, cols)
+    points = start_i[:, :, None] + (u_i * length_i)[:, :, None] * nodes
+
+    gmd = WindingGMD(
+        (filaments.width[rows] + filaments.width[cols]) / 2, filaments.thickness
+    )
+    integral = SegmentIntegral(
+        points,
+        start_j[:, :, None],
+        u_j[:, :, None],
+        length_j[:, None],
+        gmd[:, None],
+    )
+    return (
+        MU_0
+        / (4 * math.pi)
+        * np.einsum("kn,kn->n", u_i, u_j)
+        * length_i
+        * (integral @ weights)
+    )
+
+
+def BlockSum(filaments, i0, i1, j0, j1):
+    """
+    Sum of the mutual partial inductances between filaments [i0, i1) and
+    [j0, j1), without the self terms.
+    """
+    rows = np.arange(i0, i1)
+    cols = np.arange(j0, j1)
+    nodes, weights = GaussPoints(FAR_ORDER)
+    start_i, u_i, length_i = _Geometry(filaments, rows)
+    start_j, u_j, length_j = _Geometry(filaments, cols)
+
+    # Points on the `rows` filaments: (3, rows, nodes, 1) against (3, 1, 1, cols)
+    points = start_i[:, :, None] + (u_i * length_i)[:, :, None] * nodes
+    gmd = WindingGMD(filaments.width.mean(), filaments.thickness)
+    integral = SegmentIntegral(
+        points[..., None],
+        start_j[:, None, None, :],
+        u_j[:, None, None, :],
+        length_j,
+        gmd,
+    )
+    integral = np.einsum("inj,n->ij", integral, weights)
+    mutual = MU_0 / (4 * math.pi) * (u_i.T @ u_j) * length_i[:, None] * integral
+
+    # Redo the close pairs with a higher order, and drop the self terms
+    mid_i = start_i + u_i * length_i / 2
+    mid_j = start_j + u_j * length_j / 2
+    distance = np.sqrt(
+        sum((mid_i[axis][:, None] - mid_j[axis][None, :]) ** 2 for axis in range(3))
+    )
+    near = distance < NEAR_DISTANCE * np.maximum(length_i[:, None], length_j[None, :])
+    near &= rows[:, None] != cols[None, :]
+    near_i, near_j = np.nonzero(near)
+    mutual[near_i, near_j] = NeumannMutual(
+        filaments, rows[near_i], cols[near_j], NEAR_ORDER
+    )
+    mutual[rows[:, None] == cols[None, :]] = 0
+    return float(mutual.sum())
+
+
+def BlockSize(max_memory):
+    """Filaments per block so one block of pairs stays below max_memory."""
+    bytes_per_pair = 8 * _ARRAYS_PER_PAIR * FAR_ORDER
+    return max(16, int(math.sqrt(max_memory / bytes_per_pair)))
+
+
+def Blocks(count, size):
+    """Upper triangle of (i0, i1, j0, j1, weight) blocks, weight 2 off-diagonal."""
+    edges = list(range(0, count, size)) + [count]
+    for a in range(len(edges) - 1):
+        for b in range(a, len(edges) - 1):
+            yield edges[a], edges[a + 1], edges[b], edges[b + 1], 1 if a == b else 2
+
+
+_worker_filaments = None
+
+
+def _InitWorker(filaments):
+    global _worker_filaments
+    _worker_filaments = filaments
+
+
+def _WorkerBlock(block):
+    i0, i1, j0, j1, weight = block
+    return weight * BlockSum(_worker_filaments, i0, i1, j0, j1)
+
+
+def FilamentInductance(filaments, max_memory=DEFAULT_MAX_MEMORY, workers=1):
+    """
+    Total inductance (H) of series connected filaments.  `workers` > 1
+    spreads the blocks of filament pairs over a process pool, None or 0 uses
+    all cores.  `max_memory` is shared by the workers.
+    """
+    workers = workers or os.cpu_count() or 1
+    blocks = list(Blocks(len(filaments), BlockSize(max_memory // workers)))
+
+    total = float(
+        np.sum(
+            SelfPartialInductance(
+                filaments.length, filaments.width, filaments.thickness
+            )
+        )
+    )
+    if workers == 1 or len(blocks) == 1:
+        for i0, i1, j0, j1, weight in blocks:
+            total += weight * BlockSum(filaments, i0, i1, j0, j1)
+        return total
+
+    # Every worker holds the full filament set
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=workers, initializer=_InitWorker, initargs=(filaments,)
+    ) as pool:
+        total += sum(pool.map(_WorkerBlock, blocks))
+    return total
+
+
+def CoilInductance(
+    coil,
+    spacing=DEFAULT_SPACING,
+    thickness=geometry.TRACE_THICKNESS_1OZ,
+    layer_z=None,
+    max_angle=DEFAULT_MAX_ANGLE,
+    max_memory=DEFAULT_MAX_MEMORY,
+    workers=1,
+):
+    """Numerical inductance (H) of a CoilGeometry, see CoilFilaments()."""
+    filaments = CoilFilaments(coil, spacing, thickness, layer_z, max_angle)
+    return FilamentInductance(filaments, max_memory, workers)
+
+
+def Stackup(parameters):
+    """
+    (spacing, thickness) for the filaments from a generator's merged
+    parameters, defaults where the generator has no such parameters.
+    """
+    fab = parameters["Fab Specs"]
+    return (
+        fab.get("Layer Spacing", DEFAULT_SPACING),
+        geometry.TRACE_THICKNESS_1OZ * fab.get("Copper Thickness (Oz.Cu.)", 1),
+    )
+
+
+def Inductance(generator, parameters=None, **kwargs):
+    """
+    Build a generator's coil and compute its inductance numerically.  The
+    layer spacing and copper thickness come from the parameters where the
+    generator has them.
+    """
+    parameters = geometry.MergeDefaults(generator, parameters)
+    spacing, thickness = Stackup(parameters)
+    kwargs.setdefault("spacing", spacing)
+    kwargs.setdefault("thickness", thickness)
+    return CoilInductance(geometry.Build(generator, parameters), **kwargs)
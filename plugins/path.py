@@ -0,0 +1,232 @@
+"""
+Trace path of a generated coil.
+
+The generators emit arcs and lines in whatever order is convenient to draw
+them.  TracePath() chains the copper primitives of a CoilGeometry into the
+order the current flows through them, from pad 1 to pad 2, switching layers
+at vias and pads.  Analyses that need the direction of the current (e.g.
+inductance) work on this path.
+"""
+
+import numpy as np
+
+from . import geometry
+
+ARC = 0
+LINE = 1
+
+PATH_DTYPE = np.dtype(
+    [
+        ("kind", "u1"),  # ARC or LINE
+        ("index", "i8"),  # Row in coil.arcs or coil.lines
+        ("reversed", "?"),  # Current flows from the end to the start
+        ("layer", "u1"),
+    ]
+)
+
+
+def ArcEndPoints(arcs):
+    """End points of arcs, as floats."""
+    return arcs["ex"].astype(np.float64), arcs["ey"].astype(np.float64)
+
+
+def EndPoints(coil):
+    """
+    Start and end points of every copper arc and line, as (kind, index,
+    layer, start, end, width) arrays.  `start` and `end` have shape (n, 2).
+    """
+    arcs = coil.arcs[geometry.IsCopper(coil.arcs["layer"])]
+    lines = coil.lines[geometry.IsCopper(coil.lines["layer"])]
+    arc_rows = np.flatnonzero(geometry.IsCopper(coil.arcs["layer"]))
+    line_rows = np.flatnonzero(geometry.IsCopper(coil.lines["layer"]))
+
+    arc_end = np.column_stack(ArcEndPoints(arcs))
+    start = np.concatenate(
+        (
+            np.column_stack((arcs["sx"], arcs["sy"])),
+            np.column_stack((lines["x1"], lines["y1"])),
+        )
+    ).astype(np.float64)
+    end = np.concatenate((arc_end, np.column_stack((lines["x2"], lines["y2"]))))
+    kind = np.concatenate(
+        (np.full(len(arcs), ARC, dtype="u1"), np.full(len(lines), LINE, dtype="u1"))
+    )
+    index = np.concatenate((arc_rows, line_rows))
+    layer = np.concatenate((arcs["layer"], lines["layer"]))
+    width = np.concatenate((arcs["width"], lines["width"]))
+    return kind, index, layer, start, end, width
+
+
+class PointGrid:
+    """
+    Uniform grid over points, for finding the points within `cell` of a
+    position without scanning all of them.
+    """
+
+    def __init__(self, points, cell):
+        self.cell = max(float(cell), 1.0)
+        self.cells = {}
+        keys = np.floor(np.asarray(points) / self.cell).astype(np.int64)
+        for row, key in enumerate(map(tuple, keys.tolist())):
+            self.cells.setdefault(key, []).append(row)
+
+    def Near(self, point):
+        """Rows of the points in the 3x3 cells around `point`."""
+        x, y = np.floor(np.asarray(point) / self.cell).astype(np.int64).tolist()
+        return [
+            row
+            for dx in (-1, 0, 1)
+            for dy in (-1, 0, 1)
+            for row in self.cells.get((x + dx, y + dy), ())
+        ]
+
+
+def TracePath(coil, tolerance=None):
+    """
+    Copper primitives of `coil` in the order the current flows from pad 1 to
+    pad 2, as a PATH_DTYPE array.
+
+    Primitives join where an end point lies within `tolerance` (default: half
+    the narrowest trace) of the current position, on the same layer or on any
+    layer at a pad or via.  Raises ValueError if the trace is broken.
+    """
+    kind, index, layer, start, end, width = EndPoints(coil)
+    if tolerance is None:
+        tolerance = width.min() / 2 if len(width) else 0
+    ends = PointGrid(np.concatenate((start, end)), tolerance)
+
+    pads = coil.pads
+    pad_xy = np.column_stack((pads["x"], pads["y"])).astype(np.float64)
+    pad_grid = PointGrid(pad_xy, pads["diameter"].max() / 2 if len(pads) else 1)
+
+    def AtPad(point):
+        near = np.array(pad_grid.Near(point), dtype=np.int64)
+        if not len(near):
+            return None
+        distance = np.hypot(*(pad_xy[near] - point).T)
+        nearest = np.argmin(distance)
+        pad = near[nearest]
+        return pad if distance[nearest] <= pads["diameter"][pad] / 2 else None
+
+    first = np.flatnonzero(pads["number"] == 1)
+    last = np.flatnonzero(pads["number"] == 2)
+    if not len(first) or not len(last):
+        raise ValueError("The coil needs pads 1 and 2 to trace its path")
+    point = pad_xy[first[0]]
+    current_layer = None  # At a pad, any layer connects
+
+    visited = np.zeros(len(kind), dtype=bool)
+    path = []
+    while True:
+        # Only end points within `tolerance` can join, and those are near
+        near = np.unique(np.array(ends.Near(point), dtype=np.int64) % len(kind))
+        near = near[~visited[near]]
+        if current_layer is not None:
+            near = near[layer[near] == current_layer]
+        to_start = np.hypot(*(start[near] - point).T)
+        to_end = np.hypot(*(end[near] - point).T)
+        distance = np.minimum(to_start, to_end)
+
+        nearest = int(np.argmin(distance)) if len(distance) else None
+        if nearest is None or distance[nearest] > tolerance:
+            if not path:
+                raise ValueError("No trace starts at pad 1")
+            raise ValueError(
+                f"Trace is broken at ({point[0] / 1e6:.4f}, {point[1] / 1e6:.4f}) mm"
+            )
+
+        reverse = bool(to_end[nearest] < to_start[nearest])
+        nearest = near[nearest]
+        visited[nearest] = True
+        path.append((kind[nearest], index[nearest], reverse, layer[nearest]))
+        point = start[nearest] if reverse else end[nearest]
+
+        pad = AtPad(point)
+        if pad is not None and pads["number"][pad] == 2:
+            break
+        # Pads and vias connect all copper layers
+        current_layer = None if pad is not None else layer[nearest]
+
+    return np.array(path, dtype=PATH_DTYPE)
+
+
+def PathOffsets(coil, kind, index, length):
+    """
+    Distance (nm) along the trace from pad 1 to the start of each primitive,
+    given as rows (`kind`, `index`, `length`) like those of EndPoints(), and
+    whether the current runs from its end to its start.  The distance is NaN
+    for rows off the path, such as pads.  Raises ValueError if the trace is
+    broken.
+    """
+    trace = TracePath(coil)
+    keys = kind.astype(np.int64) * (len(kind) + 1) + index
+    rows = np.argsort(keys)
+    trace_keys = trace["kind"].astype(np.int64) * (len(kind) + 1) + trace["index"]
+    row = rows[np.searchsorted(keys[rows], trace_keys)]
+
+    offset = np.full(len(kind), np.nan)
+    reverse = np.zeros(len(kind), dtype=bool)
+    offset[row] = np.cumsum(length[row]) - length[row]
+    reverse[row] = trace["reversed"]
+    return offset, reverse
+
+
+OPEN_END_DTYPE = np.dtype(
+    [
+        ("kind", "u1"),  # ARC or LINE
+        ("index", "i8"),  # Row in coil.arcs or coil.lines
+        ("layer", "u1"),
+        ("x", "i8"),
+        ("y", "i8"),
+        ("gap", "f8"),  # To the nearest other end on the layer, nm
+    ]
+)
+
+
+def OpenEnds(coil):
+    """
+    Ends of copper arcs and lines that meet nothing, as an OPEN_END_DTYPE
+    array: no other end on the same layer is at exactly the same point (in
+    integer nm), and no pad or via covers it.  A `gap` of a few nm is a
+    hairline gap that DRC reports as unconnected.
+    """
+    kind, index, layer, start, end, _ = EndPoints(coil)
+    points = np.concatenate((start, end)).astype(np.int64)
+    layers = np.concatenate((layer, layer))
+    _, inverse, counts = np.unique(
+        np.column_stack((layers, points)),
+        axis=0,
+        return_inverse=True,
+        return_counts=True,
+    )
+    alone = np.flatnonzero(counts[inverse.ravel()] == 1)
+
+    pads = coil.pads
+    distance = np.hypot(
+        points[alone, 0, np.newaxis] - pads["x"],
+        points[alone, 1, np.newaxis] - pads["y"],
+    )
+    alone = alone[~np.any(distance <= pads["diameter"] / 2, axis=1)]
+
+    ends = np.empty(len(alone), dtype=OPEN_END_DTYPE)
+    ends["kind"] = kind[alone % len(kind)]
+    ends["index"] = index[alone % len(kind)]
+    ends["layer"] = layers[alone]
+    ends["x"], ends["y"] = points[alone].T
+    for row, end in zip(ends, alone):
+        others = np.flatnonzero(layers == layers[end])
+        others = others[others != end]
+        row["gap"] = (
+            np.hypot(*(points[others] - points[end]).T).min() if len(others) else np.inf
+        )
+    return ends
+
+
+def DescribeOpenEnd(end):
+    """One line description of an open end, in mm."""
+    kind = "arc" if end["kind"] == ARC else "line"
+    return (
+        f"{kind} {end['index']} ends at ({end['x'] / 1e6:.6f}, "
+        f"{end['y'] / 1e6:.6f}) on {geometry.LAYER_NAMES[end['layer']]}, "
+        f"{end['gap']:.0f} nm from the next end"
+    )
@@ -0,0 +1,259 @@
+"""
+Lazy registration of the Footprint Wizards.
+
+KiCAD imports the plugin package at every start, and the generators pull in
+NumPy and the numerical engines.  Instead of the wizards themselves, a
+LazyWizard is registered for each of them: it answers the name and
+description from the WIZARDS table, and imports the generator module and
+builds the real wizard the first time KiCAD asks for anything else, i.e. when
+the wizard is opened.
+
+The "Coil Array" action plugin is registered the same way: the placement
+code in coil_array.py is only imported when the action is run.
+
+Imports made through ImportModule() are timed per module (cumulative and
+self time, like `python -X importtime`); the first build of a wizard lists
+the slowest of the modules it loaded in its build messages.
+"""
+
+import collections
+import importlib
+import sys
+import time
+
+try:
+    import pcbnew
+except ImportError:
+    # Running outside of KiCAD, e.g. headless use of the geometry core.
+    pcbnew = None
+
+WizardInfo = collections.namedtuple("WizardInfo", "module name description value")
+
+# Generator class name -> module and the strings KiCAD shows in the wizard list
+WIZARDS = {
+    "CoilGeneratorID2L": WizardInfo(
+        ".coil_generator",
+        "Coil Generator from ID",
+        "Generates a coil around a circular aperture.",
+        "Coil based on ID",
+    ),
+    "CoilGeneratorIDNL": WizardInfo(
+        ".coil_generator",
+        "Coil Generator from ID, N Layers",
+        "Generates a coil stacked on an even number of layers around a circular "
+        "aperture.",
+        "Multilayer coil based on ID",
+    ),
+    "CoilGenerator1L1T": WizardInfo(
+        ".coil_generator",
+        "Coil Generator, single layer, 1 turn",
+        "Generates a single turn loop at a circular aperture.",
+        "Single coil, single layer",
+    ),
+    "FluxNeutralCoilGen": WizardInfo(
+        ".flux_neutral_coil_generator",
+        "Flux Neutral Coil Generator",
+        "Generates a flux-neutral coil within a circular aperture.",
+        "Flux-Neutral Coil",
+    ),
+    "RectangularSpiralCoilGen": WizardInfo(
+        ".spiral_coil_generator",
+        "Rectangular Spiral Coil Generator",
+        "Generates a spiral coil filling a rectangle.",
+        "Rectangular spiral coil",
+    ),
+    "TrapezoidalSpiralCoilGen": WizardInfo(
+        ".spiral_coil_generator",
+        "Trapezoidal Spiral Coil Generator",
+        "Generates a spiral coil filling an isosceles trapezoid.",
+        "Trapezoidal spiral coil",
+    ),
+    "WedgeSpiralCoilGen": WizardInfo(
+        ".spiral_coil_generator",
+        "Wedge Spiral Coil Generator",
+        "Generates a spiral coil filling a wedge of an annulus, e.g. a stator "
+        "segment.",
+        "Wedge spiral coil",
+    ),
+}
+
+REPORTED_MODULES = 5  # Slowest imports listed in the build messages
+
+# Module name -> (cumulative, self) import time in s
+IMPORT_TIMES = {}
+
+
+class _TimedLoader:
+    """Runs a module through its real loader, timing the execution."""
+
+    def __init__(self, loader, timer):
+        self.loader = loader
+        self.timer = timer
+
+    def create_module(self, spec):
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module):
+        # The module only ever sees its real loader
+        module.__spec__.loader = self.loader
+        module.__loader__ = self.loader
+        self.timer.children.append(0.0)
+        start = time.perf_counter()
+        try:
+            self.loader.exec_module(module)
+        finally:
+            elapsed = time.perf_counter() - start
+            children = self.timer.children.pop()
+            IMPORT_TIMES[module.__name__] = (elapsed, elapsed - children)
+            if self.timer.children:
+                self.timer.children[-1] += elapsed
+
+
+class ImportTimer:
+    """Meta path finder timing every module imported while it is installed."""
+
+    def __init__(self):
+        self.children = []
+
+    def find_spec(self, name, path=None, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(name, path, target)
+            if spec is None:
+                continue
+            if hasattr(spec.loader, "exec_module"):
+                spec.loader = _TimedLoader(spec.loader, self)
+            return spec
+        return None
+
+    def __enter__(self):
+        sys.meta_path.insert(0, self)
+        return self
+
+    def __exit__(self, *exc):
+        sys.meta_path.remove(self)
+
+
+def ImportModule(module):
+    """
+    Import a module of this package (or any other), timing what it loads.
+    Returns the module and the names of the modules that were loaded.
+    """
+    before = set(IMPORT_TIMES)
+    with ImportTimer():
+        imported = importlib.import_module(module, __package__)
+    return imported, [name for name in IMPORT_TIMES if name not in before]
+
+
+def ImportReport(modules, count=REPORTED_MODULES):
+    """
+    Self import time of `modules` as one line of text, slowest first.  Other
+    packages are summed up, the modules of this one are listed one by one.
+    """
+    times = collections.Counter()
+    for name in modules:
+        package = name if name.startswith(__package__ + ".") else name.split(".")[0]
+        times[package] += IMPORT_TIMES[name][1]
+    total = sum(times.values())
+    slowest = ", ".join(
+        f"{name} {own * 1e3:.0f} ms" for name, own in times.most_common(count)
+    )
+    return f"Imported {len(modules)} modules in {total * 1e3:.0f} ms: {slowest}"
+
+
+if pcbnew is not None:
+
+    class LazyWizard(pcbnew.FootprintWizardPlugin):
+        """
+        Stands in for a wizard until it is opened.  Everything but the
+        strings of the wizard list is forwarded to the real wizard.
+        """
+
+        def __init__(self, generator):
+            self.generator = generator
+            self.info = WIZARDS[generator]
+            self.wizard = None
+            self.load_report = None
+
+        GetName = lambda self: self.info.name
+        GetDescription = lambda self: self.info.description
+        GetValue = lambda self: self.info.value
+        GetImage = lambda self: ""
+
+        def Wizard(self):
+            if self.wizard is None:
+                start = time.perf_counter()
+                module, modules = ImportModule(self.info.module)
+                self.wizard = getattr(module, self.generator)()
+                elapsed = time.perf_counter() - start
+                self.load_report = (
+                    f"Loaded {self.generator} in {elapsed * 1e3:.0f} ms. "
+                    + ImportReport(modules)
+                )
+            return self.wizard
+
+        def GetBuildMessages(self):
+            messages = self.Wizard().GetBuildMessages()
+            if self.load_report:
+                messages = f"{self.load_report}\n{messages}"
+                self.load_report = None
+            return messages
+
+        def __getattr__(self, name):
+            # Only reached for attributes the stand-in does not have
+            return getattr(self.Wizard(), name)
+
+    def _Forward(name):
+        def method(self, *args, **kwargs):
+            return getattr(self.Wizard(), name)(*args, **kwargs)
+
+        method.__name__ = name
+        return method
+
+    # The wizard methods KiCAD calls are defined on the base class, so
+    # __getattr__ would never see them
+    for _name in dir(pcbnew.FootprintWizardPlugin):
+        if _name[:1].isupper() and _name not in LazyWizard.__dict__:
+            setattr(LazyWizard, _name, _Forward(_name))
+
+    class CoilArrayAction(pcbnew.ActionPlugin):
+        """Places an array of one generated coil, see coil_array.py."""
+
+        def defaults(self):
+            self.name = "Coil Array"
+            self.category = "Coil generators"
+            self.description = (
+                "Places copies of one generated coil on a grid or at a list of "
+                "positions, as set in the board's -coil-array.json file."
+            )
+            self.show_toolbar_button = False
+
+        def Run(self):
+            module, _ = ImportModule(".coil_array")
+            try:
+                report = module.PlaceFromFile(pcbnew, pcbnew.GetBoard())
+            except (OSError, ValueError) as error:
+                report = f"Cannot place the coils: {error}\n"
+            pcbnew.Refresh()
+            ShowMessage(report, self.name)
+
+
+def ShowMessage(text, title):
+    """A message box inside of KiCAD, the console outside of it."""
+    try:
+        import wx
+    except ImportError:
+        print(text, end="")
+        return
+    wx.MessageBox(text, title)
+
+
+def Register():
+    """
+    Register a stand-in for every wizard and the array action, without
+    importing any of them.
+    """
+    for generator in WIZARDS:
+        LazyWizard(generator).register()
+    CoilArrayAction().register()
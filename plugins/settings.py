@@ -0,0 +1,211 @@
+"""
+Write-behind store for the wizards' parameters, with named presets.
+
+Each generator keeps one JSON file in the user's config directory, holding
+its presets and the name of the active one.  The Footprint Wizard reads it
+once per session and from then on works on the copy in memory; changed
+values are written back by a background timer, so bursts of edits turn into
+a single write.  Files are replaced atomically and only when a value
+actually changed.  Anything left pending is flushed at exit.
+
+Parameter files from older versions, kept next to the plugin, are picked up
+as the "default" preset the first time a generator is loaded.
+"""
+
+import atexit
+import json
+import os
+import sys
+import tempfile
+import threading
+
+from . import cache
+from . import geometry
+
+DEFAULT_PRESET = "default"
+WRITE_DELAY = 1.0  # Seconds to wait for more changes before writing
+
+# Set to a directory to move the store, or to an empty string to keep the
+# parameters in memory only.
+CONFIG_DIR_ENV = "KICAD_COIL_CONFIG_DIR"
+
+
+def UserConfigDir():
+    if CONFIG_DIR_ENV in os.environ:
+        return os.environ[CONFIG_DIR_ENV] or None
+
+    if sys.platform == "win32":
+        base = os.environ.get("APPDATA", os.path.expanduser("~"))
+    elif sys.platform == "darwin":
+        base = os.path.expanduser("~/Library/Application Support")
+    else:
+        base = os.environ.get("XDG_CONFIG_HOME", os.path.expanduser("~/.config"))
+    return os.path.join(base, "kicad-coil-generators")
+
+
+def LegacyPath(generator):
+    """Where older versions saved a generator's parameters."""
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), generator + ".json")
+
+
+class ParameterStore:
+    """
+    Presets of every generator, as {generator: {"active": name, "presets":
+    {name: parameters}}}.  Safe to use from several threads.
+    """
+
+    def __init__(self, directory=None, delay=WRITE_DELAY):
+        self.directory = directory
+        self.delay = delay
+        self.writes = 0
+        self._data = {}
+        self._written = {}  # generator -> JSON text last on disk
+        self._lock = threading.RLock()
+        self._timer = None
+
+    def _Path(self, generator):
+        return os.path.join(self.directory, generator + ".json")
+
+    def _Read(self, path):
+        try:
+            with open(path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _Data(self, generator):
+        """The generator's presets, read from disk on first use."""
+        data = self._data.get(generator)
+        if data is not None:
+            return data
+
+        data = self._Read(self._Path(generator)) if self.directory else None
+        if isinstance(data, dict) and isinstance(data.get("presets"), dict):
+            self._written[generator] = self._Serialize(data)
+        else:
+            legacy = self._Read(LegacyPath(generator))
+            data = {
+                "active": DEFAULT_PRESET,
+                "presets": {DEFAULT_PRESET: legacy} if legacy else {},
+            }
+        data.setdefault("active", DEFAULT_PRESET)
+        self._data[generator] = data
+        return data
+
+    @staticmethod
+    def _Serialize(data):
+        return json.dumps(cache.Normalize(data), indent=4, sort_keys=True)
+
+    def Active(self, generator):
+        """Name of the preset the wizard loads and saves to."""
+        with self._lock:
+            return self._Data(generator)["active"]
+
+    def Presets(self, generator):
+        with self._lock:
+            return sorted(self._Data(generator)["presets"])
+
+    def Load(self, generator, preset=None):
+        """
+        Parameters of a preset (default: the active one), completed with the
+        generator's defaults.  Pages only the wizard has, like the Preview
+        page, are kept.  Raises KeyError for an unknown preset name.
+        """
+        with self._lock:
+            data = self._Data(generator)
+            name = preset or data["active"]
+            if name not in data["presets"] and preset is not None:
+                raise KeyError(f"{generator} has no preset named {name!r}")
+            parameters = geometry.DefaultParameters(generator)
+            for page, values in (data["presets"].get(name) or {}).items():
+                parameters.setdefault(page, {}).update(values)
+            return parameters
+
+    def Save(self, generator, parameters, preset=None):
+        """
+        Store `parameters` as a preset (default: the active one).  Written to
+        disk in the background, if anything changed.
+        """
+        with self._lock:
+            data = self._Data(generator)
+            name = preset or data["active"]
+            if data["presets"].get(name) == parameters:
+                return
+            data["presets"][name] = json.loads(json.dumps(parameters))
+            self._Schedule()
+
+    def Use(self, generator, preset):
+        """Make an existing preset the active one."""
+        with self._lock:
+            data = self._Data(generator)
+            if preset not in data["presets"]:
+                raise KeyError(f"{generator} has no preset named {preset!r}")
+            if data["active"] != preset:
+                data["active"] = preset
+                self._Schedule()
+
+    def Delete(self, generator, preset):
+        """Remove a preset.  The active preset falls back to the default."""
+        with self._lock:
+            data = self._Data(generator)
+            if data["presets"].pop(preset, None) is None:
+                raise KeyError(f"{generator} has no preset named {preset!r}")
+            if data["active"] == preset:
+                data["active"] = DEFAULT_PRESET
+            self._Schedule()
+
+    def _Schedule(self):
+        if self._timer is None and self.directory:
+            self._timer = threading.Timer(self.delay, self.Flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def Flush(self):
+        """Write every generator whose presets differ from its file on disk."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self.directory:
+                return
+            for generator, data in self._data.items():
+                text = self._Serialize(data)
+                if self._written.get(generator) != text:
+                    self._Write(self._Path(generator), text)
+                    self._written[generator] = text
+
+    def _Write(self, path, text):
+        """Write atomically.  A failed write never fails the wizard."""
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w") as f:
+                    f.write(text)
+                os.replace(temp_path, path)
+            except BaseException:
+                os.remove(temp_path)
+                raise
+            self.writes += 1
+        except OSError:
+            pass
+
+
+_default_store = None
+
+
+def DefaultStore():
+    """The store shared by the wizards of this KiCAD session."""
+    global _default_store
+    if _default_store is None:
+        _default_store = ParameterStore(UserConfigDir())
+        atexit.register(_default_store.Flush)
+    return _default_store
+
+
+def Load(generator, preset=None):
+    return DefaultStore().Load(generator, preset)
+
+
+def Save(generator, parameters, preset=None):
+    DefaultStore().Save(generator, parameters, preset)
@@ -0,0 +1,360 @@
+"""
+Vectorized kernel for spiral coils that fill an outline.
+
+The outline is a closed, convex, counter-clockwise loop of straight and
+circular edges (LineEdge and ArcEdge).  Turn k of the spiral follows the
+outline offset inwards by `inset + k * pitch`, except for its last edge,
+which runs one pitch further in: the trace steps onto the next turn at the
+last corner, so the turns need no jogs and the pitch is the same everywhere.
+The corners are rounded with fillets whose radius shrinks by one pitch per
+turn, which keeps the fillets of a corner concentric; once a radius reaches
+zero the corner is sharp.
+
+Every corner is computed for all turns in one pass of NumPy arithmetic over
+the turn index.  The only Python loops are over the few edges of the
+outline, so adding a shape only means describing its edges.  Lengths are in
+nm; angles of the returned arcs are in degrees, with the sign convention of
+pcbnew.EDA_ANGLE.
+"""
+
+import math
+
+import numpy as np
+
+
+class LineEdge:
+    """Straight edge from `start` to `end`."""
+
+    def __init__(self, start, end):
+        start = np.asarray(start, dtype=np.float64)
+        end = np.asarray(end, dtype=np.float64)
+        self.direction = (end - start) / np.hypot(*(end - start))
+        # The outline is counter-clockwise, so the inside is on the left
+        self.normal = np.array((-self.direction[1], self.direction[0]))
+        self.offset = self.normal @ start
+
+    def Distance(self, points, t):
+        """Distance of `points` inside the edge offset `t` inwards."""
+        return points @ self.normal - self.offset - t
+
+    def Foot(self, points, t):
+        """Closest points to `points` on the edge offset `t` inwards."""
+        return points - self.Distance(points, t)[..., np.newaxis] * self.normal
+
+    def Outward(self, points):
+        """Unit vectors leaving the outline across this edge at `points`."""
+        return np.broadcast_to(-self.normal, np.shape(points))
+
+
+class ArcEdge:
+    """
+    Circular edge around `center`.  `sense` is 1 if the outline lies inside
+    the circle (a convex edge, run counter-clockwise) and -1 if it lies
+    outside of it (a concave edge, run clockwise).
+    """
+
+    def __init__(self, center, radius, sense):
+        self.center = np.asarray(center, dtype=np.float64)
+        self.radius = radius
+        self.sense = sense
+
+    def Radius(self, t):
+        """Radius of the edge offset `t` inwards."""
+        return self.radius - self.sense * t
+
+    def Distance(self, points, t):
+        v = points - self.center
+        return self.sense * (self.Radius(t) - np.hypot(v[..., 0], v[..., 1]))
+
+    def Foot(self, points, t):
+        v = points - self.center
+        scale = self.Radius(t) / np.hypot(v[..., 0], v[..., 1])
+        return self.center + v * scale[..., np.newaxis]
+
+    def Outward(self, points):
+        v = points - self.center
+        return self.sense * v / np.hypot(v[..., 0], v[..., 1])[..., np.newaxis]
+
+
+class Track:
+    """
+    Pieces of a trace: `lines` rows of x1, y1, x2, y2 and `arcs` rows of cx,
+    cy, sx, sy, angle, with the turn of every row in `line_turns` and
+    `arc_turns`.
+    """
+
+    def __init__(self, lines, arcs, line_turns, arc_turns):
+        self.lines = lines
+        self.arcs = arcs
+        self.line_turns = line_turns
+        self.arc_turns = arc_turns
+
+    def Mirrored(self, axis):
+        """The track with coordinate `axis` (0 for X, 1 for Y) negated."""
+        lines = self.lines.copy()
+        lines[:, [axis, axis + 2]] *= -1
+        arcs = self.arcs.copy()
+        arcs[:, [axis, axis + 2]] *= -1
+        arcs[:, 4] *= -1
+        return Track(lines, arcs, self.line_turns, self.arc_turns)
+
+    def Placed(self, angles, mirrored):
+        """
+        One copy of the track per entry of `angles` (radians, counter-clockwise
+        around the origin), mirrored across the X axis first where `mirrored`.
+        The rows of each copy follow those of the previous one.
+        """
+        sign = np.where(mirrored, -1.0, 1.0)[:, np.newaxis]
+        cos = np.cos(angles)[:, np.newaxis]
+        sin = np.sin(angles)[:, np.newaxis]
+
+        def Points(x, y):
+            y = y * sign
+            return (x * cos - y * sin).ravel(), (x * sin + y * cos).ravel()
+
+        lines, arcs = self.lines, self.arcs
+        return Track(
+            np.column_stack(
+                (*Points(lines[:, 0], lines[:, 1]), *Points(lines[:, 2], lines[:, 3]))
+            ),
+            np.column_stack(
+                (
+                    *Points(arcs[:, 0], arcs[:, 1]),
+                    *Points(arcs[:, 2], arcs[:, 3]),
+                    (arcs[:, 4] * sign).ravel(),
+                )
+            ),
+            np.tile(self.line_turns, len(sign)),
+            np.tile(self.arc_turns, len(sign)),
+        )
+
+
+"""
+Outlines, as (edges, vertices); vertex i is where edge i starts
+"""
+
+
+def Trapezoid(base_width, top_width, height):
+    """
+    Isosceles trapezoid centered on the origin, with its base on the -Y side.
+    Edge 0 is the base.
+    """
+    vertices = np.array(
+        (
+            (-base_width / 2, -height / 2),
+            (base_width / 2, -height / 2),
+            (top_width / 2, height / 2),
+            (-top_width / 2, height / 2),
+        )
+    )
+    edges = [LineEdge(vertices[ii], vertices[(ii + 1) % 4]) for ii in range(4)]
+    return edges, vertices
+
+
+def Rectangle(width, height):
+    """Rectangle centered on the origin.  Edge 0 is the side at -Y."""
+    return Trapezoid(width, width, height)
+
+
+def AnnularSector(inner_radius, outer_radius, angle):
+    """
+    Wedge of an annulus around the origin, `angle` degrees wide and
+    symmetric about the +X axis.  Edge 0 is the outer arc.
+    """
+    half = math.radians(angle) / 2
+    cos, sin = math.cos(half), math.sin(half)
+    vertices = np.array(
+        (
+            (outer_radius * cos, -outer_radius * sin),
+            (outer_radius * cos, outer_radius * sin),
+            (inner_radius * cos, inner_radius * sin),
+            (inner_radius * cos, -inner_radius * sin),
+        )
+    )
+    edges = [
+        ArcEdge((0, 0), outer_radius, 1),
+        LineEdge(vertices[1], vertices[2]),
+        ArcEdge((0, 0), inner_radius, -1),
+        LineEdge(vertices[3], vertices[0]),
+    ]
+    return edges, vertices
+
+
+"""
+Spiral
+"""
+
+
+def _Meet(a, ta, b, tb, vertex):
+    """
+    Points `ta` inside edge `a` and `tb` inside edge `b`, on the side of the
+    corner at `vertex`.  NaN where there is no such point.
+    """
+    if isinstance(a, LineEdge) and isinstance(b, LineEdge):
+        det = a.normal[0] * b.normal[1] - a.normal[1] * b.normal[0]
+        ca, cb = a.offset + ta, b.offset + tb
+        x = (ca * b.normal[1] - cb * a.normal[1]) / det
+        y = (a.normal[0] * cb - b.normal[0] * ca) / det
+        return np.stack((x, y), axis=-1)
+
+    if isinstance(a, ArcEdge):
+        a, ta, b, tb = b, tb, a, ta
+    if not isinstance(a, LineEdge):
+        raise ValueError("Two arc edges cannot share a corner")
+
+    # Intersect the offset line with the offset circle
+    h = a.offset + ta - a.normal @ b.center
+    foot = b.center + h[..., np.newaxis] * a.normal
+    with np.errstate(invalid="ignore"):
+        half_chord = np.sqrt(b.Radius(tb) ** 2 - h**2)
+    side = np.sign((vertex - foot) @ a.direction)
+    return foot + (side * half_chord)[..., np.newaxis] * a.direction
+
+
+def _Sweep(center, start, end):
+    """Signed angle (radians) from `start` to `end` around `center`."""
+    u, v = start - center, end - center
+    return np.arctan2(
+        u[..., 0] * v[..., 1] - u[..., 1] * v[..., 0],
+        u[..., 0] * v[..., 0] + u[..., 1] * v[..., 1],
+    )
+
+
+class _Passes:
+    """
+    Corners of turns `k` (an array of turn indices).  For every corner, the
+    one after edge ii, `centers[ii]`, `radii[ii]` and the ends `enter[ii]` (on
+    edge ii) and `leave[ii]` (on the next edge) of its fillet; `start` is
+    where edge 0 of each turn begins.  `offsets` (turns, edges) is how far
+    every edge of every turn is inside the outline.
+    """
+
+    def __init__(self, edges, vertices, k, pitch, corner_radius, inset):
+        count = len(edges)
+        k = np.asarray(k)
+        base = inset + k * pitch
+        self.offsets = base[:, np.newaxis] + np.where(
+            np.arange(count) == count - 1, pitch, 0
+        )
+
+        def Corner(ii, ta, tb, radius):
+            jj = (ii + 1) % count
+            center = _Meet(edges[ii], ta + radius, edges[jj], tb + radius, vertices[jj])
+            return center, edges[ii].Foot(center, ta), edges[jj].Foot(center, tb)
+
+        # The corner before edge 0 belongs to the previous turn
+        radius = np.maximum(corner_radius - (k - 1) * pitch, 0)
+        _, _, self.start = Corner(count - 1, base, base, radius)
+
+        self.radii = np.maximum(corner_radius - k * pitch, 0)
+        self.centers, self.enter, self.leave = [], [], []
+        for ii in range(count):
+            ta = self.offsets[:, ii]
+            tb = self.offsets[:, ii + 1] if ii < count - 1 else base + pitch
+            center, enter, leave = Corner(ii, ta, tb, self.radii)
+            self.centers.append(center)
+            self.enter.append(enter)
+            self.leave.append(leave)
+
+    def Edge(self, ii):
+        """Start and end of edge ii of every turn."""
+        start = self.start if ii == 0 else self.leave[ii - 1]
+        return start, self.enter[ii]
+
+
+def _EdgeFits(edge, start, end):
+    """True where the piece of `edge` from `start` to `end` runs forwards."""
+    if isinstance(edge, LineEdge):
+        return (end - start) @ edge.direction > 0
+    return edge.sense * _Sweep(edge.center, start, end) > 0
+
+
+def Spiral(edges, vertices, pitch, turns, corner_radius=0, inset=0):
+    """
+    Track of a spiral of `turns` turns `pitch` apart, from the outline offset
+    `inset` inwards at edge 0 to the inside, starting at vertex 0.  The first
+    turn's corners have `corner_radius`.  Raises ValueError if the outline
+    is too small for that many turns.
+    """
+    count = len(edges)
+    k = np.arange(turns)
+    passes = _Passes(edges, vertices, k, pitch, corner_radius, inset)
+
+    fits = np.ones(turns, dtype=bool)
+    for ii in range(count):
+        with np.errstate(invalid="ignore"):
+            fits &= _EdgeFits(edges[ii], *passes.Edge(ii))
+    if not fits.all():
+        raise ValueError(
+            f"Only {np.argmin(fits)} of {turns} turns fit into the outline"
+        )
+
+    lines, arcs, line_turns, arc_turns = [], [], [], []
+    for ii, edge in enumerate(edges):
+        start, end = passes.Edge(ii)
+        if isinstance(edge, LineEdge):
+            lines.append(np.column_stack((start, end)))
+            line_turns.append(k)
+        else:
+            sweep = _Sweep(edge.center, start, end)
+            arcs.append(
+                np.column_stack(
+                    (
+                        np.broadcast_to(edge.center, start.shape),
+                        start,
+                        np.degrees(sweep),
+                    )
+                )
+            )
+            arc_turns.append(k)
+
+        # The fillet after the edge; the trace ends before the last one
+        rounded = passes.radii > 0
+        if ii == count - 1:
+            rounded[-1] = False
+        center = passes.centers[ii][rounded]
+        enter = passes.enter[ii][rounded]
+        sweep = _Sweep(center, enter, passes.leave[ii][rounded])
+        arcs.append(np.column_stack((center, enter, np.degrees(sweep))))
+        arc_turns.append(k[rounded])
+
+    return Track(
+        np.concatenate(lines) if lines else np.empty((0, 4)),
+        np.concatenate(arcs),
+        np.concatenate(line_turns) if line_turns else np.empty(0, dtype=int),
+        np.concatenate(arc_turns),
+    )
+
+
+def Terminals(edges, vertices, pitch, turns, corner_radius=0, inset=0):
+    """
+    The outer `start` and inner `end` of the spiral's trace, a `center`
+    point in the space left inside the innermost turn, and how much `room`
+    there is around it: its distance from the innermost centerlines.
+    """
+    passes = _Passes(
+        edges, vertices, np.array((0, turns - 1)), pitch, corner_radius, inset
+    )
+    start = passes.start[0]
+    end = passes.enter[-1][1]
+    center = np.mean([p[1] for p in passes.enter + passes.leave], axis=0)
+    room = min(edge.Distance(center, t) for edge, t in zip(edges, passes.offsets[1]))
+    return start, end, center, room
+
+
+def OutlineTrack(edges, vertices):
+    """The outline itself as a Track, e.g. to draw it."""
+    lines, arcs = [], []
+    for ii, edge in enumerate(edges):
+        start, end = vertices[ii], vertices[(ii + 1) % len(edges)]
+        if isinstance(edge, LineEdge):
+            lines.append((*start, *end))
+        else:
+            sweep = _Sweep(edge.center, start, end)
+            arcs.append((*edge.center, *start, math.degrees(sweep)))
+    return Track(
+        np.array(lines, dtype=np.float64).reshape(-1, 4),
+        np.array(arcs, dtype=np.float64).reshape(-1, 5),
+        np.full(len(lines), -1),
+        np.full(len(arcs), -1),
+    )
@@ -0,0 +1,231 @@
+import pcbnew
+
+from .PCBTraceComponent import *
+
+
+class SpiralCoilGenerator(PCBTraceComponent):
+    """
+    A single layer spiral filling an outline, with an underpass on a second
+    layer back to the pads.  Subclasses name their `generator` and list the
+    Install Info parameters of its outline as (name, unit, hint); the
+    geometry is built by the shared kernel in spiral.py.
+    """
+
+    generator = None
+    install_parameters = ()
+
+    GetName = lambda self: registry.WIZARDS[self.generator].name
+    GetDescription = lambda self: registry.WIZARDS[self.generator].description
+    GetValue = lambda self: registry.WIZARDS[self.generator].value
+
+    def GenerateParameterList(self):
+        # The active preset, i.e. the values of the last run, completed with
+        # reasonable defaults
+        defaults = settings.Load(self.generator)
+
+        # Info about the coil itself.
+        self.AddParam(
+            "Coil specs",
+            "Turns",
+            self.uInteger,
+            defaults["Coil specs"]["Turns"],
+            min_value=1,
+        )
+        self.AddParam(
+            "Coil specs",
+            "Corner Radius",
+            self.uMM,
+            pcbnew.ToMM(defaults["Coil specs"]["Corner Radius"]),
+            min_value=0,
+            hint="Of the outer turn, every turn further in has one pitch less",
+        )
+        self.AddParam(
+            "Coil specs",
+            "Stub Length",
+            self.uMM,
+            pcbnew.ToMM(defaults["Coil specs"]["Stub Length"]),
+            min_value=0,
+        )
+        self.AddParam(
+            "Coil specs",
+            "First Layer",
+            self.uString,
+            defaults["Coil specs"]["First Layer"],
+            hint="Layer name of the spiral.  Uses '_' instead of '.'",
+        )
+        self.AddParam(
+            "Coil specs",
+            "Second Layer",
+            self.uString,
+            defaults["Coil specs"]["Second Layer"],
+            hint="Layer name of the underpass.  Uses '_' instead of '.'",
+        )
+        self.AddParam(
+            "Coil specs",
+            "Direction",
+            self.uBool,
+            defaults["Coil specs"]["Direction"],
+            hint="Set to True for clockwise, False for counter-clockwise",
+        )
+
+        # The outline the coil fills.  The copper of the outer turn ends on it.
+        for name, unit, hint in self.install_parameters:
+            value = defaults["Install Info"][name]
+            self.AddParam(
+                "Install Info",
+                name,
+                unit,
+                pcbnew.ToMM(value) if unit == self.uMM else value,
+                min_value=0,
+                hint=hint,
+            )
+
+        # Info about the fabrication capabilities
+        self.AddParam(
+            "Fab Specs",
+            "Trace Width",
+            self.uMM,
+            pcbnew.ToMM(defaults["Fab Specs"]["Trace Width"]),
+            min_value=0,
+        )
+        self.AddParam(
+            "Fab Specs",
+            "Trace Spacing",
+            self.uMM,
+            pcbnew.ToMM(defaults["Fab Specs"]["Trace Spacing"]),
+            min_value=0,
+        )
+        self.AddParam(
+            "Fab Specs",
+            "Via Drill",
+            self.uMM,
+            pcbnew.ToMM(defaults["Fab Specs"]["Via Drill"]),
+            min_value=0,
+            hint="Diameter",
+        )
+        self.AddParam(
+            "Fab Specs",
+            "Via Annular Ring",
+            self.uMM,
+            pcbnew.ToMM(defaults["Fab Specs"]["Via Annular Ring"]),
+            min_value=0,
+            hint="Radius",
+        )
+        self.AddParam(
+            "Fab Specs",
+            "Pad Drill",
+            self.uMM,
+            pcbnew.ToMM(defaults["Fab Specs"]["Pad Drill"]),
+            min_value=0,
+        )
+        self.AddParam(
+            "Fab Specs",
+            "Pad Annular Ring",
+            self.uMM,
+            pcbnew.ToMM(defaults["Fab Specs"]["Pad Annular Ring"]),
+            min_value=0,
+        )
+        self.AddParam(
+            "Fab Specs",
+            "Copper Thickness (Oz.Cu.)",
+            self.uFloat,
+            defaults["Fab Specs"]["Copper Thickness (Oz.Cu.)"],
+            min_value=0.01,
+        )
+        self.AddParam(
+            "Fab Specs",
+            "Layer Spacing",
+            self.uMM,
+            pcbnew.ToMM(defaults["Fab Specs"]["Layer Spacing"]),
+            min_value=0,
+            hint="Dielectric thickness between the two layers",
+        )
+        self.AddParam(
+            "Fab Specs",
+            "Dielectric Constant",
+            self.uFloat,
+            defaults["Fab Specs"]["Dielectric Constant"],
+            min_value=1,
+            hint="Relative permittivity of the board, for the parasitic capacitance",
+        )
+
+        # How much of the coil is drawn while editing
+        self.AddPreviewParameters(defaults)
+
+    def CheckParameters(self):
+        self.trace_width = self.parameters["Fab Specs"]["Trace Width"]
+        self.trace_space = self.parameters["Fab Specs"]["Trace Spacing"]
+        self.copper_thickness = self.parameters["Fab Specs"][
+            "Copper Thickness (Oz.Cu.)"
+        ]
+
+        self.turns = self.parameters["Coil specs"]["Turns"]
+        self.first_layer = getattr(pcbnew, self.parameters["Coil specs"]["First Layer"])
+        self.second_layer = getattr(
+            pcbnew, self.parameters["Coil specs"]["Second Layer"]
+        )
+        self.clockwise_bool = self.parameters["Coil specs"]["Direction"]
+
+        settings.Save(self.generator, self.parameters)
+
+    def BuildThisFootprint(self):
+        """
+        Outlines too small for the turns or the via are reported in the build
+        messages instead of drawing a broken coil.
+        """
+        try:
+            coil = self.BuildGeometry()
+        except ValueError as error:
+            self.buildmessages += f"Cannot build the coil: {error}\n"
+            return
+
+        """
+        Draw only some of the turns while previewing a large coil
+        """
+        shown = self.Preview(coil)
+
+        """
+        Draw the outline, fields, spiral, underpass, pads and parameter text
+        computed by the geometry core.
+        """
+        self.DrawGeometry(shown)
+
+        """
+        Add Net Tie Group to the footprint. This allows the DRC to understand
+        that the shorting traces are OK for this component
+        """
+        self.GenerateNetTiePadGroup()
+
+        """
+        Check the copper against the trace spacing, so bad parameter
+        combinations show up before DRC.  The full coil is checked, and only
+        with Full Resolution on: a preview leaves out turns, and checking
+        every turn of a large coil would make previews slow.
+        """
+        self.CheckClearance(coil, shown)
+
+
+class RectangularSpiralCoilGen(SpiralCoilGenerator):
+    generator = "RectangularSpiralCoilGen"
+    install_parameters = (
+        ("Width", PCBTraceComponent.uMM, "Along the side with the pads"),
+        ("Height", PCBTraceComponent.uMM, ""),
+    )
+
+
+class TrapezoidalSpiralCoilGen(SpiralCoilGenerator):
+    generator = "TrapezoidalSpiralCoilGen"
+    install_parameters = (
+        ("Base Width", PCBTraceComponent.uMM, "The side with the pads"),
+        ("Top Width", PCBTraceComponent.uMM, "The side opposite of the base"),
+        ("Height", PCBTraceComponent.uMM, ""),
+    )
+
+
+class WedgeSpiralCoilGen(SpiralCoilGenerator):
+    generator = "WedgeSpiralCoilGen"
+    install_parameters = (
+        ("Inner Radius", PCBTraceComponent.uMM, "From the footprint origin"),
+        ("Outer Radius", PCBTraceComponent.uMM, "The pads are outside of it"),
+        ("Angle", PCBTraceComponent.uDegrees, "Width of the wedge"),
+    )
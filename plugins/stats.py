@@ -0,0 +1,118 @@
+"""
+Per phase timing and counts of a coil build.
+
+A BuildStats is started with the build and charged one phase at a time with
+Lap(): every lap adds the time since the previous one to the named phase.
+The wizards report the phases in their build messages and log them; the
+command line writes them to a JSON sidecar next to each footprint it
+exports.
+
+Logging goes to the "plugins.stats" logger.  Set KICAD_COIL_LOG to a file
+name to have the wizards append their build statistics to it, and
+KICAD_COIL_STATS_DIR to a directory to get a sidecar for every wizard build.
+"""
+
+import json
+import logging
+import os
+import time
+
+LOGGER = logging.getLogger(__name__)
+LOGGER.addHandler(logging.NullHandler())
+
+LOG_FILE_ENV = "KICAD_COIL_LOG"
+STATS_DIR_ENV = "KICAD_COIL_STATS_DIR"
+SIDECAR_SUFFIX = ".stats.json"
+
+
+class BuildStats:
+    """
+    Timing (`phases`, name -> s, in the order they were first charged) and
+    `counts` of one build of `generator`.
+    """
+
+    def __init__(self, generator):
+        self.generator = generator
+        self.phases = {}
+        self.counts = {}
+        self.started = time.time()
+        self._last = time.perf_counter()
+
+    def Lap(self, phase):
+        """Charge the time since the previous lap to `phase`."""
+        now = time.perf_counter()
+        self.phases[phase] = self.phases.get(phase, 0.0) + now - self._last
+        self._last = now
+        LOGGER.debug(
+            "%s: %s done after %.1f ms", self.generator, phase, self.total * 1e3
+        )
+
+    @property
+    def total(self):
+        return sum(self.phases.values())
+
+    def Count(self, coil):
+        """Primitive counts and trace length of a CoilGeometry."""
+        self.counts.update(
+            arcs=len(coil.arcs),
+            lines=len(coil.lines),
+            circles=len(coil.circles),
+            pads=len(coil.pads) - coil.vias,
+            vias=coil.vias,
+            turns=coil.TurnCount(),
+            trace_length_mm=coil.trace_length / 1e6,
+        )
+
+    def Text(self):
+        """The phases as one line, for the build messages."""
+        phases = ", ".join(
+            f"{phase} {elapsed * 1e3:.1f}" for phase, elapsed in self.phases.items()
+        )
+        return f"Build: {self.total * 1e3:.1f} ms ({phases} ms)"
+
+    def Summary(self):
+        """JSON friendly dictionary, times in ms."""
+        return {
+            "generator": self.generator,
+            "started": time.strftime(
+                "%Y-%m-%dT%H:%M:%S%z", time.localtime(self.started)
+            ),
+            "total_ms": self.total * 1e3,
+            "phases_ms": {phase: t * 1e3 for phase, t in self.phases.items()},
+            "counts": self.counts,
+        }
+
+    def Log(self):
+        LOGGER.info("%s: %s %s", self.generator, self.Text(), self.counts)
+
+    def Save(self, path):
+        with open(path, "w") as f:
+            json.dump(self.Summary(), f, indent=4)
+
+
+def SidecarPath(footprint_path):
+    """Where the statistics of a .kicad_mod file go."""
+    return os.path.splitext(footprint_path)[0] + SIDECAR_SUFFIX
+
+
+def WizardSidecarPath(generator):
+    """Sidecar of the last wizard build of `generator`, if asked for."""
+    directory = os.environ.get(STATS_DIR_ENV)
+    if not directory:
+        return None
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, generator + SIDECAR_SUFFIX)
+
+
+def ConfigureLogFile():
+    """Log the build statistics to the file named by KICAD_COIL_LOG, once."""
+    path = os.environ.get(LOG_FILE_ENV)
+    if not path or any(
+        getattr(h, "baseFilename", None) == os.path.abspath(path)
+        for h in LOGGER.handlers
+    ):
+        return
+    handler = logging.FileHandler(path)
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+    LOGGER.addHandler(handler)
+    LOGGER.setLevel(logging.DEBUG)
@@ -0,0 +1,156 @@
+"""
+Parameter sweeps: generate a whole family of coil footprints in one go.
+
+A sweep takes a base parameter set plus lists/ranges for any number of
+parameters, expands the Cartesian product and builds every variant on a
+process pool.  Each variant is written as a .kicad_mod into a footprint
+library directory, with its build statistics next to it, together with an
+index (CSV and JSON) of the computed electrical values, including the lobe
+imbalance of flux-neutral coils to filter out unbalanced ones.  Variants that
+do not build are listed in the index with the reason in an "error" column.
+"""
+
+import concurrent.futures
+import copy
+import csv
+import itertools
+import json
+import os
+import re
+
+from . import balance
+from . import geometry
+from . import kicad_mod
+from . import stats
+
+INDEX_NAME = "index"
+
+
+def ParseSweepValues(text):
+    """
+    Values for one swept parameter.  Accepts a JSON list ('[150000, 200000]'),
+    a comma separated list ('F_Cu,B_Cu') or an inclusive range
+    'start:stop:step' ('10:100:10').
+    """
+    text = text.strip()
+    if text.startswith("["):
+        return json.loads(text)
+
+    if ":" in text:
+        start, stop, step = (json.loads(v) for v in text.split(":"))
+        if step == 0 or (stop - start) * step < 0:
+            raise ValueError(f"Empty sweep range: {text}")
+        count = int(round((stop - start) / step)) + 1
+        values = [start + ii * step for ii in range(count)]
+        return [v for v in values if (v - stop) * step <= 0]
+
+    values = []
+    for value in text.split(","):
+        try:
+            values.append(json.loads(value))
+        except ValueError:
+            values.append(value.strip())
+    return values
+
+
+def ExpandSweep(base, sweeps):
+    """
+    Every combination of the swept values, applied on top of `base`.
+
+    `sweeps` is a list of (page, name, values).  Yields (settings, parameters)
+    where settings maps "page/name" to the value of that variant.
+    """
+    keys = [(page, name) for page, name, _ in sweeps]
+    for combination in itertools.product(*(values for _, _, values in sweeps)):
+        parameters = copy.deepcopy(base)
+        settings = {}
+        for (page, name), value in zip(keys, combination):
+            parameters.setdefault(page, {})[name] = value
+            settings[f"{page}/{name}"] = value
+        yield settings, parameters
+
+
+def VariantName(generator, settings):
+    """File system safe footprint name describing the swept values."""
+    parts = [generator]
+    for key, value in settings.items():
+        name = re.sub(r"[^0-9A-Za-z]", "", key.split("/")[-1])
+        parts.append(f"{name}{value}")
+    return re.sub(r"[^0-9A-Za-z_.+-]", "", "_".join(parts))
+
+
+def GenerateVariant(job):
+    """
+    Build and save one variant.  Runs in a worker process.  Returns its index
+    row, with "error" set if the variant does not build.
+    """
+    generator, name, settings, parameters, out_dir = job
+    build_stats = stats.BuildStats(generator)
+    try:
+        coil = geometry.Build(generator, parameters)
+    except ValueError as error:
+        return {"name": name, **settings, "error": str(error)}
+    build_stats.Count(coil)
+    build_stats.Lap("geometry")
+
+    file_name = name + ".kicad_mod"
+    path = os.path.join(out_dir, file_name)
+    kicad_mod.SaveFootprint(path, coil, name, geometry.VALUES[generator])
+    build_stats.Lap("write")
+    build_stats.Save(stats.SidecarPath(path))
+    row = {
+        "name": name,
+        "file": file_name,
+        **settings,
+        "resistance_ohms": coil.resistance,
+        "inductance_uh": coil.inductance * 1e6,
+        "trace_length_mm": coil.trace_length / 1e6,
+        "vias": coil.vias,
+        "primitives": coil.PrimitiveCount(),
+    }
+    if generator in balance.LOBED_GENERATORS:
+        row["lobe_imbalance"] = balance.WindingBalance(coil).imbalance
+    return row
+
+
+def Sweep(generator, base, sweeps, out_dir, workers=None):
+    """
+    Generate every variant of the sweep into `out_dir` (normally a
+    '*.pretty' footprint library) and write the index files.  `base` holds
+    the parameters shared by all variants; anything not given there or in
+    `sweeps` uses the generator's defaults.  Returns the index rows; the
+    index is written even if some variants fail to build.
+    """
+    # Completed here, so a misspelt page or name fails before any work
+    variants = [
+        (settings, geometry.MergeDefaults(generator, parameters))
+        for settings, parameters in ExpandSweep(base, sweeps)
+    ]
+    os.makedirs(out_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+
+    jobs = [
+        (generator, VariantName(generator, settings), settings, parameters, out_dir)
+        for settings, parameters in variants
+    ]
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        chunksize = max(1, len(jobs) // (4 * workers))
+        rows = list(pool.map(GenerateVariant, jobs, chunksize=chunksize))
+
+    WriteIndex(out_dir, rows)
+    return rows
+
+
+def WriteIndex(out_dir, rows):
+    with open(os.path.join(out_dir, INDEX_NAME + ".json"), "w") as f:
+        json.dump(rows, f, indent=4)
+
+    if rows:
+        # The columns of the built variants, then the error column
+        built = sorted(rows, key=lambda row: "error" in row)
+        fields = list(dict.fromkeys(key for row in built for key in row))
+        with open(os.path.join(out_dir, INDEX_NAME + ".csv"), "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(rows)
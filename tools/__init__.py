@@ -0,0 +1 @@
+"""Development tools that run the plugins without KiCAD."""
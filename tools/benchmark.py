@@ -0,0 +1,258 @@
+"""
+Build time and memory of the Footprint Wizards versus coil size.
+
+Runs CheckParameters() + BuildThisFootprint() of every generator over a
+ladder of turn counts, with the KiCAD stand-ins from kicad_stub.py and with
+the geometry caches off, so every build starts from scratch.  Writes the
+results as JSON and compares them against a stored baseline:
+
+    python -m tools.benchmark --output bench.json
+    python -m tools.benchmark --baseline bench.json --output new.json
+
+The comparison exits with 1 if any build got slower or bigger than the
+threshold allows.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+# No presets or cached geometry from earlier runs, and none left behind
+os.environ["KICAD_COIL_CACHE_DIR"] = ""
+os.environ["KICAD_COIL_CONFIG_DIR"] = ""
+
+from . import kicad_stub
+
+kicad_stub.Install()
+
+import numpy as np
+
+from plugins import cache
+from plugins import geometry
+from plugins import registry
+
+FORMAT_VERSION = 1
+# Add 3000 and 5000 with --sizes for big coils; they take minutes and GBs
+DEFAULT_SIZES = (10, 30, 100, 300, 1000)
+DEFAULT_REPEAT = 3
+DEFAULT_THRESHOLD = 0.25  # Allowed relative growth of time and memory
+MIN_TIME_DELTA = 0.005  # s, differences below this are noise
+
+# Generator -> turns parameter, or None for a fixed size coil
+TURNS_PARAMETER = {
+    "CoilGeneratorID2L": ("Coil specs", "Total Turns"),
+    "CoilGeneratorIDNL": ("Coil specs", "Turns per Layer"),
+    "CoilGenerator1L1T": None,
+    "FluxNeutralCoilGen": ("Coil specs", "Turns"),
+    "RectangularSpiralCoilGen": ("Coil specs", "Turns"),
+    "TrapezoidalSpiralCoilGen": ("Coil specs", "Turns"),
+    "WedgeSpiralCoilGen": ("Coil specs", "Turns"),
+}
+
+
+def Wizard(generator):
+    module, _ = registry.ImportModule(registry.WIZARDS[generator].module)
+    return getattr(module, generator)()
+
+
+def Parameters(generator, size):
+    """
+    Parameters of `generator` with `size` turns, in internal units.  The
+    flux neutral coil's aperture and the outlines of the spiral coils grow
+    with the turns so that the coil fits.
+    """
+    parameters = geometry.DefaultParameters(generator)
+    turns = TURNS_PARAMETER[generator]
+    if turns is not None:
+        page, name = turns
+        parameters[page][name] = size
+    if generator == "FluxNeutralCoilGen":
+        pitch = geometry.FluxNeutralDimensions(parameters).pitch
+        parameters["Install Info"]["Outer Ring radius"] = max(
+            parameters["Install Info"]["Outer Ring radius"], int(2 * size * pitch)
+        )
+    if generator in geometry.SPIRAL_SHAPES:
+        install = parameters["Install Info"]
+        while not Fits(generator, parameters):
+            for name in install:
+                if name not in geometry.SPIRAL_ANGLE_PARAMETERS:
+                    install[name] = int(install[name] * 1.5)
+    return parameters
+
+
+def Fits(generator, parameters):
+    try:
+        geometry.Build(generator, parameters)
+    except ValueError:
+        return False
+    return True
+
+
+def Build(generator, parameters):
+    """One build from scratch; returns the wizard and the time taken (s)."""
+    cache.DefaultCache().Clear()
+    wizard = Wizard(generator)
+    for page, values in parameters.items():
+        for name, value in values.items():
+            wizard.parameters.setdefault(page, {})[name] = value
+    wizard.parameters["Preview"] = {"Full Resolution": True, "Preview Turns": 50}
+
+    start = time.perf_counter()
+    wizard.BuildFootprint()
+    return wizard, time.perf_counter() - start
+
+
+def Measure(generator, size, repeat):
+    parameters = Parameters(generator, size)
+    times = []
+    for _ in range(repeat):
+        wizard, elapsed = Build(generator, parameters)
+        times.append(elapsed)
+
+    # Peak memory in a separate run, tracemalloc slows the build down
+    tracemalloc.start()
+    try:
+        Build(generator, parameters)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    counts = wizard.module.Counts()
+    primitives = sum(counts.values())
+    median = statistics.median(times)
+    return {
+        "generator": generator,
+        "size": size,
+        "turns": geometry.Build(generator, parameters).TurnCount(),
+        "time_s": {"min": min(times), "median": median, "runs": times},
+        "peak_memory_bytes": peak,
+        "primitives": counts,
+        "primitive_count": primitives,
+        "time_per_primitive_us": median / primitives * 1e6 if primitives else 0.0,
+        "phases_ms": wizard.stats.Summary()["phases_ms"],
+    }
+
+
+def Run(generators, sizes, repeat, progress=None):
+    results = []
+    for generator in generators:
+        # A fixed size coil is measured once
+        ladder = sizes if TURNS_PARAMETER[generator] else [1]
+        for size in ladder:
+            result = Measure(generator, size, repeat)
+            results.append(result)
+            if progress:
+                progress(result)
+    return {
+        "format_version": FORMAT_VERSION,
+        "geometry_version": geometry.GEOMETRY_VERSION,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def Compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Rows of (generator, size, baseline time, time, baseline peak, peak,
+    regressed) for the builds found in both runs.
+    """
+    previous = {(r["generator"], r["size"]): r for r in baseline["results"]}
+    rows = []
+    for result in results["results"]:
+        old = previous.get((result["generator"], result["size"]))
+        if old is None:
+            continue
+        # The fastest run is the least disturbed by the rest of the machine
+        old_time, new_time = old["time_s"]["min"], result["time_s"]["min"]
+        old_peak, new_peak = old["peak_memory_bytes"], result["peak_memory_bytes"]
+        slower = (
+            new_time > old_time * (1 + threshold)
+            and new_time - old_time > MIN_TIME_DELTA
+        )
+        bigger = new_peak > old_peak * (1 + threshold)
+        rows.append(
+            (
+                result["generator"],
+                result["size"],
+                old_time,
+                new_time,
+                old_peak,
+                new_peak,
+                slower or bigger,
+            )
+        )
+    return rows
+
+
+def PrintResult(result):
+    print(
+        f"{result['generator']:>20} {result['size']:>6} "
+        f"{result['time_s']['median'] * 1e3:>10.1f} ms "
+        f"{result['peak_memory_bytes'] / 2**20:>8.1f} MB "
+        f"{result['primitive_count']:>8} primitives "
+        f"{result['time_per_primitive_us']:>8.1f} us/primitive",
+        flush=True,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m tools.benchmark", description=__doc__.split("\n\n")[0]
+    )
+    parser.add_argument(
+        "--generator",
+        action="append",
+        choices=sorted(TURNS_PARAMETER),
+        help="Generator to run, may be repeated (default: all)",
+    )
+    parser.add_argument(
+        "--sizes",
+        default=",".join(str(size) for size in DEFAULT_SIZES),
+        help="Comma separated turn counts",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=DEFAULT_REPEAT, help="Timed builds per size"
+    )
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="Compare against these stored results")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="Allowed relative growth of time and peak memory",
+    )
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    generators = args.generator or sorted(TURNS_PARAMETER)
+    results = Run(generators, sizes, args.repeat, PrintResult)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
+
+    if not args.baseline:
+        return 0
+
+    with open(args.baseline, "r") as f:
+        baseline = json.load(f)
+    rows = Compare(results, baseline, args.threshold)
+    for generator, size, old_time, new_time, old_peak, new_peak, regressed in rows:
+        print(
+            f"{'REGRESSED' if regressed else 'ok':>9} {generator:>20} {size:>6} "
+            f"{old_time * 1e3:.1f} -> {new_time * 1e3:.1f} ms, "
+            f"{old_peak / 2**20:.1f} -> {new_peak / 2**20:.1f} MB"
+        )
+    return 1 if any(row[-1] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,424 @@
+"""
+Recording stand-ins for KiCAD's `pcbnew` and `FootprintWizardBase` modules.
+
+They implement just enough of the API used by the wizards in plugins/ to run
+CheckParameters() and BuildThisFootprint() outside of KiCAD.  Every item
+added to a footprint is kept, with the values it was given, so the output of
+a build can be counted, timed and compared.
+
+    from tools import kicad_stub
+    kicad_stub.Install()
+    from plugins.coil_generator import CoilGeneratorID2L
+
+    wizard = CoilGeneratorID2L()
+    wizard.SetParameter("Coil specs", "Total Turns", 200)
+    wizard.BuildFootprint()
+    print(wizard.module.Counts())
+"""
+
+import collections
+import copy
+import math
+import sys
+import types
+
+DEFAULT_TEXT_SIZE = 1000000  # IPC nominal text size, nm
+
+
+class Item:
+    """A footprint item that records every Set*() call as an attribute."""
+
+    kind = "item"
+
+    def __init__(self, parent=None, *args):
+        self.values = {}
+
+    def __getattr__(self, name):
+        if not name.startswith("Set"):
+            raise AttributeError(name)
+
+        def Setter(*args):
+            self.values[name[3:]] = args[0] if len(args) == 1 else args
+
+        return Setter
+
+
+class PCB_SHAPE(Item):
+    kind = "shape"
+
+    def __init__(self, parent=None, shape=None):
+        super().__init__(parent)
+        self.shape = shape
+
+
+class PAD(Item):
+    kind = "pad"
+
+    def GetNumber(self):
+        return str(self.values.get("Number", ""))
+
+
+class PCB_TEXT(Item):
+    kind = "text"
+
+
+class FOOTPRINT:
+    """Keeps the items added to it, in order."""
+
+    def __init__(self, board=None):
+        self.items = []
+        self.net_tie_pad_groups = []
+        self.values = {}
+        self.reference = "REF**"
+        self.value = ""
+        self.position = (0, 0)
+        self.orientation = 0.0
+
+    def Add(self, item, mode=None):
+        self.items.append(item)
+
+    def Duplicate(self):
+        """A copy with copies of all items, like BOARD_ITEM::Duplicate()."""
+        return copy.deepcopy(self)
+
+    def Pads(self):
+        return [item for item in self.items if item.kind == "pad"]
+
+    def GetReference(self):
+        return self.reference
+
+    def SetReference(self, reference):
+        self.reference = reference
+
+    def SetValue(self, value):
+        self.value = value
+
+    def SetPosition(self, position):
+        self.position = position
+
+    def SetOrientationDegrees(self, degrees):
+        self.orientation = degrees
+
+    def AddNetTiePadGroup(self, group):
+        self.net_tie_pad_groups.append(group)
+
+    def Value(self):
+        return self.values.setdefault("Value", PCB_TEXT())
+
+    def Reference(self):
+        return self.values.setdefault("Reference", PCB_TEXT())
+
+    def Counts(self):
+        """Number of items per kind: arcs, segments, circles, pads, texts."""
+        counts = collections.Counter()
+        for item in self.items:
+            if item.kind == "shape":
+                counts[SHAPE_NAMES[item.shape]] += 1
+            else:
+                counts[item.kind + "s"] += 1
+        return dict(counts)
+
+
+class NETINFO_ITEM:
+    def __init__(self, board, name):
+        self.name = name
+
+    def GetNetname(self):
+        return self.name
+
+
+class PCB_GROUP:
+    def __init__(self, board=None):
+        self.name = ""
+        self.items = []
+
+    def SetName(self, name):
+        self.name = name
+
+    def AddItem(self, item):
+        self.items.append(item)
+
+
+class BOARD:
+    """Keeps the footprints, nets and groups added to it."""
+
+    def __init__(self, file_name=""):
+        self.file_name = file_name
+        self.footprints = []
+        self.nets = {}
+        self.groups = []
+
+    def GetFileName(self):
+        return self.file_name
+
+    def GetFootprints(self):
+        return list(self.footprints)
+
+    def FindNet(self, name):
+        return self.nets.get(name)
+
+    def Add(self, item, mode=None):
+        if isinstance(item, FOOTPRINT):
+            self.footprints.append(item)
+        elif isinstance(item, NETINFO_ITEM):
+            self.nets[item.name] = item
+        elif isinstance(item, PCB_GROUP):
+            self.groups.append(item)
+
+
+def Cast_to_FOOTPRINT(item):
+    return item
+
+
+_board = BOARD()
+
+
+def GetBoard():
+    """The board of the editor; replace `_board` to act on another one."""
+    return _board
+
+
+def Refresh():
+    pass
+
+
+class EDA_ANGLE:
+    def __init__(self, value, unit):
+        self.degrees = value if unit == DEGREES_T else math.degrees(value)
+
+    def AsDegrees(self):
+        return self.degrees
+
+
+class LSET:
+    @staticmethod
+    def AllCuMask():
+        return "AllCu"
+
+
+class FootprintWizardPlugin:
+    """pcbnew's base class of the footprint wizards."""
+
+    def __init__(self):
+        self.defaults()
+
+    def defaults(self):
+        self.module = None
+        self.params = []
+        self.name = "KiCad FP Wizard"
+        self.description = ""
+        self.image = ""
+        self.buildmessages = ""
+
+    def GetName(self):
+        return self.name
+
+    def GetDescription(self):
+        return self.description
+
+    def GetValue(self):
+        return ""
+
+    def GetImage(self):
+        return self.image
+
+    def GetBuildMessages(self):
+        return self.buildmessages
+
+    def GetFootprint(self):
+        self.BuildFootprint()
+        return self.module
+
+    def register(self):
+        REGISTERED_WIZARDS.append(self)
+
+
+class ActionPlugin:
+    """pcbnew's base class of the action plugins."""
+
+    def __init__(self):
+        self.defaults()
+
+    def defaults(self):
+        pass
+
+    def register(self):
+        REGISTERED_ACTIONS.append(self)
+
+
+DEGREES_T = "degrees"
+RADIANS_T = "radians"
+SHAPE_T_SEGMENT = "segment"
+SHAPE_T_ARC = "arc"
+SHAPE_T_CIRCLE = "circle"
+SHAPE_NAMES = {SHAPE_T_SEGMENT: "lines", SHAPE_T_ARC: "arcs", SHAPE_T_CIRCLE: "circles"}
+
+REGISTERED_WIZARDS = []
+REGISTERED_ACTIONS = []
+
+
+def VECTOR2I(x, y):
+    return (int(x), int(y))
+
+
+def FromMM(value):
+    return int(round(value * 1e6))
+
+
+def ToMM(value):
+    return value / 1e6
+
+
+def PcbnewModule(layer_names):
+    """The `pcbnew` stand-in, with a constant per layer name."""
+    module = types.ModuleType("pcbnew")
+    module.__doc__ = "Recording stand-in for KiCAD's pcbnew, see tools/kicad_stub.py"
+    for name in (
+        "PCB_SHAPE",
+        "PAD",
+        "PCB_TEXT",
+        "FOOTPRINT",
+        "NETINFO_ITEM",
+        "PCB_GROUP",
+        "BOARD",
+        "Cast_to_FOOTPRINT",
+        "GetBoard",
+        "Refresh",
+        "EDA_ANGLE",
+        "LSET",
+        "FootprintWizardPlugin",
+        "ActionPlugin",
+        "DEGREES_T",
+        "RADIANS_T",
+        "SHAPE_T_SEGMENT",
+        "SHAPE_T_ARC",
+        "SHAPE_T_CIRCLE",
+        "VECTOR2I",
+        "FromMM",
+        "ToMM",
+        "REGISTERED_WIZARDS",
+        "REGISTERED_ACTIONS",
+    ):
+        setattr(module, name, globals()[name])
+    for code, name in enumerate(layer_names):
+        setattr(module, name, code)
+    module.PAD_SHAPE_CIRCLE = "circle"
+    module.PAD_ATTRIB_PTH = "PTH"
+    module.GR_TEXT_H_ALIGN_LEFT = "left"
+    module.ADD_MODE_BULK_APPEND = "bulk_append"
+    return module
+
+
+"""
+FootprintWizardBase
+"""
+
+
+class FootprintWizardDrawingAids:
+    """Records the drawing calls; shapes go into the footprint like KiCAD's."""
+
+    def __init__(self, module):
+        self.module = module
+        self.layer = None
+        self.line_thickness = 150000
+
+    def SetLayer(self, layer):
+        self.layer = layer
+
+    def SetLineThickness(self, thickness):
+        self.line_thickness = thickness
+
+    def _Shape(self, shape, **values):
+        item = PCB_SHAPE(self.module, shape)
+        item.values.update(values, Layer=self.layer, Width=self.line_thickness)
+        self.module.Add(item)
+
+    def Line(self, x1, y1, x2, y2):
+        self._Shape(SHAPE_T_SEGMENT, Start=(x1, y1), End=(x2, y2))
+
+    def Arc(self, cx, cy, sx, sy, angle):
+        self._Shape(SHAPE_T_ARC, Center=(cx, cy), Start=(sx, sy), Angle=angle)
+
+    def Circle(self, x, y, r, filled=False):
+        self._Shape(SHAPE_T_CIRCLE, Center=(x, y), Radius=r)
+
+    def Value(self, x, y, size, orientation_degree=0):
+        self.module.Value().values.update(Position=(x, y), Size=size, Layer=self.layer)
+
+    def Reference(self, x, y, size, orientation_degree=0):
+        self.module.Reference().values.update(
+            Position=(x, y), Size=size, Layer=self.layer
+        )
+
+
+class FootprintWizard(FootprintWizardPlugin):
+    """
+    FootprintWizardBase.FootprintWizard: parameters are kept in internal
+    units (nm for lengths), as the wizards see them in self.parameters.
+    """
+
+    uMM = "mm"
+    uMils = "mils"
+    uFloat = "float"
+    uInteger = "integer"
+    uBool = "bool"
+    uRadians = "radians"
+    uDegrees = "degrees"
+    uPercent = "%"
+    uString = "string"
+
+    def __init__(self):
+        FootprintWizardPlugin.__init__(self)
+        self._parameters = {}
+        self.GenerateParameterList()
+
+    def AddParam(self, page, name, unit, default, **kwarg):
+        if unit == self.uMM:
+            default = FromMM(default)
+        elif unit == self.uInteger:
+            default = int(default)
+        elif unit == self.uBool:
+            default = bool(default)
+        self._parameters.setdefault(page, {})[name] = default
+
+    @property
+    def parameters(self):
+        return self._parameters
+
+    def SetParameter(self, page, name, value):
+        """Set a parameter, in internal units."""
+        self._parameters[page][name] = value
+
+    def GetTextSize(self):
+        return DEFAULT_TEXT_SIZE
+
+    def GetTextThickness(self):
+        return DEFAULT_TEXT_SIZE // 8
+
+    def BuildFootprint(self):
+        self.module = FOOTPRINT(None)
+        self.draw = FootprintWizardDrawingAids(self.module)
+        self.buildmessages = ""
+        self.CheckParameters()
+        self.BuildThisFootprint()
+
+
+def FootprintWizardBaseModule():
+    module = types.ModuleType("FootprintWizardBase")
+    module.__doc__ = "Stand-in for KiCAD's FootprintWizardBase, see tools/kicad_stub.py"
+    module.FootprintWizard = FootprintWizard
+    module.FootprintWizardDrawingAids = FootprintWizardDrawingAids
+    return module
+
+
+def Install():
+    """
+    Put the stand-ins into sys.modules, unless KiCAD's own modules are
+    already loaded.  Returns the `pcbnew` module in use.
+    """
+    if "pcbnew" not in sys.modules:
+        from plugins import geometry
+
+        sys.modules["pcbnew"] = PcbnewModule(geometry.LAYER_NAMES)
+        sys.modules["FootprintWizardBase"] = FootprintWizardBaseModule()
+    return sys.modules["pcbnew"]
@@ -0,0 +1,406 @@
+"""
+Regression check of the Footprint Wizards' output against stored goldens.
+
+Builds every generator over a fixed grid of parameter sets with the KiCAD
+stand-ins from kicad_stub.py, turns what each build put into the footprint
+into canonical records (one JSON line per item, layers by name, sorted, so
+only the items themselves count and not the order they were added in) and
+compares the SHA-256 of the records with the goldens:
+
+    python -m tools.regression
+    python -m tools.regression --update
+
+For the cases that changed it prints which items were removed, added or
+moved, paired up by kind, layer and position.  A build that raises is a case
+too, with its error message as the record.  Exits with 1 if any case
+changed, failed differently, or has no golden yet.
+"""
+
+import argparse
+import collections
+import concurrent.futures
+import difflib
+import hashlib
+import json
+import os
+import sys
+import time
+
+# No presets or cached geometry from earlier runs, and none left behind
+os.environ["KICAD_COIL_CACHE_DIR"] = ""
+os.environ["KICAD_COIL_CONFIG_DIR"] = ""
+
+from . import kicad_stub
+
+kicad_stub.Install()
+
+import numpy as np
+
+from plugins import PCBTraceComponent
+from plugins import geometry
+from plugins import registry
+
+FORMAT_VERSION = 1
+GOLDENS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "goldens.json")
+DEFAULT_MAX_LINES = 20  # Of the diff of one case
+
+# Every generator, with the fab specs of the grid
+COMMON_VARIANTS = {
+    "default": {},
+    "narrow": {"Fab Specs": {"Trace Width": 150000, "Trace Spacing": 127000}},
+    "wide": {"Fab Specs": {"Trace Width": 500000, "Trace Spacing": 300000}},
+}
+
+PREVIEW = {"Preview": {"Full Resolution": False, "Preview Turns": 4}}
+
+
+def SpiralVariants():
+    return {
+        "turns=1": {"Coil specs": {"Turns": 1}},
+        "turns=2": {"Coil specs": {"Turns": 2}},
+        "turns=12": {"Coil specs": {"Turns": 12}},
+        "ccw": {"Coil specs": {"Direction": False}},
+        "square corners": {"Coil specs": {"Corner Radius": 0}},
+        "swapped layers": {
+            "Coil specs": {"First Layer": "B_Cu", "Second Layer": "F_Cu"}
+        },
+        "preview": dict(PREVIEW, **{"Coil specs": {"Turns": 12}}),
+    }
+
+
+# Generator -> case name -> changes to the defaults
+VARIANTS = {
+    "CoilGeneratorID2L": {
+        "turns=1": {"Coil specs": {"Total Turns": 1}},
+        "turns=2": {"Coil specs": {"Total Turns": 2}},
+        "turns=7": {"Coil specs": {"Total Turns": 7}},
+        "turns=40": {"Coil specs": {"Total Turns": 40}},
+        "ccw": {"Coil specs": {"Direction": False}},
+        "ccw,turns=7": {"Coil specs": {"Direction": False, "Total Turns": 7}},
+        "inner layers": {
+            "Coil specs": {"First Layer": "In1_Cu", "Second Layer": "In2_Cu"}
+        },
+        "preview": dict(PREVIEW, **{"Coil specs": {"Total Turns": 40}}),
+    },
+    "CoilGeneratorIDNL": {
+        "turns=1": {"Coil specs": {"Turns per Layer": 1}},
+        "turns=2": {"Coil specs": {"Turns per Layer": 2}},
+        "turns=30": {"Coil specs": {"Turns per Layer": 30}},
+        "ccw": {"Coil specs": {"Direction": False}},
+        "2 layers": {"Coil specs": {"Layers": "F_Cu,B_Cu"}},
+        "6 layers": {"Coil specs": {"Layers": "F_Cu,In1_Cu,In2_Cu,In3_Cu,In4_Cu,B_Cu"}},
+        "preview": dict(PREVIEW, **{"Coil specs": {"Turns per Layer": 30}}),
+    },
+    "CoilGenerator1L1T": {
+        "ccw": {"Coil specs": {"Direction": False}},
+        "back layer": {"Coil specs": {"Layer": "B_Cu"}},
+        "no stub": {"Coil specs": {"Stub Length": 0}},
+        "small": {"Install Info": {"Radius": 5000000}},
+    },
+    "FluxNeutralCoilGen": {
+        "turns=1": {"Coil specs": {"Turns": 1}},
+        "turns=2": {"Coil specs": {"Turns": 2}},
+        "turns=20": {"Coil specs": {"Turns": 20}},
+        "turns=40": {"Coil specs": {"Turns": 40}},
+        "large radius": {"Coil specs": {"Minimum Radius": 3000000}},
+        "outer layers": {"Coil specs": {"First Layer": "F_Cu", "Second Layer": "B_Cu"}},
+        "preview": dict(PREVIEW, **{"Coil specs": {"Turns": 20}}),
+    },
+    "RectangularSpiralCoilGen": SpiralVariants(),
+    "TrapezoidalSpiralCoilGen": SpiralVariants(),
+    "WedgeSpiralCoilGen": SpiralVariants(),
+}
+
+
+def Grid(generators=None):
+    """The cases as (name, generator, changes to the defaults), in order."""
+    cases = []
+    for generator in generators or sorted(VARIANTS):
+        variants = dict(COMMON_VARIANTS, **VARIANTS[generator])
+        for variant, changes in variants.items():
+            cases.append((f"{generator}/{variant}", generator, changes))
+    return cases
+
+
+def Canonical(value, name=None):
+    """A recorded value as plain JSON: tuples as lists, layers by name."""
+    if name == "Layer" and isinstance(value, (int, np.integer)):
+        return geometry.LAYER_NAMES[value]
+    if isinstance(value, kicad_stub.EDA_ANGLE):
+        return {"degrees": float(value.AsDegrees())}
+    if isinstance(value, (tuple, list)):
+        return [Canonical(v) for v in value]
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.floating):
+        return float(value)
+    return value
+
+
+def Records(footprint):
+    """Canonical, sorted JSON lines of everything in a stand-in footprint."""
+    records = []
+    for item in footprint.items:
+        kind = item.shape if item.kind == "shape" else item.kind
+        records.append(
+            dict(
+                {name: Canonical(value, name) for name, value in item.values.items()},
+                item=kind,
+            )
+        )
+    for name, field in footprint.values.items():
+        records.append(
+            dict(
+                {key: Canonical(value, key) for key, value in field.values.items()},
+                item="field",
+                Name=name,
+            )
+        )
+    for group in footprint.net_tie_pad_groups:
+        records.append({"item": "net tie", "Pads": group})
+    return sorted(
+        json.dumps(record, sort_keys=True, separators=(",", ":")) for record in records
+    )
+
+
+def Hash(records):
+    return hashlib.sha256("\n".join(records).encode()).hexdigest()
+
+
+def Run(case):
+    """Build one case; returns (name, records).  Runs in the worker processes."""
+    name, generator, changes = case
+    module, _ = registry.ImportModule(registry.WIZARDS[generator].module)
+    wizard = getattr(module, generator)()
+
+    # Every page is set: the wizard starts from the preset the last case
+    # saved, and only the Preview page is not among the generator's defaults
+    parameters = geometry.MergeDefaults(
+        generator,
+        {
+            page: values
+            for page, values in changes.items()
+            if page != PCBTraceComponent.PREVIEW_PAGE
+        },
+    )
+    if PCBTraceComponent.PREVIEW_PAGE in wizard.parameters:
+        parameters[PCBTraceComponent.PREVIEW_PAGE] = {
+            **PCBTraceComponent.PREVIEW_DEFAULTS,
+            **changes.get(PCBTraceComponent.PREVIEW_PAGE, {}),
+        }
+    for page, values in parameters.items():
+        wizard.parameters[page].update(values)
+    try:
+        wizard.BuildFootprint()
+    except Exception as error:
+        return name, [json.dumps({"item": "error", "Text": repr(error)})]
+    records = Records(wizard.module)
+    if not records:
+        # Rejected parameters: the first build message says why
+        message = wizard.buildmessages.splitlines()[0]
+        records = [json.dumps({"item": "message", "Text": message})]
+    return name, records
+
+
+def RunGrid(cases, workers=None):
+    """{name: records} of all cases, on `workers` processes (None: all cores)."""
+    if workers == 1:
+        return dict(map(Run, cases))
+    with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+        return dict(pool.map(Run, cases, chunksize=4))
+
+
+def LoadGoldens(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        return json.load(f)["cases"]
+
+
+def SaveGoldens(path, cases):
+    with open(path, "w") as f:
+        json.dump(
+            {
+                "format_version": FORMAT_VERSION,
+                "geometry_version": geometry.GEOMETRY_VERSION,
+                "cases": {name: cases[name] for name in sorted(cases)},
+            },
+            f,
+            indent=1,
+        )
+        f.write("\n")
+
+
+"""
+Geometric diff
+"""
+
+# Values that place an item, the first point of which is its position
+ANCHORS = ("ArcGeometry", "StartEnd", "Position", "Center", "Start")
+
+
+def Anchor(record):
+    for name in ANCHORS:
+        if name in record:
+            point = np.ravel(record[name])
+            if len(point) >= 2:
+                return point[:2].astype(np.float64)
+    return np.zeros(2)
+
+
+def Points(value):
+    """All numbers of a value, flattened, or None if it is not numeric."""
+    try:
+        return np.ravel(np.asarray(value, dtype=np.float64))
+    except (TypeError, ValueError):
+        return None
+
+
+def DescribeItem(record):
+    x, y = Anchor(record) / 1e6
+    layer = f" {record['Layer']}" if "Layer" in record else ""
+    number = f" {record['Number']}" if "Number" in record else ""
+    return f"{record['item']}{number}{layer} at ({x:.6f}, {y:.6f}) mm"
+
+
+def DescribeChange(old, new):
+    """What changed between two records of the same item."""
+    changes = []
+    for name in sorted(set(old) | set(new)):
+        before, after = old.get(name), new.get(name)
+        if before == after:
+            continue
+        if name == "Text" and isinstance(before, str) and isinstance(after, str):
+            lines = difflib.ndiff(before.splitlines(), after.splitlines())
+            changes.extend(
+                f"{line[0]} {line[2:]}" for line in lines if line[:1] in "-+"
+            )
+            continue
+        a, b = Points(before), Points(after)
+        if a is not None and b is not None and a.shape == b.shape:
+            changes.append(f"{name} moved by up to {np.max(np.abs(b - a)):g} nm")
+        else:
+            changes.append(f"{name}: {before} -> {after}")
+    return changes
+
+
+def Diff(old_records, new_records):
+    """
+    Readable lines of what changed between two sets of records: removed and
+    added items, and items that changed, paired by kind and layer with the
+    nearest position.
+    """
+    old_count = collections.Counter(old_records)
+    new_count = collections.Counter(new_records)
+    removed = [json.loads(r) for r in (old_count - new_count).elements()]
+    added = [json.loads(r) for r in (new_count - old_count).elements()]
+
+    lines = []
+    by_kind = collections.defaultdict(list)
+    for index, record in enumerate(added):
+        by_kind[(record["item"], record.get("Layer"))].append(index)
+    paired = set()
+    for record in removed:
+        candidates = [
+            i for i in by_kind[(record["item"], record.get("Layer"))] if i not in paired
+        ]
+        if not candidates:
+            lines.append(f"- {DescribeItem(record)}")
+            continue
+        distance = [np.hypot(*(Anchor(added[i]) - Anchor(record))) for i in candidates]
+        match = candidates[int(np.argmin(distance))]
+        paired.add(match)
+        changes = "; ".join(DescribeChange(record, added[match]))
+        lines.append(f"~ {DescribeItem(record)}: {changes}")
+    for index, record in enumerate(added):
+        if index not in paired:
+            lines.append(f"+ {DescribeItem(record)}")
+    return lines
+
+
+def Compare(results, goldens, max_lines=DEFAULT_MAX_LINES, output=print):
+    """
+    Print the cases that differ from their goldens; returns the number of
+    (same, changed, new) cases.
+    """
+    same = changed = new = 0
+    for name, records in results.items():
+        golden = goldens.get(name)
+        digest = Hash(records)
+        if golden is None:
+            new += 1
+            output(f"NEW      {name} ({len(records)} items)")
+            continue
+        if golden["hash"] == digest:
+            same += 1
+            continue
+        changed += 1
+        lines = Diff(golden["records"], records)
+        output(
+            f"CHANGED  {name} ({golden['hash'][:12]} -> {digest[:12]}, "
+            f"{len(lines)} differences)"
+        )
+        for line in lines[:max_lines]:
+            output(f"    {line}")
+        if len(lines) > max_lines:
+            output(f"    ... and {len(lines) - max_lines} more")
+    return same, changed, new
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m tools.regression", description=__doc__.split("\n\n")[0]
+    )
+    parser.add_argument(
+        "--generator",
+        action="append",
+        choices=sorted(VARIANTS),
+        help="Generator to run, may be repeated (default: all)",
+    )
+    parser.add_argument(
+        "--update",
+        action="store_true",
+        help="Store the results of this run as the goldens",
+    )
+    parser.add_argument("--goldens", default=GOLDENS, help="Goldens JSON file")
+    parser.add_argument(
+        "--workers", type=int, default=0, help="Worker processes, 0 for all cores"
+    )
+    parser.add_argument(
+        "--max-lines",
+        type=int,
+        default=DEFAULT_MAX_LINES,
+        help="Lines of the diff shown per changed case",
+    )
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    cases = Grid(args.generator)
+    results = RunGrid(cases, args.workers or None)
+    goldens = LoadGoldens(args.goldens)
+    elapsed = time.perf_counter() - start
+
+    if args.update:
+        goldens.update(
+            {
+                name: {"hash": Hash(records), "records": records}
+                for name, records in results.items()
+            }
+        )
+        if not args.generator:
+            # A full run drops the cases that left the grid
+            goldens = {name: goldens[name] for name in results}
+        SaveGoldens(args.goldens, goldens)
+        print(f"Stored {len(results)} cases in {args.goldens} in {elapsed:.1f} s")
+        return 0
+
+    same, changed, new = Compare(results, goldens, args.max_lines)
+    print(
+        f"{len(results)} cases in {elapsed:.1f} s: {same} same, {changed} changed, "
+        f"{new} without a golden"
+    )
+    return 1 if changed or new else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())